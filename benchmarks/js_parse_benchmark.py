@@ -0,0 +1,94 @@
+"""Measure JavaScript/TypeScript parse speed on large generated and minified files.
+
+Synthetic sources are built in memory: a generated module with many top-level
+functions, classes and tricky literals, and a minified bundle of the same code
+on a single line. Each is segmented and parsed several times and the median
+throughput is reported.
+
+    python benchmarks/js_parse_benchmark.py --functions 20000 --output js_parse.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.js_lexer import looks_minified, segment_javascript  # noqa: E402
+from src.tree_parser import AdvancedCodeParser  # noqa: E402
+
+TEMPLATE = """/** Handler number {i} */
+export function handler{i}(event) {{
+  const pattern = /[{{}}]+\\/{i}/g;
+  const label = `item ${{event.id}} of {{${{"{{"}}}}`;
+  // a stray }} in a comment
+  return event.name.replace(pattern, '}}') + label;
+}}
+
+export const compute{i} = (a, b) => {{
+  return a / b / {i};
+}};
+
+class Model{i} extends Base {{
+  render() {{ return "{{"; }}
+}}
+"""
+
+def generated_source(functions: int) -> str:
+    return "\n".join(TEMPLATE.format(i=i) for i in range(functions))
+
+def minified_source(functions: int) -> str:
+    body = ";".join(
+        f"function h{i}(e){{return e.n.replace(/[{{}}]/g,'}}')+`${{e.id}}`}}" for i in range(functions)
+    )
+    return f"!function(){{{body}}}();"
+
+def time_runs(fn, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--functions", type=int, default=5000, help="Top-level functions per file")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per measurement")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, source in (("generated", generated_source(args.functions)),
+                             ("minified", minified_source(args.functions))):
+            path = Path(tmp) / f"{name}.js"
+            path.write_text(source)
+            megabytes = len(source.encode("utf-8")) / (1024 * 1024)
+            code_parser = AdvancedCodeParser(minified_files="chunk")
+
+            segment_seconds = time_runs(lambda: segment_javascript(source), args.runs)
+            parse_seconds = time_runs(lambda: code_parser.parse_file(path, raise_errors=True), args.runs)
+            results[name] = {
+                "megabytes": round(megabytes, 2),
+                "minified": looks_minified(source),
+                "segments": len(segment_javascript(source)),
+                "chunks": len(code_parser.parse_file(path, raise_errors=True)),
+                "segment_mb_per_second": round(megabytes / segment_seconds, 2),
+                "parse_mb_per_second": round(megabytes / parse_seconds, 2),
+            }
+
+    for name, result in results.items():
+        print(f"{name:>10}: {result['megabytes']:.2f} MB, {result['segments']} segments, "
+              f"{result['chunks']} chunks, segment {result['segment_mb_per_second']:.2f} MB/s, "
+              f"parse {result['parse_mb_per_second']:.2f} MB/s")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
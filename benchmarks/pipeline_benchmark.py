@@ -0,0 +1,153 @@
+"""Time every indexing stage and search on synthetic repositories of several sizes.
+
+For each size a repository is generated with synthetic_repo.py and run through
+the indexer's own components one stage at a time: scan (FileScanner), hash
+(change detection), parse (ParallelParser), embed (CodeEmbedder with the
+deterministic hashing backend, so no model is downloaded), store
+(VectorStore.add_chunks) and query (embedding plus hybrid search, with the
+result cache off). The JSON output records the commit so that runs can be
+compared across commits.
+
+    python benchmarks/pipeline_benchmark.py --sizes 1000 10000 100000 --output pipeline.json
+"""
+import argparse
+import json
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from benchmarks.synthetic_repo import generate_repo  # noqa: E402
+from src.config import CodeRAGConfig  # noqa: E402
+from src.file_scanner import FileScanner  # noqa: E402
+from src.indexer import IncrementalIndexer  # noqa: E402
+
+# Chunks embedded and stored per step, which bounds memory on the largest repositories
+STORE_BATCH = 10000
+
+def git_commit() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                            capture_output=True, text=True, check=False)
+    return result.stdout.strip() or "unknown"
+
+def write_config(directory: Path, vector_backend: str, parse_workers: int) -> CodeRAGConfig:
+    config_path = directory / "config.json"
+    config_path.write_text(json.dumps({
+        "file_patterns": ["*.py", "*.js", "*.ts"],
+        "index_directory": str(directory / "index"),
+        "embedding_backend": "hashing",
+        "embedding_cache": False,
+        "vector_backend": vector_backend,
+        "parse_workers": parse_workers,
+        "query_result_cache": False
+    }))
+    return CodeRAGConfig(config_path)
+
+def stage(seconds: float, items: int, unit: str) -> dict:
+    return {"seconds": round(seconds, 4), unit: items,
+            f"{unit}_per_second": round(items / seconds, 1) if seconds else None}
+
+def benchmark_size(directory: Path, files: int, args) -> dict:
+    repo = directory / "repo"
+    start = time.perf_counter()
+    generated = generate_repo(repo, files, args.seed)
+    print(f"[{files}] generated {generated['bytes'] / 1e6:.1f} MB in {time.perf_counter() - start:.1f}s")
+
+    config = write_config(directory, args.vector_backend, args.parse_workers)
+    indexer = IncrementalIndexer(config)
+    stages = {}
+
+    start = time.perf_counter()
+    scanner = FileScanner(config)
+    paths = scanner.scan_directory(repo)
+    stages["scan"] = stage(time.perf_counter() - start, len(paths), "files")
+
+    start = time.perf_counter()
+    changed = indexer.get_changed_files(paths, stats=scanner.stats)["changed"]
+    stages["hash"] = stage(time.perf_counter() - start, len(changed), "files")
+
+    start = time.perf_counter()
+    chunks, errors = [], 0
+    for _, file_chunks, error in indexer.parser.parse_files(changed):
+        chunks.extend(file_chunks)
+        errors += error is not None
+    stages["parse"] = stage(time.perf_counter() - start, len(changed), "files")
+    stages["parse"]["chunks"] = len(chunks)
+    stages["parse"]["errors"] = errors
+
+    embed_seconds = store_seconds = 0.0
+    for offset in range(0, len(chunks), STORE_BATCH):
+        batch = chunks[offset:offset + STORE_BATCH]
+        start = time.perf_counter()
+        embeddings = indexer.embedder.embed_chunks(batch)
+        embed_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        indexer.vector_store.add_chunks(batch, embeddings)
+        store_seconds += time.perf_counter() - start
+    stages["embed"] = stage(embed_seconds, len(chunks), "chunks")
+    stages["store"] = stage(store_seconds, len(chunks), "chunks")
+
+    # Queries built from indexed symbol names, like a developer looking up a function
+    rng = random.Random(args.seed)
+    symbols = [chunk.symbol_name for chunk in chunks if chunk.symbol_name]
+    queries = [" ".join(rng.choice(symbols).split("_")) for _ in range(args.queries)] if symbols else []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        embedding = indexer.embedder.embed_query(query)
+        indexer.vector_store.search(embedding, n_results=10, query_text=query,
+                                    lexical_weight=config.get("lexical_weight", 0.5))
+        latencies.append((time.perf_counter() - start) * 1000)
+    stages["query"] = stage(sum(latencies) / 1000, len(latencies), "queries")
+    if latencies:
+        stages["query"]["p50_ms"] = round(statistics.median(latencies), 2)
+        stages["query"]["p95_ms"] = round(sorted(latencies)[int(len(latencies) * 0.95) - 1], 2)
+
+    indexer.close()
+    for name, result in stages.items():
+        rate = next((f"{value:,.0f} {key.replace('_per_second', '')}/s" for key, value in result.items()
+                     if key.endswith("_per_second") and value), "")
+        print(f"[{files}] {name:<6} {result['seconds']:9.3f}s  {rate}")
+    return {"generated": generated, "stages": stages}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000], help="Repository sizes in files")
+    parser.add_argument("--queries", type=int, default=100, help="Queries to time per size")
+    parser.add_argument("--vector-backend", default="numpy", choices=["numpy", "chroma"])
+    parser.add_argument("--parse-workers", type=int, default=0, help="Parse processes (0 = one per CPU)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--keep", type=Path, help="Keep the generated repositories and indexes here")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for files in args.sizes:
+        if args.keep:
+            directory = args.keep / f"repo_{files}"
+            shutil.rmtree(directory, ignore_errors=True)
+            directory.mkdir(parents=True)
+            results[str(files)] = benchmark_size(directory, files, args)
+        else:
+            with tempfile.TemporaryDirectory(prefix="code_rag_pipeline_") as tmp:
+                results[str(files)] = benchmark_size(Path(tmp), files, args)
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "vector_backend": args.vector_backend,
+            "seed": args.seed,
+            "sizes": results
+        }, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Compare float32, float16, int8 and product-quantized vector storage in the numpy backend.
+
+Clustered synthetic embeddings are indexed once per mode. Each mode reports
+the bytes a query scans per vector, the index size on disk (quantized modes
+also keep a float16 rerank copy, or float32 in the "-f32" modes), recall@k
+against the exact float32 ranking and single-query latency.
+
+    python benchmarks/quantization_benchmark.py --rows 200000 --output quantization.json
+"""
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from src.vector_backends import NumpyBackend  # noqa: E402
+
+MODES = {
+    "float32": {},
+    "float16": {"dtype": "float16"},
+    "int8": {"quantization": "int8"},
+    "pq": {"quantization": "pq"},
+    "int8-f32": {"quantization": "int8", "dtype": "float32"},
+    "pq-f32": {"quantization": "pq", "dtype": "float32"},
+}
+
+def clustered_vectors(rows: int, dimension: int, clusters: int, seed: int) -> np.ndarray:
+    """Points scattered around random centres, which is closer to real embeddings than pure noise"""
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(clusters, dimension)).astype(np.float32)
+    points = centres[rng.integers(clusters, size=rows)] + 0.6 * rng.normal(size=(rows, dimension)).astype(np.float32)
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+def directory_bytes(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.iterdir())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000, help="Vectors to index")
+    parser.add_argument("--dimension", type=int, default=384, help="Embedding dimension")
+    parser.add_argument("--queries", type=int, default=100, help="Queries to time")
+    parser.add_argument("-k", type=int, default=10, help="Results per query")
+    parser.add_argument("--rerank-factor", type=int, default=10, help="Candidates re-scored per result")
+    parser.add_argument("--pq-subvectors", type=int, default=48, help="Bytes per vector in pq mode")
+    parser.add_argument("--modes", nargs="+", default=["float32", "float16", "int8", "pq"], choices=list(MODES))
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    vectors = clustered_vectors(args.rows, args.dimension, max(args.rows // 500, 8), seed=0)
+    # Queries are perturbed copies of indexed vectors, so each has a meaningful neighbourhood
+    rng = np.random.default_rng(1)
+    queries = vectors[rng.choice(args.rows, args.queries, replace=False)]
+    queries = queries + 0.05 * rng.normal(size=queries.shape).astype(np.float32)
+    ids = [f"chunk-{i}" for i in range(args.rows)]
+    documents = [""] * args.rows
+    metadatas = [{"file_path": f"src/file_{i % 1000}.py"} for i in range(args.rows)]
+
+    results = {}
+    truth = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for mode in args.modes:
+            options = dict(MODES[mode], rerank_factor=args.rerank_factor, pq_subvectors=args.pq_subvectors)
+            backend = NumpyBackend(Path(tmp) / mode, **options)
+            start = time.perf_counter()
+            backend.upsert(ids, vectors, documents, metadatas)
+            build_seconds = time.perf_counter() - start
+
+            latencies, found = [], []
+            for query in queries:
+                start = time.perf_counter()
+                found.append(backend.query(query[None, :], args.k)["ids"][0])
+                latencies.append((time.perf_counter() - start) * 1000)
+            if truth is None:
+                # Ground truth is the exact float32 ranking, whatever mode runs first
+                exact = NumpyBackend(Path(tmp) / "exact") if mode != "float32" else backend
+                if exact is not backend:
+                    exact.upsert(ids, vectors, documents, metadatas)
+                truth = [set(ids) for ids in exact.query(queries, args.k)["ids"]]
+            recall = np.mean([len(truth[i] & set(hits)) / args.k for i, hits in enumerate(found)])
+
+            scanned = backend.vector_codes if backend.vector_codes is not None else backend.vectors
+            results[mode] = {
+                "scan_bytes_per_vector": int(scanned.dtype.itemsize * scanned.shape[1]),
+                "scan_megabytes": round(scanned.dtype.itemsize * scanned.shape[1] * args.rows / 2**20, 1),
+                "rerank_dtype": backend.dtype.name if backend.vector_codes is not None else None,
+                "disk_megabytes": round(directory_bytes(backend.directory) / 2**20, 1),
+                f"recall_at_{args.k}": round(float(recall), 4),
+                "median_query_ms": round(statistics.median(latencies), 2),
+                "p95_query_ms": round(float(np.percentile(latencies, 95)), 2),
+                "build_seconds": round(build_seconds, 2),
+            }
+
+    for mode, result in results.items():
+        rerank = f" incl. {result['rerank_dtype']} rerank copy" if result["rerank_dtype"] else ""
+        print(f"{mode:>8}: scan {result['scan_bytes_per_vector']:>5} B/vector ({result['scan_megabytes']} MB), "
+              f"disk {result['disk_megabytes']} MB{rerank}, recall@{args.k} {result[f'recall_at_{args.k}']:.3f}, "
+              f"median {result['median_query_ms']:.2f} ms, p95 {result['p95_query_ms']:.2f} ms, "
+              f"build {result['build_seconds']:.1f} s")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Measure CLI cold-start time per subcommand and fail on regressions.
+
+Each subcommand is started in a fresh interpreter with --help, which exercises
+module import and click setup but none of the command bodies. The run fails if
+any median start time exceeds the threshold or if a heavy dependency is
+imported at CLI import time.
+
+    python benchmarks/startup_benchmark.py --threshold-ms 400 --output startup.json
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SUBCOMMANDS = ["index", "watch", "index-github", "search", "ask", "serve", "stats"]
+HEAVY_MODULES = ["torch", "sentence_transformers", "transformers", "chromadb", "requests"]
+
+def time_command(args, runs: int) -> float:
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "src.cli"] + args,
+            cwd=REPO_ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True
+        )
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+def heavy_modules_at_import() -> list:
+    code = (
+        "import sys, json; import src.cli; "
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        check=True
+    ).stdout
+    return json.loads(output)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="Runs per subcommand")
+    parser.add_argument("--threshold-ms", type=float, default=500.0, help="Maximum median start time")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    args = parser.parse_args()
+
+    baseline = time_command(["--help"], args.runs)
+    results = {"cli --help": baseline}
+    for command in SUBCOMMANDS:
+        results[command] = time_command([command, "--help"], args.runs)
+
+    heavy = heavy_modules_at_import()
+
+    for name, millis in results.items():
+        status = "FAIL" if millis > args.threshold_ms else "ok"
+        print(f"{name:<16} {millis:8.1f} ms  {status}")
+    if heavy:
+        print(f"Heavy modules imported by src.cli: {', '.join(heavy)}")
+
+    if args.output:
+        args.output.write_text(json.dumps({
+            "threshold_ms": args.threshold_ms,
+            "median_ms": results,
+            "heavy_imports": heavy
+        }, indent=2))
+
+    failed = heavy or any(millis > args.threshold_ms for millis in results.values())
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
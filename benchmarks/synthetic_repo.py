@@ -0,0 +1,169 @@
+"""Generate a synthetic Python/JavaScript/TypeScript repository for benchmarks.
+
+File sizes follow a log-normal distribution (many small modules, a long tail
+of large ones). Python files contain decorated functions and nested classes,
+TypeScript files interfaces, classes and arrow functions, and a small share of
+JavaScript files are single-line minified bundles. Files are also written
+under node_modules/, build/, dist/ and __pycache__/, which a scan should skip.
+The same seed always produces the same tree.
+
+    python benchmarks/synthetic_repo.py /tmp/repo --files 10000
+"""
+import argparse
+import json
+import random
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+WORDS = ["user", "order", "cache", "token", "session", "config", "event", "record", "parser", "stream",
+         "account", "invoice", "report", "queue", "worker", "payload", "schema", "client", "route", "index"]
+VERBS = ["load", "save", "parse", "render", "validate", "build", "fetch", "update", "resolve", "merge"]
+IGNORED_DIRS = ["node_modules", "build", "dist", "__pycache__"]
+
+# Share of files per kind; the rest are minified bundles
+LANGUAGE_MIX = [("python", 0.55), ("typescript", 0.25), ("javascript", 0.18)]
+IGNORED_SHARE = 0.1
+
+def _name(rng: random.Random, parts: int = 2) -> str:
+    return "_".join(rng.choice(WORDS) for _ in range(parts))
+
+def _camel(name: str) -> str:
+    first, *rest = name.split("_")
+    return first + "".join(part.title() for part in rest)
+
+def _pascal(name: str) -> str:
+    return "".join(part.title() for part in name.split("_"))
+
+def _definitions(rng: random.Random) -> int:
+    """Top-level definitions in a file: log-normal, median about 4, capped at 400"""
+    return max(1, min(400, int(rng.lognormvariate(1.5, 0.9))))
+
+def _python_body(rng: random.Random, indent: str) -> List[str]:
+    lines = []
+    for _ in range(rng.randint(1, 12)):
+        variable = _name(rng, 1)
+        lines.append(rng.choice([
+            f"{indent}{variable} = {_name(rng, 1)}.get('{rng.choice(WORDS)}', {rng.randint(0, 99)})",
+            f"{indent}if {variable} is None:\n{indent}    raise ValueError('missing {variable}')",
+            f"{indent}for item in {variable}s:\n{indent}    total += item.{rng.choice(WORDS)}",
+            f"{indent}# {rng.choice(VERBS)} the {rng.choice(WORDS)} before returning",
+        ]))
+    lines.append(f"{indent}return {_name(rng, 1)}")
+    return lines
+
+def _python_function(rng: random.Random, indent: str = "") -> List[str]:
+    name = f"{rng.choice(VERBS)}_{_name(rng)}"
+    lines = [f"{indent}@lru_cache(maxsize=128)"] if rng.random() < 0.15 else []
+    lines.append(f"{indent}def {name}(self, {_name(rng, 1)}, {_name(rng, 1)}=None):" if indent
+                 else f"{indent}def {name}({_name(rng, 1)}, {_name(rng, 1)}=None):")
+    lines.append(f'{indent}    """{rng.choice(VERBS).title()} a {rng.choice(WORDS)} for the {rng.choice(WORDS)}"""')
+    return lines + _python_body(rng, indent + "    ")
+
+def _python_class(rng: random.Random, indent: str = "", depth: int = 0) -> List[str]:
+    lines = [f"{indent}class {_pascal(_name(rng))}:",
+             f'{indent}    """Holds {rng.choice(WORDS)} state"""']
+    for _ in range(rng.randint(1, 6)):
+        lines.append("")
+        if depth < 2 and rng.random() < 0.2:
+            lines += _python_class(rng, indent + "    ", depth + 1)
+        else:
+            lines += _python_function(rng, indent + "    ")
+    return lines
+
+def python_source(rng: random.Random) -> str:
+    lines = ["import os", "from functools import lru_cache", f"from .{_name(rng, 1)} import {_pascal(_name(rng))}", ""]
+    for _ in range(_definitions(rng)):
+        lines += [""] + (_python_class(rng) if rng.random() < 0.3 else _python_function(rng)) + [""]
+    return "\n".join(lines) + "\n"
+
+def _js_body(rng: random.Random, indent: str) -> List[str]:
+    lines = []
+    for _ in range(rng.randint(1, 10)):
+        variable = _camel(_name(rng))
+        lines.append(rng.choice([
+            f"{indent}const {variable} = await client.{rng.choice(VERBS)}('{rng.choice(WORDS)}/{rng.randint(0, 99)}');",
+            f"{indent}if (!{variable}) {{ throw new Error(`missing ${{{variable}}}`); }}",
+            f"{indent}items.forEach((item) => {{ total += item.{rng.choice(WORDS)}; }});",
+            f"{indent}// {rng.choice(VERBS)} the {rng.choice(WORDS)} before returning",
+        ]))
+    lines.append(f"{indent}return {_camel(_name(rng))};")
+    return lines
+
+def javascript_source(rng: random.Random, typed: bool) -> str:
+    lines = [f"import {{ {_camel(_name(rng))} }} from './{_name(rng, 1)}';", ""]
+    annotation = ": Promise<unknown>" if typed else ""
+    for _ in range(_definitions(rng)):
+        name = f"{rng.choice(VERBS)}_{_name(rng)}"
+        kind = rng.random()
+        if typed and kind < 0.15:
+            lines += [f"export interface {_pascal(name)} {{"] + \
+                     [f"  {_camel(_name(rng))}: {rng.choice(['string', 'number', 'boolean'])};" for _ in range(rng.randint(2, 8))] + ["}"]
+        elif kind < 0.4:
+            lines.append(f"export class {_pascal(name)} {{")
+            for _ in range(rng.randint(1, 6)):
+                lines += [f"  async {_camel(f'{rng.choice(VERBS)}_{_name(rng)}')}(input){annotation} {{"] + _js_body(rng, "    ") + ["  }", ""]
+            lines.append("}")
+        elif kind < 0.7:
+            lines += [f"export const {_camel(name)} = async (input){annotation} => {{"] + _js_body(rng, "  ") + ["};"]
+        else:
+            lines += [f"/** {rng.choice(VERBS).title()} {rng.choice(WORDS)} records */",
+                      f"export async function {_camel(name)}(input){annotation} {{"] + _js_body(rng, "  ") + ["}"]
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+def minified_source(rng: random.Random) -> str:
+    body = ";".join(
+        f"function {_camel(_name(rng))}{i}(e){{return e.{rng.choice(WORDS)}.map(t=>t*{i}).filter(Boolean)}}"
+        for i in range(rng.randint(100, 1000))
+    )
+    return f"!function(){{{body}}}();\n"
+
+def _source(rng: random.Random) -> Tuple[str, str]:
+    """(extension, text) of one file, picked by LANGUAGE_MIX"""
+    roll = rng.random()
+    for language, share in LANGUAGE_MIX:
+        if roll < share:
+            if language == "python":
+                return ".py", python_source(rng)
+            return (".ts", javascript_source(rng, typed=True)) if language == "typescript" \
+                else (".js", javascript_source(rng, typed=False))
+        roll -= share
+    return ".min.js", minified_source(rng)
+
+def _directory(rng: random.Random) -> Path:
+    """A package path one to four levels deep"""
+    return Path("src", *(f"{rng.choice(WORDS)}_{rng.randint(0, 9)}" for _ in range(rng.randint(0, 3))))
+
+def generate_repo(root: Path, files: int, seed: int = 0) -> Dict[str, int]:
+    """Write files source files under root, plus about 10% more in ignored directories"""
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    counts = {"files": 0, "ignored_files": 0, "bytes": 0, "minified_files": 0}
+
+    def write(path: Path, text: str):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text, encoding="utf-8")
+        counts["bytes"] += len(text.encode("utf-8"))
+
+    for i in range(files):
+        extension, text = _source(rng)
+        write(root / _directory(rng) / f"{_name(rng)}_{i}{extension}", text)
+        counts["files"] += 1
+        counts["minified_files"] += extension == ".min.js"
+
+    for i in range(int(files * IGNORED_SHARE)):
+        extension, text = _source(rng)
+        write(root / rng.choice(IGNORED_DIRS) / _directory(rng) / f"vendor_{i}{extension}", text)
+        counts["ignored_files"] += 1
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("directory", type=Path, help="Where to write the repository")
+    parser.add_argument("--files", type=int, default=1000, help="Source files outside ignored directories")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print(json.dumps(generate_repo(args.directory, args.files, args.seed), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional
+
+class AnswerCache:
+    def __init__(self, index_directory: Path, max_entries: int = 1000):
+        """Generated answers keyed by (question, retrieved chunk ids, model), in SQLite next to the index"""
+        self.index_directory = Path(index_directory)
+        self.index_directory.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.index_directory / "answer_cache.db"
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS answers ("
+                "key TEXT PRIMARY KEY, answer TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+
+    @staticmethod
+    def key(question: str, chunk_ids: List[str], model: str) -> str:
+        # Chunk ids are content-addressed, so any change to the retrieved code changes the key
+        payload = json.dumps([' '.join(question.split()), chunk_ids, model])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, question: str, chunk_ids: List[str], model: str) -> Optional[str]:
+        key = self.key(question, chunk_ids, model)
+        with self.lock, self.conn:
+            row = self.conn.execute("SELECT answer FROM answers WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE answers SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.hits += 1
+        return row[0]
+
+    def put(self, question: str, chunk_ids: List[str], model: str, answer: str):
+        key = self.key(question, chunk_ids, model)
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO answers VALUES (?, ?, ?)", (key, answer, time.time()))
+            # Evict least recently used answers beyond max_entries
+            self.conn.execute(
+                "DELETE FROM answers WHERE key IN (SELECT key FROM answers ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM answers")
+
+    def close(self):
+        self.conn.close()
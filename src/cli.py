@@ -5,14 +5,12 @@ from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn
 import tempfile
 import shutil
-from .tree_parser import AdvancedCodeParser
-from .embedder import CodeEmbedder
-from .vector_store import VectorStore
-from .local_generator import LocalCodeQAGenerator
 from .config import CodeRAGConfig
 from .file_scanner import FileScanner
-from .indexer import IncrementalIndexer
-from .github_downloader import GitHubDownloader
+
+# Heavy dependencies (torch, sentence-transformers, chromadb, transformers,
+# requests) are imported inside the commands that need them so that --help,
+# stats and server-backed searches start quickly.
 
 console = Console()
 
@@ -28,41 +26,175 @@ def cli():
 @click.option('--config', type=click.Path(path_type=Path), help='Config file path')
 @click.option('--verbose', '-v', is_flag=True, help='Verbose output')
 @click.option('--force', is_flag=True, help='Force reindex all files')
-def index(directory: Path, clear: bool, config: Path, verbose: bool, force: bool):
+@click.option('--profile', is_flag=True, help='Report time per stage, throughput and peak memory')
+@click.option('--profile-output', type=click.Path(path_type=Path),
+              help='Where --profile writes its JSON (default: profile.json in the index directory)')
+@click.option('--cprofile', type=click.Path(path_type=Path),
+              help='Also run under cProfile and save pstats data here (main thread only)')
+def index(directory: Path, clear: bool, config: Path, verbose: bool, force: bool, profile: bool,
+          profile_output: Path, cprofile: Path):
     """Index code files in directory (incremental by default)"""
+    from .metrics import Metrics
     
     config_obj = CodeRAGConfig(config)
-    scanner = FileScanner(config_obj)
-    indexer = IncrementalIndexer(config_obj, console)
-    
-    if clear:
-        console.print("Clearing existing index...", style="yellow")
-        indexer.vector_store.clear()
+    metrics = Metrics()
+    profiler = None
+    if cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
     
-    console.print(f"Scanning directory: {directory}", style="blue")
-    files = scanner.scan_directory(directory)
+    try:
+        _index(directory, clear, config_obj, verbose, force, metrics)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(str(cprofile))
     
-    if not files:
-        console.print("No supported files found", style="red")
-        return
+    if profile or cprofile:
+        _print_profile(metrics.snapshot(), profile_output or Path(config_obj.get("index_directory")) / "profile.json")
+    if profiler is not None:
+        import pstats
+        console.print(f"cProfile data saved to {cprofile}; top functions by cumulative time:", style="dim")
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(15)
+
+def _index(directory: Path, clear: bool, config_obj: CodeRAGConfig, verbose: bool, force: bool, metrics):
+    from .indexer import IncrementalIndexer
     
-    stats = scanner.get_file_stats(files)
+    scanner = FileScanner(config_obj)
+    with metrics.time("load"):
+        indexer = IncrementalIndexer(config_obj, console, verbose=verbose, metrics=metrics)
     
-    if verbose:
-        table = Table(title="File Statistics")
-        table.add_column("Extension", style="cyan")
-        table.add_column("Count", justify="right")
+    try:
+        if clear:
+            console.print("Clearing existing index...", style="yellow")
+            indexer.vector_store.clear()
+        
+        console.print(f"Scanning directory: {directory}", style="blue")
+        with metrics.time("scan"):
+            files = scanner.scan_directory(directory)
+        metrics.add("files_scanned", len(files))
+        
+        if not files:
+            console.print("No supported files found", style="red")
+            return
+        
+        stats = scanner.get_file_stats(files)
+        
+        if verbose:
+            table = Table(title="File Statistics")
+            table.add_column("Extension", style="cyan")
+            table.add_column("Count", justify="right")
+            
+            for ext, count in stats["by_extension"].items():
+                table.add_row(ext, str(count))
+            
+            console.print(table)
+            console.print(f"Total size: {stats['total_size'] / 1024:.1f} KB")
         
-        for ext, count in stats["by_extension"].items():
-            table.add_row(ext, str(count))
+        try:
+            result = indexer.index_files(files, force_reindex=force or clear, stats=scanner.stats)
+        except ValueError as e:
+            console.print(str(e), style="red")
+            return
         
-        console.print(table)
-        console.print(f"Total size: {stats['total_size'] / 1024:.1f} KB")
+        console.print(f"Processed {result['files_processed']} files, "
+                     f"added {result['chunks_added']} chunks", style="green")
+    finally:
+        indexer.close()
+
+def _print_profile(snapshot: dict, output: Path, title: str = "Index Profile",
+                   caption: str = "Parsing runs alongside embedding and storing, so shares overlap"):
+    """Show a Metrics snapshot as tables and save it as JSON"""
+    import json
+    
+    elapsed = snapshot["elapsed_seconds"]
+    table = Table(title=title, caption=caption)
+    table.add_column("Stage", style="cyan")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Calls", justify="right")
+    table.add_column("Share", justify="right")
+    for name, stage in snapshot["stages"].items():
+        table.add_row(name, f"{stage['seconds']:.3f}", str(stage["calls"]),
+                      f"{stage['seconds'] / elapsed:.0%}" if elapsed else "-")
+    table.add_row("total", f"{elapsed:.3f}", "", "", style="bold")
+    console.print(table)
     
-    result = indexer.index_files(files, force_reindex=force or clear)
+    counters = snapshot["counters"]
+    if "files_scanned" in counters:
+        console.print(f"{snapshot['files_per_second']:.1f} files/sec, {snapshot['chunks_per_second']:.1f} chunks/sec, "
+                      f"{snapshot['bytes_read'] / 1e6:.1f} MB read, {counters.get('chunks_stored', 0):.0f} chunks stored")
+    if snapshot["peak_rss_bytes"] is not None:
+        workers = f" (largest parse worker {snapshot['peak_child_rss_bytes'] / 1e6:.0f} MB)" \
+            if snapshot["peak_child_rss_bytes"] else ""
+        console.print(f"Peak RSS {snapshot['peak_rss_bytes'] / 1e6:.0f} MB{workers}")
     
+    if snapshot["slowest_parses"]:
+        slow_table = Table(title="Slowest Parses")
+        slow_table.add_column("File")
+        slow_table.add_column("Seconds", justify="right")
+        for entry in snapshot["slowest_parses"]:
+            slow_table.add_row(entry["file_path"], f"{entry['seconds']:.3f}")
+        console.print(slow_table)
+    
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(snapshot, indent=2))
+    console.print(f"Profile written to {output}", style="dim")
+
+@cli.command()
+@click.argument('directory', type=click.Path(exists=True, file_okay=False, path_type=Path), default='.')
+@click.option('--config', type=click.Path(path_type=Path), help='Config file path')
+@click.option('--debounce', type=float, help='Seconds of quiet before re-indexing a burst of changes')
+@click.option('--poll', is_flag=True, help='Poll for changes instead of using inotify')
+@click.option('--verbose', '-v', is_flag=True, help='Verbose output')
+def watch(directory: Path, config: Path, debounce: float, poll: bool, verbose: bool):
+    """Keep the index up to date as files in directory change"""
+    from .indexer import IncrementalIndexer
+    from .watcher import FileWatcher
+    
+    config_obj = CodeRAGConfig(config)
+    scanner = FileScanner(config_obj)
+    indexer = IncrementalIndexer(config_obj, console if verbose else None, verbose=verbose)
+    metrics_file = config_obj.get("metrics_file", "")
+    
+    console.print(f"Catching up on {directory}...", style="blue")
+    try:
+        files = scanner.scan_directory(directory)
+        result = indexer.index_files(files, stats=scanner.stats)
+    except ValueError as e:
+        console.print(str(e), style="red")
+        indexer.close()
+        return
+    if metrics_file:
+        indexer.metrics.write_prometheus(Path(metrics_file))
     console.print(f"Processed {result['files_processed']} files, "
                  f"added {result['chunks_added']} chunks", style="green")
+    
+    watcher = FileWatcher(
+        directory,
+        scanner,
+        debounce_seconds=debounce if debounce is not None else config_obj.get("watch_debounce_seconds", 1.0),
+        max_delay_seconds=config_obj.get("watch_max_delay_seconds", 10.0),
+        poll_interval=config_obj.get("watch_poll_interval", 2.0),
+        force_polling=poll,
+        console=console
+    )
+    console.print(f"Watching {directory} ({watcher.mode}), press Ctrl+C to stop", style="blue")
+    
+    try:
+        for touched in watcher.batches():
+            result = indexer.update_paths(touched, scanner, directory)
+            if metrics_file:
+                indexer.metrics.write_prometheus(Path(metrics_file))
+            if result['files_processed'] or result['files_removed']:
+                console.print(f"Re-indexed {result['files_processed']} files "
+                             f"({result['chunks_added']} chunks), removed {result['files_removed']}",
+                             style="green")
+    except KeyboardInterrupt:
+        console.print("Stopped watching", style="yellow")
+    finally:
+        watcher.close()
+        indexer.close()
 
 @cli.command()
 @click.argument('github_url')
@@ -70,6 +202,8 @@ def index(directory: Path, clear: bool, config: Path, verbose: bool, force: bool
 @click.option('--config', type=click.Path(path_type=Path), help='Config file path')
 def index_github(github_url: str, target: Path, config: Path):
     """Index a GitHub repository"""
+    from .github_downloader import GitHubDownloader
+    from .indexer import IncrementalIndexer
     
     config_obj = CodeRAGConfig(config)
     downloader = GitHubDownloader(console)
@@ -83,64 +217,297 @@ def index_github(github_url: str, target: Path, config: Path):
             indexer = IncrementalIndexer(config_obj, console)
             
             files = scanner.scan_directory(target)
-            if files:
-                result = indexer.index_files(files, force_reindex=True)
-                console.print(f"Indexed GitHub repo: {result['chunks_added']} chunks", style="green")
-            else:
-                console.print("No supported files found in repository", style="red")
+            try:
+                if files:
+                    result = indexer.index_files(files, force_reindex=True, stats=scanner.stats)
+                    console.print(f"Indexed GitHub repo: {result['chunks_added']} chunks", style="green")
+                else:
+                    console.print("No supported files found in repository", style="red")
+            finally:
+                indexer.close()
     finally:
         if target.exists() and target.name.startswith("code_rag_"):
             shutil.rmtree(target)
 
 @cli.command()
-@click.argument('query')
+@click.argument('query', required=False)
 @click.option('--limit', '-l', default=5, help='Number of results')
 @click.option('--config', type=click.Path(path_type=Path), help='Config file path')
 @click.option('--file-filter', help='Filter by file pattern (e.g., "*.py")')
-@click.option('--type-filter', help='Filter by chunk type (function, class, import)')
-def search(query: str, limit: int, config: Path, file_filter: str, type_filter: str):
+@click.option('--type-filter', help='Filter by chunk type (function, class, method, module, import) or type:name')
+@click.option('--language', help='Filter by language (python, javascript, typescript)')
+@click.option('--no-server', is_flag=True, help='Search in-process even if a query server is running')
+@click.option('--batch', type=click.Path(exists=True, dir_okay=False, path_type=Path),
+              help='Run every query in a JSONL file (one {"query": ...} or string per line)')
+@click.option('--output', type=click.Path(dir_okay=False, path_type=Path), help='JSONL file for --batch results')
+@click.option('--workers', type=int, help='Threads querying the store in --batch mode')
+@click.option('--profile', is_flag=True, help='Search in-process and report time per stage')
+@click.option('--profile-output', type=click.Path(path_type=Path),
+              help='Where --profile writes its JSON (default: search_profile.json in the index directory)')
+def search(query: str, limit: int, config: Path, file_filter: str, type_filter: str, language: str,
+           no_server: bool, batch: Path, output: Path, workers: int, profile: bool, profile_output: Path):
     """Search indexed code with optional filters"""
+    from .metrics import Metrics
+    from .server import QueryClient
     
     config_obj = CodeRAGConfig(config)
-    embedder = CodeEmbedder()
-    vector_store = VectorStore(config_obj.get("index_directory"))
+    
+    if batch:
+        if not output:
+            raise click.UsageError("--batch needs --output")
+        try:
+            _search_batch(config_obj, batch, output, limit, file_filter, type_filter, language,
+                          workers or config_obj.get("batch_search_workers", 4))
+        except ValueError as e:
+            console.print(str(e), style="red")
+        return
+    if not query:
+        raise click.UsageError("Give a QUERY or --batch")
+    
+    client = QueryClient(config_obj.get("server_host", "127.0.0.1"), config_obj.get("server_port", 8765))
+    metrics = Metrics()
     
     console.print(f"Searching for: [bold]{query}[/bold]")
     
-    query_embedding = embedder.embed_query(query)
-    results = vector_store.search(query_embedding, n_results=limit * 2)
-    
-    if file_filter or type_filter:
-        filtered_results = []
-        for result in results:
-            if file_filter and not Path(result.chunk.file_path).match(file_filter):
-                continue
-            if type_filter and not result.chunk.chunk_type.startswith(type_filter):
-                continue
-            filtered_results.append(result)
-        results = filtered_results[:limit]
-    else:
-        results = results[:limit]
+    try:
+        # A server's stage timings are its own, so a profiled search always runs here
+        if not no_server and not profile and client.is_available(config_obj.get("index_directory")):
+            results = client.search(query, n_results=limit, file_filter=file_filter,
+                                    type_filter=type_filter, language=language)
+        else:
+            results = _search_in_process(config_obj, query, limit, file_filter, type_filter, language, metrics)
+    except ValueError as e:
+        console.print(str(e), style="red")
+        return
     
     if not results:
         console.print("No results found", style="red")
-        return
     
     for i, result in enumerate(results, 1):
         console.print(f"\n[bold blue]Result {i}[/bold blue] (score: {result.score:.3f})")
         console.print(f"[dim]{result.chunk.file_path}:{result.chunk.start_line}-{result.chunk.end_line}[/dim]")
         console.print(f"[yellow]{result.chunk.chunk_type}[/yellow]")
         console.print(f"```\n{result.chunk.content}\n```")
+    
+    if profile:
+        snapshot = metrics.snapshot()
+        _print_profile(snapshot, profile_output or Path(config_obj.get("index_directory")) / "search_profile.json",
+                       title="Search Profile",
+                       caption="Answered from the result cache" if snapshot["counters"].get("result_cache_hits")
+                       else "The lexical query runs alongside the vector query, so shares overlap")
+
+def _search_in_process(config_obj: CodeRAGConfig, query: str, limit: int, file_filter: str,
+                       type_filter: str, language: str, metrics=None):
+    from .embedder import CodeEmbedder
+    from .metrics import Metrics
+    from .vector_store import VectorStore
+    
+    metrics = metrics if metrics is not None else Metrics()
+    with metrics.time("load"):
+        vector_store = VectorStore.from_config(config_obj)
+        # Before the cache lookup, so a changed model never gets results cached under the old one
+        vector_store.check_embedding_model(CodeEmbedder.configured_model_id(config_obj))
+        where = vector_store.build_where(file_filter, type_filter, language)
+    vector_store.metrics = metrics
+    
+    def embed_query():
+        # Only loaded when the results are not already cached. It embeds this one query and
+        # exits, so its query-vector cache never hits and its counts are not recorded.
+        with metrics.time("load"):
+            embedder = CodeEmbedder.from_config(config_obj)
+        with metrics.time("embed"):
+            return embedder.embed_query(query)
+    
+    try:
+        return vector_store.search(embed_query, n_results=limit, query_text=query,
+                                   lexical_weight=config_obj.get("lexical_weight", 0.5), where=where)
+    finally:
+        vector_store.result_cache.flush()
+
+def _search_batch(config_obj: CodeRAGConfig, batch: Path, output: Path, limit: int, file_filter: str,
+                  type_filter: str, language: str, workers: int):
+    """Answer every query in batch, writing each group's results to output as soon as it is done"""
+    import itertools
+    import json
+    import time
+    from .embedder import CodeEmbedder
+    from .server import result_to_dict
+    from .vector_store import VectorStore
+    
+    embedder = CodeEmbedder.from_config(config_obj)
+    vector_store = VectorStore.from_config(config_obj)
+    vector_store.check_embedding_model(embedder.model_id)
+    where = vector_store.build_where(file_filter, type_filter, language)
+    group_size = config_obj.get("batch_search_group_size", 256)
+    
+    def read_queries():
+        with open(batch, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                entry = {"query": entry} if isinstance(entry, str) else entry
+                entry.setdefault("id", line_number)
+                yield entry
+    
+    queries = read_queries()
+    timings = {"embed": 0.0, "search": 0.0}
+    total = 0
+    start = time.perf_counter()
+    with open(output, 'w', encoding='utf-8') as out:
+        while True:
+            group = list(itertools.islice(queries, group_size))
+            if not group:
+                break
+            texts = [entry["query"] for entry in group]
+            
+            step = time.perf_counter()
+            embeddings = embedder.embed_queries(texts)
+            timings["embed"] += time.perf_counter() - step
+            
+            step = time.perf_counter()
+            results = vector_store.search_many(embeddings, n_results=limit, query_texts=texts,
+                                               lexical_weight=config_obj.get("lexical_weight", 0.5),
+                                               where=where, workers=workers)
+            timings["search"] += time.perf_counter() - step
+            
+            for entry, query_results in zip(group, results):
+                record = {"id": entry["id"], "query": entry["query"],
+                          "results": [result_to_dict(result) for result in query_results]}
+                out.write(json.dumps(record) + "\n")
+            out.flush()
+            total += len(group)
+            console.print(f"{total} queries done", style="dim")
+    elapsed = time.perf_counter() - start
+    vector_store.result_cache.record("query_embeddings", embedder.query_cache_hits, embedder.query_cache_misses)
+    vector_store.result_cache.flush()
+    embedder.close()
+    
+    table = Table(title="Batch Search")
+    table.add_column("Stage")
+    table.add_column("Seconds", justify="right")
+    table.add_column("Queries/sec", justify="right")
+    for stage, seconds in (("embed", timings["embed"]), ("search", timings["search"]), ("total", elapsed)):
+        table.add_row(stage, f"{seconds:.2f}", f"{total / seconds:.1f}" if seconds else "-")
+    console.print(table)
+    console.print(f"Wrote {total} results to {output}", style="green")
+
+@cli.command()
+@click.argument('question')
+@click.option('--config', type=click.Path(path_type=Path), help='Config file path')
+@click.option('--file-filter', help='Filter by file pattern (e.g., "*.py")')
+@click.option('--type-filter', help='Filter by chunk type (function, class, method, module, import) or type:name')
+@click.option('--language', help='Filter by language (python, javascript, typescript)')
+@click.option('--max-tokens', type=int, help='Stop the answer after this many tokens')
+@click.option('--max-time', type=float, help='Stop the answer after this many seconds')
+@click.option('--no-server', is_flag=True, help='Answer in-process even if a query server is running')
+@click.option('--no-cache', is_flag=True, help='Generate a fresh answer instead of reusing a cached one')
+def ask(question: str, config: Path, file_filter: str, type_filter: str, language: str,
+        max_tokens: int, max_time: float, no_server: bool, no_cache: bool):
+    """Answer a question about the indexed code with a local model"""
+    from .server import QueryClient, result_from_dict
+    
+    config_obj = CodeRAGConfig(config)
+    if max_tokens is not None:
+        config_obj.set("answer_max_tokens", max_tokens)
+    if max_time is not None:
+        config_obj.set("answer_max_seconds", max_time)
+    if no_cache:
+        config_obj.set("answer_cache", False)
+    
+    client = QueryClient(config_obj.get("server_host", "127.0.0.1"), config_obj.get("server_port", 8765))
+    # The server's generator uses the server's own limits, so per-call overrides answer in-process
+    use_server = not (no_server or max_tokens or max_time or no_cache) \
+        and client.is_available(config_obj.get("index_directory"))
+    
+    try:
+        if use_server:
+            messages = client.ask(question, file_filter=file_filter, type_filter=type_filter, language=language)
+        else:
+            messages = _ask_in_process(config_obj, question, file_filter, type_filter, language)
+        
+        stats = {}
+        for message in messages:
+            if "sources" in message:
+                for data in message["sources"]:
+                    chunk = result_from_dict(data).chunk
+                    console.print(f"[dim]{chunk.file_path}:{chunk.start_line}-{chunk.end_line}[/dim]")
+                console.print()
+            elif "text" in message:
+                console.out(message["text"], end="", highlight=False)
+                console.file.flush()
+            elif "stats" in message:
+                stats = message["stats"]
+    except ValueError as e:
+        console.print(str(e), style="red")
+        return
+    except ImportError as e:
+        console.print(f"Answer generation needs transformers and torch: {e}", style="red")
+        return
+    except RuntimeError as e:
+        console.print(f"\n{e}", style="red")
+        return
+    
+    console.print()
+    if stats.get("cached"):
+        console.print("[dim](cached answer)[/dim]")
+    elif stats:
+        console.print(f"[dim]first token {stats['time_to_first_token']:.2f}s, {stats['tokens']} tokens, "
+                      f"{stats['tokens_per_second']:.1f} tokens/sec[/dim]")
+
+def _ask_in_process(config_obj: CodeRAGConfig, question: str, file_filter: str, type_filter: str, language: str):
+    """The same messages QueryServer.ask streams, produced in this process"""
+    from .answer_cache import AnswerCache
+    from .local_generator import LocalCodeQAGenerator
+    from .server import result_to_dict
+    
+    results = _search_in_process(config_obj, question, config_obj.get("answer_context_chunks", 5),
+                                 file_filter, type_filter, language)
+    yield {"sources": [result_to_dict(r) for r in results]}
+    
+    cache = AnswerCache(Path(config_obj.get("index_directory")), config_obj.get("answer_cache_size", 1000)) \
+        if config_obj.get("answer_cache", True) else None
+    generator = LocalCodeQAGenerator.from_config(config_obj, cache=cache)
+    for text in generator.stream_answer(question, results):
+        yield {"text": text}
+    yield {"stats": generator.last_stats}
+
+@cli.command()
+@click.option('--host', help='Address to listen on')
+@click.option('--port', type=int, help='Port to listen on')
+@click.option('--config', type=click.Path(path_type=Path), help='Config file path')
+def serve(host: str, port: int, config: Path):
+    """Run a query server that keeps the model and index loaded"""
+    from .server import QueryServer
+    
+    config_obj = CodeRAGConfig(config)
+    host = host or config_obj.get("server_host", "127.0.0.1")
+    port = port or config_obj.get("server_port", 8765)
+    
+    console.print("Loading embedding model and index...", style="blue")
+    try:
+        server = QueryServer(config_obj, host, port, console)
+    except ValueError as e:
+        console.print(str(e), style="red")
+        return
+    console.print(f"Serving {config_obj.get('index_directory')} on http://{host}:{port}", style="green")
+    
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        console.print("Shutting down", style="yellow")
 
 @cli.command()
 @click.option('--config', type=click.Path(path_type=Path), help='Config file path')
 def stats(config: Path):
     """Show detailed indexing statistics"""
+    from .vector_store import VectorStore
+    
     config_obj = CodeRAGConfig(config)
-    vector_store = VectorStore(config_obj.get("index_directory"))
+    vector_store = VectorStore.from_config(config_obj)
     
     try:
-        data = vector_store.collection.get()
+        data = vector_store.backend.get(include=["metadatas"])
         total_chunks = len(data['ids'])
         
         if total_chunks == 0:
@@ -169,6 +536,20 @@ def stats(config: Path):
         
         console.print(type_table)
         
+        cache_stats = vector_store.result_cache.stats()
+        if cache_stats:
+            cache_table = Table(title="Query Caches")
+            cache_table.add_column("Cache", style="cyan")
+            cache_table.add_column("Hits", justify="right")
+            cache_table.add_column("Misses", justify="right")
+            cache_table.add_column("Hit rate", justify="right")
+            for name, counts in cache_stats.items():
+                lookups = counts["hits"] + counts["misses"]
+                cache_table.add_row(name.replace("_", " "), str(counts["hits"]), str(counts["misses"]),
+                                    f"{counts['hits'] / lookups:.0%}" if lookups else "-")
+            console.print(cache_table)
+            console.print(f"[dim]Index generation {vector_store.result_cache.generation()}[/dim]")
+        
     except Exception as e:
         console.print(f"Error reading index: {e}", style="red")
 
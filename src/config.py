@@ -19,7 +19,56 @@ class CodeRAGConfig:
                 "dist/**"
             ],
             "max_file_size": 1048576,
-            "embedding_model": "all-MiniLM-L6-v2"
+            "use_gitignore": False,
+            "embedding_model": "all-MiniLM-L6-v2",
+            "embedding_backend": "sentence-transformers",
+            "embedding_memory_budget_mb": 256,
+            "embedding_max_batch_size": 128,
+            "embedding_workers": 1,
+            "max_chunk_tokens": 256,
+            "chunk_overlap_lines": 3,
+            "minified_files": "skip",
+            "minified_line_length": 1000,
+            "parse_workers": 0,
+            "parallel_parse_min_files": 64,
+            "hash_workers": 8,
+            "embed_batch_size": 256,
+            "max_inflight_batches": 4,
+            "embedding_cache": True,
+            "embedding_cache_size_mb": 512,
+            "watch_debounce_seconds": 1.0,
+            "watch_max_delay_seconds": 10.0,
+            "watch_poll_interval": 2.0,
+            "server_host": "127.0.0.1",
+            "server_port": 8765,
+            "server_max_batch_size": 64,
+            "server_batch_window_ms": 5.0,
+            "lexical_weight": 0.5,
+            "batch_search_workers": 4,
+            "batch_search_group_size": 256,
+            "vector_backend": "chroma",
+            "vector_dtype": "auto",
+            "ivf_lists": 0,
+            "ivf_probe": 8,
+            "vector_quantization": "none",
+            "pq_subvectors": 48,
+            "rerank_factor": 10,
+            "write_batch_size": 1000,
+            "write_retries": 3,
+            "max_pending_writes": 2,
+            "generator_model": "microsoft/DialoGPT-medium",
+            "answer_max_tokens": 128,
+            "answer_max_seconds": 30.0,
+            "answer_temperature": 0.7,
+            "answer_context_chunks": 5,
+            "answer_context_tokens": 768,
+            "answer_window_lines": 3,
+            "answer_cache": True,
+            "answer_cache_size": 1000,
+            "query_embedding_cache_size": 1024,
+            "query_result_cache": True,
+            "query_result_cache_size": 1000,
+            "metrics_file": ""
         }
         self.config = self.load_config()
     
@@ -0,0 +1,106 @@
+from typing import Callable, Dict, List, NamedTuple, Optional, Set
+from .models import SearchResult
+from .text_utils import estimate_tokens, lexical_terms
+
+# Question words that would otherwise match lines all over the code
+_STOP_WORDS = {"a", "an", "the", "how", "what", "where", "why", "which", "who", "when", "does", "do",
+               "is", "are", "was", "were", "in", "of", "to", "and", "or", "for", "this", "that", "it",
+               "with", "on", "by", "be", "can", "from", "as", "code", "i", "we", "you"}
+
+class ContextSection(NamedTuple):
+    """Lines of one file placed in the prompt; skipped stretches appear as '...'"""
+    file_path: str
+    start_line: int
+    end_line: int
+    text: str
+
+    def render(self) -> str:
+        return f"Code from {self.file_path} (lines {self.start_line}-{self.end_line}):\n{self.text}"
+
+class ContextPacker:
+    def __init__(self, count_tokens: Callable[[str], int] = estimate_tokens, budget_tokens: int = 768,
+                 window_lines: int = 3, min_section_tokens: int = 24):
+        """Fill a token budget with the most relevant lines of ranked search results.
+
+        count_tokens should be the generating model's tokenizer so that the
+        budget is exact; estimate_tokens is only an approximation.
+        """
+        self.count_tokens = count_tokens
+        self.budget_tokens = budget_tokens
+        self.window_lines = window_lines
+        self.min_section_tokens = min_section_tokens
+
+    def pack(self, question: str, results: List[SearchResult]) -> List[ContextSection]:
+        """Sections in rank order whose rendered text, joined by blank lines, fits budget_tokens.
+
+        Each chunk is cut down to windows of window_lines around the lines that
+        share terms with the question, plus its first line. Lines already taken
+        from an overlapping chunk of the same file are left out, and a section
+        that would overflow the budget is cut short, or dropped when too little
+        of the budget is left.
+        """
+        terms = {term for term in lexical_terms(question) if term not in _STOP_WORDS}
+        covered: Dict[str, Set[int]] = {}
+        separator = self.count_tokens("\n\n")
+        remaining = self.budget_tokens
+        sections = []
+
+        for result in results:
+            if remaining < self.min_section_tokens:
+                break
+            chunk = result.chunk
+            taken = covered.setdefault(chunk.file_path, set())
+            lines = chunk.content.split('\n')
+            numbers = [chunk.start_line + i for i in range(len(lines))]
+            keep = [i for i in self._relevant_lines(lines, terms) if numbers[i] not in taken]
+            if not keep:
+                continue
+
+            section = self._fit(chunk.file_path, lines, numbers, keep, remaining - (separator if sections else 0))
+            if section is None:
+                continue
+            sections.append(section)
+            remaining -= self.count_tokens(section.render()) + (separator if len(sections) > 1 else 0)
+            taken.update(numbers[i] for i in keep if numbers[i] <= section.end_line)
+        return sections
+
+    def render(self, sections: List[ContextSection]) -> str:
+        return "\n\n".join(section.render() for section in sections)
+
+    def _relevant_lines(self, lines: List[str], terms: Set[str]) -> List[int]:
+        """Indices of lines within window_lines of a line mentioning a question term, and line 0"""
+        hits = [i for i, line in enumerate(lines) if terms.intersection(lexical_terms(line))]
+        if not hits:
+            # Retrieved for its meaning rather than its words: keep it whole and let the budget cut it
+            return list(range(len(lines)))
+        keep = {0}
+        for i in hits:
+            keep.update(range(max(0, i - self.window_lines), min(len(lines), i + self.window_lines + 1)))
+        return sorted(keep)
+
+    def _fit(self, file_path: str, lines: List[str], numbers: List[int], keep: List[int],
+             budget: int) -> Optional[ContextSection]:
+        """The longest prefix of keep that renders within budget, if it is worth including"""
+        section = self._section(file_path, lines, numbers, keep)
+        if self.count_tokens(section.render()) <= budget:
+            return section
+
+        low, high = 0, len(keep) - 1  # longest fitting prefix length lies in [low, high]
+        while low < high:
+            middle = (low + high + 1) // 2
+            if self.count_tokens(self._section(file_path, lines, numbers, keep[:middle]).render()) <= budget:
+                low = middle
+            else:
+                high = middle - 1
+        if low == 0:
+            return None
+        section = self._section(file_path, lines, numbers, keep[:low])
+        return section if self.count_tokens(section.render()) >= self.min_section_tokens else None
+
+    def _section(self, file_path: str, lines: List[str], numbers: List[int], keep: List[int]) -> ContextSection:
+        parts = []
+        for position, i in enumerate(keep):
+            if position and i != keep[position - 1] + 1:
+                parts.append("...")
+            parts.append(lines[i])
+        return ContextSection(file_path, numbers[keep[0]], numbers[keep[-1]], "\n".join(parts))
@@ -1,12 +1,55 @@
-from sentence_transformers import SentenceTransformer
+import threading
+from collections import OrderedDict
 import numpy as np
-from typing import List
+from typing import List, Optional
 from .models import CodeChunk
+from .embedding_backends import backend_class, create_backend
+from .embedding_cache import EmbeddingCache
+from .embedding_scheduler import EmbeddingScheduler
 
 class CodeEmbedder:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", cache: Optional[EmbeddingCache] = None,
+                 backend: str = "sentence-transformers", memory_budget_mb: int = 256,
+                 max_batch_size: int = 128, workers: int = 1, query_cache_size: int = 1024):
         """Initialize the embedding model"""
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.backend = create_backend(backend, model_name)
+        self.cache = cache
+        self.scheduler = EmbeddingScheduler(
+            self.backend,
+            memory_budget_mb=memory_budget_mb,
+            max_batch_size=max_batch_size,
+            workers=workers
+        )
+        # Recently embedded query texts, most recently used last
+        self.query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.query_cache_size = query_cache_size
+        self.query_cache_lock = threading.Lock()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+    
+    @classmethod
+    def from_config(cls, config, cache: Optional[EmbeddingCache] = None) -> "CodeEmbedder":
+        return cls(
+            model_name=config.get("embedding_model", "all-MiniLM-L6-v2"),
+            cache=cache,
+            backend=config.get("embedding_backend", "sentence-transformers"),
+            memory_budget_mb=config.get("embedding_memory_budget_mb", 256),
+            max_batch_size=config.get("embedding_max_batch_size", 128),
+            workers=config.get("embedding_workers", 1),
+            query_cache_size=config.get("query_embedding_cache_size", 1024)
+        )
+    
+    @property
+    def model_id(self) -> str:
+        """Backend and model that produced these embeddings, as recorded in the index"""
+        return self.backend.model_id
+    
+    @staticmethod
+    def configured_model_id(config) -> str:
+        """model_id of the embedder from_config would build, without loading its model"""
+        return backend_class(config.get("embedding_backend", "sentence-transformers")).model_id_for(
+            config.get("embedding_model", "all-MiniLM-L6-v2"))
     
     def create_searchable_text(self, chunk: CodeChunk) -> str:
         """Create text optimized for semantic search"""
@@ -23,11 +66,70 @@ class CodeEmbedder:
         return " ".join(searchable_parts)
     
     def embed_chunks(self, chunks: List[CodeChunk]) -> np.ndarray:
-        """Generate embeddings for a list of code chunks"""
+        """Generate embeddings for a list of code chunks, encoding only cache misses"""
         searchable_texts = [self.create_searchable_text(chunk) for chunk in chunks]
-        embeddings = self.model.encode(searchable_texts)
-        return embeddings
+        if self.cache is None:
+            return self.scheduler.encode(searchable_texts)
+        
+        cached = self.cache.get_many(searchable_texts)
+        miss_indices = [i for i, embedding in enumerate(cached) if embedding is None]
+        
+        if miss_indices:
+            miss_texts = [searchable_texts[i] for i in miss_indices]
+            new_embeddings = self.scheduler.encode(miss_texts)
+            self.cache.put_many(miss_texts, new_embeddings)
+            for i, embedding in zip(miss_indices, new_embeddings):
+                cached[i] = embedding
+        
+        if not cached:
+            return np.zeros((0, self.backend.dimension), dtype=np.float32)
+        return np.vstack(cached).astype(np.float32)
+    
+    def close(self):
+        """Shut down embedding worker processes, if any were started"""
+        self.scheduler.close()
     
     def embed_query(self, query: str) -> np.ndarray:
-        """Generate embedding for a search query"""
-        return self.model.encode([query])[0]
\ No newline at end of file
+        """Generate embedding for a search query, reusing it if the query was seen recently"""
+        embedding = self._cached_queries([query])[0]
+        if embedding is None:
+            embedding = self.backend.encode([query])[0]
+            self._remember_queries([query], [embedding])
+        return embedding
+    
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """Generate embeddings for several search queries in length-sorted batches; recent ones are reused"""
+        embeddings = self._cached_queries(queries)
+        miss_indices = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        if miss_indices:
+            miss_texts = [queries[i] for i in miss_indices]
+            new_embeddings = self.scheduler.encode(miss_texts)
+            self._remember_queries(miss_texts, new_embeddings)
+            for i, embedding in zip(miss_indices, new_embeddings):
+                embeddings[i] = embedding
+        if not embeddings:
+            return np.zeros((0, self.backend.dimension), dtype=np.float32)
+        return np.vstack(embeddings).astype(np.float32)
+    
+    def _cached_queries(self, queries: List[str]) -> List[Optional[np.ndarray]]:
+        with self.query_cache_lock:
+            embeddings = []
+            for query in queries:
+                embedding = self.query_cache.get(query)
+                if embedding is None:
+                    self.query_cache_misses += 1
+                else:
+                    self.query_cache.move_to_end(query)
+                    self.query_cache_hits += 1
+                embeddings.append(embedding)
+            return embeddings
+    
+    def _remember_queries(self, queries: List[str], embeddings):
+        if self.query_cache_size <= 0:
+            return
+        with self.query_cache_lock:
+            for query, embedding in zip(queries, embeddings):
+                self.query_cache[query] = embedding
+                self.query_cache.move_to_end(query)
+            while len(self.query_cache) > self.query_cache_size:
+                self.query_cache.popitem(last=False)
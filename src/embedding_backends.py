@@ -0,0 +1,140 @@
+import hashlib
+import re
+from abc import ABC, abstractmethod
+from typing import Dict, List, Type
+import numpy as np
+from .text_utils import estimate_tokens_many
+
+class EmbeddingBackend(ABC):
+    """Turns a list of texts into a float32 matrix, one L2-comparable row per text"""
+    name = "base"
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+
+    @property
+    def model_id(self) -> str:
+        """Identifies the vectors this backend produces; recorded in the index"""
+        return self.model_id_for(self.model_name)
+
+    @classmethod
+    def model_id_for(cls, model_name: str) -> str:
+        """model_id of this backend for model_name, known without loading the model"""
+        return f"{cls.name}:{model_name}"
+
+    @property
+    @abstractmethod
+    def dimension(self) -> int:
+        """Length of every embedding"""
+
+    @abstractmethod
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        """Embed texts as a (len(texts), dimension) float32 array"""
+
+    @property
+    def max_sequence_length(self) -> int:
+        """Longer inputs are truncated by the model"""
+        return 512
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        """Sequence length each text will occupy in a batch"""
+        return [min(length, self.max_sequence_length) for length in estimate_tokens_many(texts)]
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str):
+        super().__init__(model_name)
+        self.model = self.load_model(model_name)
+
+    def load_model(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(model_name, device="cpu")
+
+    @property
+    def dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        return np.asarray(self.model.encode(texts, batch_size=batch_size), dtype=np.float32)
+
+    @property
+    def max_sequence_length(self) -> int:
+        return self.model.max_seq_length or 512
+
+    def count_tokens(self, texts: List[str]) -> List[int]:
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return super().count_tokens(texts)
+        encoded = tokenizer(texts, add_special_tokens=True, truncation=True,
+                            max_length=self.max_sequence_length)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+class QuantizedBackend(SentenceTransformerBackend):
+    """Sentence-transformers model with int8 dynamically quantized Linear layers"""
+    name = "quantized"
+
+    def load_model(self, model_name: str):
+        import torch
+        model = super().load_model(model_name)
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+class OnnxBackend(SentenceTransformerBackend):
+    """Sentence-transformers model executed by ONNX Runtime (needs sentence-transformers>=3.2 and optimum)"""
+    name = "onnx"
+
+    def load_model(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        try:
+            return SentenceTransformer(model_name, device="cpu", backend="onnx")
+        except TypeError:
+            raise RuntimeError("The onnx embedding backend requires sentence-transformers>=3.2")
+
+class HashingBackend(EmbeddingBackend):
+    """Deterministic feature-hashing embedder with no model download, for tests and benchmarks"""
+    name = "hashing"
+    token_pattern = re.compile(r'[A-Za-z_][A-Za-z0-9_]*|\d+')
+    default_dimension = 384
+
+    def __init__(self, model_name: str, dimension: int = default_dimension):
+        super().__init__(model_name)
+        self._dimension = dimension
+
+    @property
+    def model_id(self) -> str:
+        return f"{self.name}:{self._dimension}"
+
+    @classmethod
+    def model_id_for(cls, model_name: str) -> str:
+        return f"{cls.name}:{cls.default_dimension}"
+
+    @property
+    def dimension(self) -> int:
+        return self._dimension
+
+    def encode(self, texts: List[str], batch_size: int = 32) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self._dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in self.token_pattern.findall(text.lower()):
+                digest = hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest()
+                value = int.from_bytes(digest, 'little')
+                embeddings[row, value % self._dimension] += 1.0 if value & (1 << 63) else -1.0
+            norm = np.linalg.norm(embeddings[row])
+            if norm > 0:
+                embeddings[row] /= norm
+        return embeddings
+
+BACKENDS: Dict[str, Type[EmbeddingBackend]] = {
+    backend.name: backend
+    for backend in (SentenceTransformerBackend, QuantizedBackend, OnnxBackend, HashingBackend)
+}
+
+def create_backend(name: str, model_name: str) -> EmbeddingBackend:
+    return backend_class(name)(model_name)
+
+def backend_class(name: str) -> Type[EmbeddingBackend]:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedding backend '{name}', expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[name]
@@ -0,0 +1,162 @@
+import hashlib
+import re
+from collections import OrderedDict
+from contextlib import nullcontext
+from pathlib import Path
+from typing import List, Optional
+import numpy as np
+from .file_lock import file_lock
+
+class EmbeddingCache:
+    """Persistent LRU cache of embeddings keyed by a hash of the embedded text.
+
+    Vectors live in an mmap-backed float32 file, one row per slot, and keys.bin
+    holds the text digest each slot was written for. The key index (digest ->
+    slot, in LRU order) is kept in memory and written on flush(). Processes
+    sharing a cache allocate slots independently, so a slot is only served when
+    its stored digest still matches; reads and writes hold a file lock so a
+    vector is never seen half written. Each model gets its own directory, so
+    entries from different models never mix.
+    """
+
+    def __init__(self, cache_root: Path, model_name: str, max_size_mb: int = 512):
+        self.cache_dir = Path(cache_root) / re.sub(r'[^\w.-]+', '_', model_name)
+        self.model_name = model_name
+        self.max_size_mb = max_size_mb
+        self.vectors_file = self.cache_dir / "vectors.f32"
+        self.index_file = self.cache_dir / "index.npz"
+        self.keys_file = self.cache_dir / "keys.bin"
+        self.lock_file = self.cache_dir / "cache.lock"
+        self.dimension = None
+        self.capacity = 0
+        self.vectors = None
+        self.slot_keys = None
+        self.slots = OrderedDict()
+        self.free_slots = []
+        self.hits = 0
+        self.misses = 0
+        self.load()
+
+    @property
+    def max_entries(self) -> int:
+        if not self.dimension:
+            return 0
+        return max(1, (self.max_size_mb * 1024 * 1024) // (self.dimension * 4))
+
+    def make_key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self.model_name}\0{text}".encode('utf-8'), digest_size=16).digest()
+
+    def load(self):
+        if not (self.index_file.exists() and self.vectors_file.exists()):
+            return
+        with file_lock(self.lock_file):
+            try:
+                index = np.load(self.index_file)
+                dimension = int(index['dimension'])
+                capacity = self.vectors_file.stat().st_size // (dimension * 4)
+                keys, slots = index['keys'], index['slots']
+                if len(keys) and int(slots.max()) >= capacity:
+                    raise ValueError("index refers to slots beyond the vector file")
+            except Exception as e:
+                print(f"Ignoring unreadable embedding cache: {e}")
+                return
+
+            self.dimension = dimension
+            self.capacity = capacity
+            missing_keys = not self.keys_file.exists()
+            self._open_files(capacity)
+            if missing_keys:
+                # Written before slot keys were stored: trust the index this once
+                self.slot_keys[slots] = np.frombuffer(keys.astype('S16').tobytes(), np.uint8).reshape(-1, 16)
+        # 'S16' drops trailing zero bytes, which the full digests keep
+        self.slots = OrderedDict(zip((key.ljust(16, b'\0') for key in keys.tolist()), slots.tolist()))
+        used = set(self.slots.values())
+        self.free_slots = [slot for slot in range(capacity) if slot not in used]
+
+    def flush(self):
+        if self.vectors is None:
+            return
+        with file_lock(self.lock_file):
+            self.vectors.flush()
+            self.slot_keys.flush()
+            tmp_file = self.index_file.with_suffix('.tmp.npz')
+            np.savez(
+                tmp_file,
+                dimension=np.int64(self.dimension),
+                keys=np.array(list(self.slots.keys()), dtype='S16'),
+                slots=np.array(list(self.slots.values()), dtype=np.int64)
+            )
+            tmp_file.replace(self.index_file)
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Return a cached vector for each text, or None on a miss"""
+        results = []
+        with file_lock(self.lock_file, shared=True) if self.vectors is not None else nullcontext():
+            for text in texts:
+                key = self.make_key(text)
+                slot = self.slots.get(key)
+                if slot is not None and self.slot_keys[slot].tobytes() != key:
+                    # Another process reused the slot; take over its entry instead
+                    del self.slots[key]
+                    self.slots.setdefault(self.slot_keys[slot].tobytes(), slot)
+                    slot = None
+                if slot is None:
+                    self.misses += 1
+                    results.append(None)
+                else:
+                    self.hits += 1
+                    self.slots.move_to_end(key)
+                    results.append(np.array(self.vectors[slot]))
+        return results
+
+    def put_many(self, texts: List[str], embeddings: np.ndarray):
+        if len(texts) == 0:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.dimension is None:
+            self.dimension = embeddings.shape[1]
+        elif embeddings.shape[1] != self.dimension:
+            return
+
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.lock_file):
+            for text, embedding in zip(texts, embeddings):
+                key = self.make_key(text)
+                slot = self.slots.get(key)
+                if slot is None:
+                    slot = self._allocate_slot()
+                self.slots[key] = slot
+                self.slots.move_to_end(key)
+                # Clear the key first, so a crash mid-write leaves a miss rather than a wrong vector
+                self.slot_keys[slot] = 0
+                self.vectors[slot] = embedding
+                self.slot_keys[slot] = np.frombuffer(key, np.uint8)
+
+    def _allocate_slot(self) -> int:
+        if not self.free_slots:
+            if self.capacity < self.max_entries:
+                self._grow(min(max(self.capacity * 2, 1024), self.max_entries))
+            else:
+                _, slot = self.slots.popitem(last=False)
+                return slot
+        return self.free_slots.pop()
+
+    def _grow(self, new_capacity: int):
+        if self.vectors is not None:
+            self.vectors.flush()
+            self.slot_keys.flush()
+            self.vectors = self.slot_keys = None
+        self._open_files(new_capacity)
+        self.free_slots.extend(reversed(range(self.capacity, new_capacity)))
+        self.capacity = new_capacity
+
+    def _open_files(self, capacity: int):
+        """Map the vector and key files, extending them (never shrinking) to hold capacity slots"""
+        for path, row_bytes in ((self.vectors_file, self.dimension * 4), (self.keys_file, 16)):
+            with open(path, 'ab') as f:
+                # Another process may already have grown the file further
+                if f.tell() < capacity * row_bytes:
+                    f.truncate(capacity * row_bytes)
+        self.vectors = np.memmap(self.vectors_file, dtype=np.float32, mode='r+',
+                                 shape=(capacity, self.dimension))
+        self.slot_keys = np.memmap(self.keys_file, dtype=np.uint8, mode='r+', shape=(capacity, 16))
@@ -0,0 +1,101 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+import numpy as np
+from .embedding_backends import EmbeddingBackend, create_backend
+
+_worker_backend = None
+
+def _init_worker(backend_name: str, model_name: str, threads: int):
+    global _worker_backend
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    _worker_backend = create_backend(backend_name, model_name)
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    return _worker_backend.encode(texts, batch_size=len(texts))
+
+class EmbeddingScheduler:
+    # Rough activation memory per padded token for a MiniLM-sized encoder on CPU
+    # (hidden states, attention scores and FFN intermediates across all layers)
+    bytes_per_token = 48 * 1024
+
+    def __init__(self, backend: EmbeddingBackend, memory_budget_mb: int = 256,
+                 max_batch_size: int = 128, workers: int = 1):
+        """Sort texts by token length and encode them in padding-friendly batches"""
+        self.backend = backend
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_tokens = max(1, memory_budget_mb * 1024 * 1024 // self.bytes_per_token)
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self.stats = {'texts': 0, 'batches': 0, 'seconds': 0.0, 'tokens': 0, 'padded_tokens': 0}
+
+    def plan_batches(self, lengths: List[int]) -> List[List[int]]:
+        """Group text indices into batches whose padded size fits the token budget"""
+        order = sorted(range(len(lengths)), key=lengths.__getitem__)
+        batches = []
+        batch = []
+        for index in order:
+            # Lengths ascend, so the new item sets the padded length of the batch
+            padded = (len(batch) + 1) * max(lengths[index], 1)
+            if batch and (len(batch) >= self.max_batch_size or padded > self.max_batch_tokens):
+                batches.append(batch)
+                batch = []
+            batch.append(index)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.backend.dimension), dtype=np.float32)
+
+        start = time.perf_counter()
+        lengths = self.backend.count_tokens(texts)
+        batches = self.plan_batches(lengths)
+        batch_texts = [[texts[i] for i in batch] for batch in batches]
+
+        if self.workers > 1 and len(batches) > 1:
+            results = self._get_pool().map(_encode_in_worker, batch_texts)
+        else:
+            results = (self.backend.encode(group, batch_size=len(group)) for group in batch_texts)
+
+        embeddings = np.zeros((len(texts), self.backend.dimension), dtype=np.float32)
+        for batch, batch_embeddings in zip(batches, results):
+            embeddings[batch] = batch_embeddings
+
+        self.stats['texts'] += len(texts)
+        self.stats['batches'] += len(batches)
+        self.stats['seconds'] += time.perf_counter() - start
+        self.stats['tokens'] += sum(lengths)
+        self.stats['padded_tokens'] += sum(len(batch) * max(lengths[i] for i in batch) for batch in batches)
+        return embeddings
+
+    def summary(self) -> Dict[str, float]:
+        seconds = self.stats['seconds']
+        padded = self.stats['padded_tokens']
+        return {
+            'texts': self.stats['texts'],
+            'batches': self.stats['batches'],
+            'texts_per_second': self.stats['texts'] / seconds if seconds else 0.0,
+            'padding_efficiency': self.stats['tokens'] / padded if padded else 1.0
+        }
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self.pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.workers)
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(self.backend.name, self.backend.model_name, threads)
+            )
+        return self.pool
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
@@ -0,0 +1,24 @@
+from contextlib import contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False):
+    """Hold an advisory lock on path for the block, shared or exclusive.
+
+    The lock is tied to its own open file, so it also excludes other threads of
+    this process; callers must not nest it. Without fcntl it is a no-op.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(path, 'ab') as f:
+        fcntl.flock(f, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
@@ -1,54 +1,257 @@
 from pathlib import Path
-from typing import List, Iterator
-import fnmatch
+from typing import Dict, List, Optional, Tuple
+import os
+import re
 from .config import CodeRAGConfig
 
+def glob_to_regex(pattern: str) -> str:
+    """Translate a gitignore-style glob: '*' and '?' stay within one path segment, '**' spans segments"""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            regex.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            regex.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            regex.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 1:]:
+            end = pattern.index(']', i + 1)
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            regex.append(f'[{body}]')
+            i = end + 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(regex)
+
+class PathMatcher:
+    """Ordered ignore rules compiled into as few regexes as possible.
+
+    Consecutive rules with the same (negated, directory-only) flags share one
+    alternation, so a rule set without negations costs at most two regex
+    searches per path. The last matching rule wins, as in .gitignore.
+    """
+
+    def __init__(self, patterns: List[str], anchored_by_default: bool = False):
+        groups: List[Tuple[bool, bool, List[str]]] = []
+        for raw in patterns:
+            pattern = raw.strip()
+            if not pattern or pattern.startswith('#'):
+                continue
+
+            negate = pattern.startswith('!')
+            if negate:
+                pattern = pattern[1:]
+            if pattern.endswith('/**'):
+                pattern = pattern[:-3] + '/'
+            dir_only = pattern.endswith('/')
+            pattern = pattern.rstrip('/')
+            if not pattern:
+                continue
+
+            anchored = pattern.startswith('/') or (anchored_by_default and '/' in pattern)
+            regex = glob_to_regex(pattern.lstrip('/'))
+            regex = regex if anchored else f'(?:.*/)?{regex}'
+
+            if groups and groups[-1][0] == negate and groups[-1][1] == dir_only:
+                groups[-1][2].append(regex)
+            else:
+                groups.append((negate, dir_only, [regex]))
+
+        self.groups = [
+            (negate, dir_only, re.compile(f"(?:{'|'.join(regexes)})$"))
+            for negate, dir_only, regexes in groups
+        ]
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """True if ignored, False if explicitly re-included, None if no rule applies"""
+        for negate, dir_only, regex in reversed(self.groups):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                return not negate
+        return None
+
 class FileScanner:
     def __init__(self, config: CodeRAGConfig):
         self.config = config
-    
-    def scan_directory(self, directory: Path) -> List[Path]:
+        self.max_file_size = config.get("max_file_size", 1048576)
+        self.use_gitignore = config.get("use_gitignore", False)
+        self.include_regex = re.compile('|'.join(
+            f'(?:{glob_to_regex(pattern)})' for pattern in config.get("file_patterns", ["*.py"])
+        ) + '$')
+        self.ignore_matcher = PathMatcher(config.get("ignore_patterns", []))
+        # stat results from the last scan, keyed by str(path), reused by get_file_stats and the indexer
+        self.stats: Dict[str, os.stat_result] = {}
+        # Parsed .gitignore per directory (None if it has none); reset by every scan
+        self.gitignore_cache: Dict[str, Optional[PathMatcher]] = {}
+
+    def scan_directory(self, directory: Path, root: Optional[Path] = None) -> List[Path]:
+        """Walk the tree once, pruning ignored directories before descending into them.
+
+        root, if given, is the directory ignore rules are relative to when only a
+        subtree of it is being scanned.
+        """
         files = []
-        
-        for pattern in self.config.get("file_patterns", ["*.py"]):
-            files.extend(directory.rglob(pattern))
-        
-        filtered_files = []
-        for file_path in files:
-            if self.should_include_file(file_path):
-                filtered_files.append(file_path)
-        
-        return filtered_files
-    
+        self.stats = {}
+        self.gitignore_cache = {}
+
+        rel_dir = self._relative_dir(directory, root)
+        # Each stack entry: (directory path, path relative to the root, active gitignore matchers)
+        stack = [(str(directory), rel_dir, self._gitignores_for(directory, root))]
+        while stack:
+            dir_path, rel_dir, gitignores = stack.pop()
+            try:
+                entries = list(os.scandir(dir_path))
+            except OSError:
+                continue
+
+            for entry in sorted(entries, key=lambda e: e.name):
+                rel_path = f"{rel_dir}{entry.name}"
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=False)
+                except OSError:
+                    continue
+
+                if self._is_ignored(rel_path, is_dir, gitignores):
+                    continue
+
+                if is_dir:
+                    stack.append((entry.path, rel_path + '/', self._gitignore_matchers(entry.path, rel_path + '/', gitignores)))
+                    continue
+
+                if not self.include_regex.match(entry.name):
+                    continue
+
+                try:
+                    if not entry.is_file():
+                        continue
+                    stat = entry.stat()
+                except OSError:
+                    continue
+
+                if stat.st_size > self.max_file_size:
+                    continue
+
+                file_path = Path(entry.path)
+                self.stats[str(file_path)] = stat
+                files.append(file_path)
+
+        return files
+
+    def _gitignore_matchers(self, dir_path: str, rel_dir: str, parent: List[Tuple[str, PathMatcher]]) -> List[Tuple[str, PathMatcher]]:
+        if not self.use_gitignore:
+            return parent
+        if dir_path not in self.gitignore_cache:
+            try:
+                with open(os.path.join(dir_path, '.gitignore'), 'r', encoding='utf-8', errors='replace') as f:
+                    self.gitignore_cache[dir_path] = PathMatcher(f.read().splitlines(), anchored_by_default=True)
+            except OSError:
+                self.gitignore_cache[dir_path] = None
+        matcher = self.gitignore_cache[dir_path]
+        return parent if matcher is None else parent + [(rel_dir, matcher)]
+
+    def _is_ignored(self, rel_path: str, is_dir: bool, gitignores: List[Tuple[str, PathMatcher]]) -> bool:
+        # Deeper .gitignore files take precedence over shallower ones and over the config
+        for base, matcher in reversed(gitignores):
+            result = matcher.match(rel_path[len(base):], is_dir)
+            if result is not None:
+                return result
+        return bool(self.ignore_matcher.match(rel_path, is_dir))
+
+    def _relative_dir(self, directory: Path, root: Optional[Path]) -> str:
+        if root is None:
+            return ''
+        rel = Path(os.path.relpath(directory, root)).as_posix()
+        return '' if rel == '.' else rel + '/'
+
+    def _gitignores_for(self, directory: Path, root: Optional[Path]) -> List[Tuple[str, PathMatcher]]:
+        """Gitignore matchers that apply inside directory: those of root and every directory down to it"""
+        root = root if root is not None else directory
+        matchers = self._gitignore_matchers(str(root), '', [])
+        rel_dir = self._relative_dir(directory, root)
+        current, rel = Path(root), ''
+        for part in [p for p in rel_dir.split('/') if p]:
+            current, rel = current / part, f"{rel}{part}/"
+            matchers = self._gitignore_matchers(str(current), rel, matchers)
+        return matchers
+
+    def is_ignored_path(self, path: Path, root: Path, is_dir: bool) -> bool:
+        """Whether path, or any directory between root and it, is ignored"""
+        rel_path = Path(os.path.relpath(path, root)).as_posix()
+        if rel_path.startswith('..'):
+            return True
+        if rel_path == '.':
+            return False
+
+        parts = rel_path.split('/')
+        for i in range(1, len(parts) + 1):
+            part_is_dir = is_dir if i == len(parts) else True
+            parent = root / '/'.join(parts[:i - 1]) if i > 1 else root
+            gitignores = self._gitignores_for(parent, root)
+            if self._is_ignored('/'.join(parts[:i]), part_is_dir, gitignores):
+                return True
+        return False
+
+    def accepts(self, file_path: Path, root: Path) -> bool:
+        """Whether a scan of root would return file_path; records its stat for the indexer"""
+        if not self.include_regex.match(file_path.name):
+            return False
+        if self.is_ignored_path(file_path, root, is_dir=False):
+            return False
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return False
+        if not file_path.is_file() or stat.st_size > self.max_file_size:
+            return False
+        self.stats[str(file_path)] = stat
+        return True
+
     def should_include_file(self, file_path: Path) -> bool:
-        file_str = str(file_path)
-        
-        for pattern in self.config.get("ignore_patterns", []):
-            if fnmatch.fnmatch(file_str, pattern):
+        rel_path = file_path.as_posix()
+
+        if self.ignore_matcher.match(rel_path, False):
+            return False
+        parts = rel_path.split('/')
+        for i in range(1, len(parts)):
+            if self.ignore_matcher.match('/'.join(parts[:i]), True):
                 return False
-        
+
         try:
-            if file_path.stat().st_size > self.config.get("max_file_size", 1048576):
+            if file_path.stat().st_size > self.max_file_size:
                 return False
         except OSError:
             return False
-        
+
         return True
-    
+
     def get_file_stats(self, files: List[Path]) -> dict:
         stats = {
             "total_files": len(files),
             "by_extension": {},
             "total_size": 0
         }
-        
+
         for file_path in files:
             ext = file_path.suffix.lower()
             stats["by_extension"][ext] = stats["by_extension"].get(ext, 0) + 1
-            
-            try:
-                stats["total_size"] += file_path.stat().st_size
-            except OSError:
-                pass
-        
-        return stats
\ No newline at end of file
+
+            stat = self.stats.get(str(file_path))
+            if stat is None:
+                try:
+                    stat = file_path.stat()
+                except OSError:
+                    continue
+            stats["total_size"] += stat.st_size
+
+        return stats
@@ -1,92 +1,277 @@
+import bisect
 import hashlib
-import json
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Set, Optional
 from .models import CodeChunk
-from .tree_parser import AdvancedCodeParser
+from .parse_pool import ParallelParser
 from .embedder import CodeEmbedder
+from .embedding_cache import EmbeddingCache
+from .metadata_store import FileState, IndexMetadataStore
+from .metrics import Metrics
 from .vector_store import VectorStore
 
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+HASH_ALGORITHM = "xxh3" if xxhash is not None else "blake2b"
+
+def hash_file(file_path: Path, algorithm: str = HASH_ALGORITHM) -> str:
+    """Hash file contents in 1 MB blocks; the result is prefixed with the algorithm name"""
+    if algorithm == "xxh3" and xxhash is not None:
+        hasher = xxhash.xxh3_128()
+    elif algorithm == "md5":
+        hasher = hashlib.md5()
+    else:
+        algorithm = "blake2b"
+        hasher = hashlib.blake2b(digest_size=16)
+    
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            hasher.update(block)
+    
+    # Indexes written before hashes were prefixed stored bare MD5 digests
+    if algorithm == "md5":
+        return hasher.hexdigest()
+    return f"{algorithm}:{hasher.hexdigest()}"
+
+def hash_algorithm_of(file_hash: str) -> str:
+    return file_hash.split(':', 1)[0] if ':' in file_hash else "md5"
+
 class IncrementalIndexer:
-    def __init__(self, config, console=None):
+    def __init__(self, config, console=None, verbose: bool = False, metrics: Optional[Metrics] = None):
         self.config = config
         self.console = console
-        self.parser = AdvancedCodeParser()
-        self.embedder = CodeEmbedder()
-        self.vector_store = VectorStore(config.get("index_directory"))
-        self.metadata_file = Path(config.get("index_directory")) / "metadata.json"
-        self.file_hashes = self.load_metadata()
-    
-    def load_metadata(self) -> Dict[str, str]:
-        if self.metadata_file.exists():
-            try:
-                with open(self.metadata_file, 'r') as f:
-                    return json.load(f)
-            except:
-                return {}
-        return {}
-    
-    def save_metadata(self):
-        self.metadata_file.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.metadata_file, 'w') as f:
-            json.dump(self.file_hashes, f, indent=2)
-    
-    def get_file_hash(self, file_path: Path) -> str:
+        self.verbose = verbose
+        # Stage timings and counters of every run, see Metrics.snapshot
+        self.metrics = metrics or Metrics()
+        self.parser = ParallelParser(
+            workers=config.get("parse_workers", 0),
+            min_files_for_pool=config.get("parallel_parse_min_files", 64),
+            parser_options={
+                'max_chunk_tokens': config.get("max_chunk_tokens", 256),
+                'overlap_lines': config.get("chunk_overlap_lines", 3),
+                'minified_files': config.get("minified_files", "skip"),
+                'minified_line_length': config.get("minified_line_length", 1000)
+            }
+        )
+        self.parser.metrics = self.metrics
+        self.embedder = CodeEmbedder.from_config(config)
+        self.embedder.cache = self.create_embedding_cache(self.embedder.model_id)
+        self.vector_store = VectorStore.from_config(config)
+        self.metadata = IndexMetadataStore(Path(config.get("index_directory")))
+        self.file_states = self.metadata.get_all_files()
+    
+    def close(self):
+        """Shut down the embedding worker processes, which stay up between runs (e.g. in watch)"""
+        self.embedder.close()
+    
+    def create_embedding_cache(self, model_id: str) -> Optional[EmbeddingCache]:
+        if not self.config.get("embedding_cache", True):
+            return None
+        return EmbeddingCache(
+            Path(self.config.get("index_directory")) / "embedding_cache",
+            model_id,
+            max_size_mb=self.config.get("embedding_cache_size_mb", 512)
+        )
+    
+    def get_stored_chunk_ids(self, file_paths: List[str]) -> Dict[str, List[str]]:
+        """Chunk ids stored for each file, from the manifest or a metadata-filtered lookup"""
+        stored = self.metadata.get_chunk_ids(file_paths)
+        missing = [f for f in file_paths if f not in stored]
+        if missing:
+            # Files indexed before the manifest existed
+            stored.update(self.vector_store.get_ids_for_files(missing))
+        return stored
+    
+    def get_file_hash(self, file_path: Path, algorithm: str = HASH_ALGORITHM) -> str:
         try:
-            content = file_path.read_bytes()
-            return hashlib.md5(content).hexdigest()
-        except:
+            return hash_file(file_path, algorithm)
+        except OSError:
             return ""
     
-    def get_changed_files(self, files: List[Path]) -> Dict[str, List[Path]]:
+    def get_file_state(self, file_path: Path, stat: Optional[os.stat_result] = None) -> Optional[FileState]:
+        try:
+            stat = stat or file_path.stat()
+        except OSError:
+            return None
+        return FileState(stat.st_mtime_ns, stat.st_size, stat.st_ino, self.get_file_hash(file_path))
+    
+    def get_changed_files(self, files: List[Path],
+                          stats: Optional[Dict[str, os.stat_result]] = None,
+                          detect_removed: bool = True) -> Dict[str, List[Path]]:
+        """Compare files against stored state without committing anything.
+        
+        Files whose (mtime_ns, size, inode) match the stored state are unchanged
+        without being read. The rest are hashed in parallel threads; new states
+        are returned under 'states' and only committed once the file's chunks
+        have been stored.
+        """
         changed = []
         removed = []
         unchanged = []
+        states = {}
+        refreshed = {}
+        to_hash = []
         
         current_files = {str(f): f for f in files}
         
         for file_str, file_path in current_files.items():
-            current_hash = self.get_file_hash(file_path)
-            if file_str not in self.file_hashes or self.file_hashes[file_str] != current_hash:
-                changed.append(file_path)
-                self.file_hashes[file_str] = current_hash
+            stat = stats.get(file_str) if stats else None
+            if stat is None:
+                try:
+                    stat = file_path.stat()
+                except OSError:
+                    continue
+            
+            previous = self.file_states.get(file_str)
+            if (previous is not None and previous.mtime_ns == stat.st_mtime_ns
+                    and previous.size == stat.st_size and previous.inode == stat.st_ino):
+                unchanged.append(file_path)
             else:
+                to_hash.append((file_str, file_path, stat, previous))
+        
+        with self.metrics.time("hash"), \
+                ThreadPoolExecutor(max_workers=max(1, self.config.get("hash_workers", 8))) as executor:
+            hashes = list(executor.map(lambda item: self.get_file_hash(item[1]), to_hash))
+        self.metrics.add("files_hashed", len(to_hash))
+        self.metrics.add("bytes_hashed", sum(stat.st_size for _, _, stat, _ in to_hash))
+        
+        for (file_str, file_path, stat, previous), file_hash in zip(to_hash, hashes):
+            state = FileState(stat.st_mtime_ns, stat.st_size, stat.st_ino, file_hash)
+            if previous is not None and hash_algorithm_of(previous.hash) != HASH_ALGORITHM:
+                # Stored with another algorithm: compare like with like, then upgrade
+                same = self.get_file_hash(file_path, hash_algorithm_of(previous.hash)) == previous.hash
+            else:
+                same = previous is not None and previous.hash == file_hash
+            
+            if same and file_hash:
                 unchanged.append(file_path)
+                refreshed[file_str] = state
+            else:
+                changed.append(file_path)
+                states[file_str] = state
+        
+        # Content is unchanged, so recording the new stat info right away is safe
+        self.metadata.update_states(refreshed)
+        self.file_states.update(refreshed)
         
-        for file_str in list(self.file_hashes.keys()):
-            if file_str not in current_files:
-                removed.append(file_str)
-                del self.file_hashes[file_str]
+        if detect_removed:
+            for file_str in self.file_states:
+                if file_str not in current_files:
+                    removed.append(file_str)
         
         return {
             'changed': changed,
             'removed': removed,
-            'unchanged': unchanged
+            'unchanged': unchanged,
+            'states': states
         }
     
     def remove_chunks_for_files(self, file_paths: List[str]):
         try:
-            existing_data = self.vector_store.collection.get()
-            ids_to_remove = []
-            
-            for i, metadata in enumerate(existing_data['metadatas']):
-                if metadata.get('file_path') in file_paths:
-                    ids_to_remove.append(existing_data['ids'][i])
+            stored = self.get_stored_chunk_ids(file_paths)
+            ids_to_remove = [chunk_id for ids in stored.values() for chunk_id in ids]
             
             if ids_to_remove:
-                self.vector_store.collection.delete(ids=ids_to_remove)
+                self.vector_store.delete_ids(ids_to_remove)
                 if self.console:
                     self.console.print(f"Removed {len(ids_to_remove)} chunks from deleted files")
+            
+            self.metadata.remove_files(file_paths)
+            for file_path in file_paths:
+                self.file_states.pop(file_path, None)
         except Exception as e:
             if self.console:
                 self.console.print(f"Error removing chunks: {e}")
     
-    def index_files(self, files: List[Path], force_reindex: bool = False) -> Dict[str, int]:
+    def delete_stale_chunks(self, file_path: str, chunk_ids: List[str]):
+        """Delete chunks a re-parsed file no longer produces; its new chunks are already upserted"""
+        old_ids = self.get_stored_chunk_ids([file_path]).get(file_path, [])
+        new_ids = set(chunk_ids)
+        stale_ids = [chunk_id for chunk_id in old_ids if chunk_id not in new_ids]
+        if stale_ids:
+            self.vector_store.delete_ids(stale_ids)
+    
+    def index_files(self, files: List[Path], force_reindex: bool = False,
+                    stats: Optional[Dict[str, os.stat_result]] = None) -> Dict[str, int]:
+        """Index new and changed files and drop removed ones.
+        
+        stats may carry stat results already gathered by FileScanner, keyed by
+        str(path), so files are not stat'ed twice.
+        """
         if force_reindex:
-            changes = {'changed': files, 'removed': [], 'unchanged': []}
+            changes = {'changed': files, 'removed': [], 'unchanged': [], 'states': {}}
             self.vector_store.clear()
+            self.metadata.clear()
+            self.file_states = {}
         else:
-            changes = self.get_changed_files(files)
+            self.vector_store.check_embedding_model(self.embedder.model_id)
+            changes = self.get_changed_files(files, stats)
+        
+        return self._apply_changes(changes, stats or {})
+    
+    def update_paths(self, paths: Set[str], scanner, root: Path) -> Dict[str, int]:
+        """Re-index only the given paths, e.g. those reported by a file watcher.
+        
+        Paths may be files or directories (created, moved or deleted); every
+        indexed file that no longer exists or is no longer accepted by the
+        scanner is removed. A changed .gitignore re-checks its whole directory.
+        """
+        self.vector_store.check_embedding_model(self.embedder.model_id)
+        
+        gitignores = {path for path in paths if Path(path).name == '.gitignore'}
+        if gitignores:
+            scanner.gitignore_cache = {}
+            paths = set(paths) | {str(Path(path).parent) for path in gitignores}
+        
+        candidates = {}
+        # Every scan_directory call replaces scanner.stats, so collect them as we go
+        stats = {}
+        touched_known = set()
+        known_files = sorted(self.file_states)
+        for path_str in paths:
+            path = Path(path_str)
+            
+            if path.is_dir():
+                for file_path in scanner.scan_directory(path, root):
+                    candidates[str(file_path)] = file_path
+                stats.update(scanner.stats)
+            elif scanner.accepts(path, root):
+                candidates[str(path)] = path
+                stats[str(path)] = scanner.stats[str(path)]
+            
+            if str(path) in self.file_states:
+                touched_known.add(str(path))
+            prefix = '' if path == Path(root) else str(path) + os.sep
+            for known in known_files[bisect.bisect_left(known_files, prefix):]:
+                if not known.startswith(prefix):
+                    break
+                touched_known.add(known)
+        
+        # Indexed files under a touched path that the scanner no longer returns are gone
+        removed = touched_known - set(candidates)
+        
+        changes = self.get_changed_files(list(candidates.values()), stats, detect_removed=False)
+        changes['removed'] = sorted(removed)
+        return self._apply_changes(changes, stats)
+    
+    def _apply_changes(self, changes: Dict, stats: Dict[str, os.stat_result]) -> Dict[str, int]:
+        if self.vector_store.get_embedding_model() is None:
+            self.vector_store.set_embedding_model(self.embedder.model_id)
+        
+        upgraded = self.vector_store.upgrade_metadata()
+        if upgraded and self.console:
+            self.console.print(f"Added filter fields to {upgraded} existing chunks")
+        backfilled = self.vector_store.sync_lexical_index()
+        if backfilled and self.console:
+            self.console.print(f"Built lexical index for {backfilled} existing chunks")
         
         if self.console:
             self.console.print(f"Files - Changed: {len(changes['changed'])}, "
@@ -99,34 +284,171 @@ class IncrementalIndexer:
         if not changes['changed']:
             if self.console:
                 self.console.print("No files to reindex")
-            return {'chunks_added': 0, 'files_processed': 0}
+            return {'chunks_added': 0, 'files_processed': 0, 'files_removed': len(changes['removed'])}
         
-        all_chunks = []
-        processed_files = 0
+        if self.console and self.parser.use_pool(len(changes['changed'])):
+            self.console.print(f"Parsing with {self.parser.workers} worker processes")
+        
+        result = self._run_pipeline(changes['changed'], changes['states'], stats)
+        result['files_removed'] = len(changes['removed'])
+        return result
+    
+    def _run_pipeline(self, files: List[Path], states: Dict[str, FileState],
+                      stats: Dict[str, os.stat_result]) -> Dict[str, int]:
+        """Stream chunks through parse -> embed -> store in fixed-size batches.
         
-        for file_path in changes['changed']:
-            try:
-                chunks = self.parser.parse_file(file_path)
-                all_chunks.extend(chunks)
-                processed_files += 1
+        Parsing runs in a producer thread feeding a bounded queue, so at most
+        max_inflight_batches batches are held in memory at once. Embedded batches
+        are stored by a writer thread while the next batch is embedded, with at
+        most max_pending_writes batches waiting on it. A file's hash is committed
+        only after the batch holding its last chunk is stored.
+        """
+        batch_queue = queue.Queue(maxsize=max(1, self.config.get("max_inflight_batches", 4)))
+        stop = threading.Event()
+        state = {'files_processed': 0, 'error': None}
+        
+        producer = threading.Thread(
+            target=self._produce_batches,
+            args=(files, batch_queue, stop, state),
+            daemon=True
+        )
+        producer.start()
+        writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="store-writer")
+        pending_writes = deque()
+        max_pending_writes = max(1, self.config.get("max_pending_writes", 2))
+        write_failed = threading.Event()
+        
+        chunks_added = 0
+        chunks_unchanged = 0
+        cache = self.embedder.cache
+        cache_hits, cache_misses = (cache.hits, cache.misses) if cache is not None else (0, 0)
+        try:
+            while True:
+                batch = batch_queue.get()
+                if batch is None:
+                    break
                 
-                if self.console:
-                    self.console.print(f"Parsed {file_path}: {len(chunks)} chunks")
+                chunks, completed_files = batch
+                if chunks:
+                    new_chunks = self.vector_store.update_stored_chunks(chunks)
+                    chunks_unchanged += len(chunks) - len(new_chunks)
+                    self.metrics.add("chunks_unchanged", len(chunks) - len(new_chunks))
+                    chunks = new_chunks
+                
+                embeddings = None
+                if chunks:
+                    if self.console:
+                        self.console.print(f"Generating embeddings for {len(chunks)} chunks...")
                     
-            except Exception as e:
-                if self.console:
-                    self.console.print(f"Error parsing {file_path}: {e}")
-        
-        if all_chunks:
-            if self.console:
-                self.console.print(f"Generating embeddings for {len(all_chunks)} chunks...")
+                    with self.metrics.time("embed"):
+                        embeddings = self.embedder.embed_chunks(chunks)
+                    chunks_added += len(chunks)
+                    self.metrics.add("chunks_embedded", len(chunks))
+                
+                pending_writes.append(writer.submit(self._store_batch, chunks, embeddings, completed_files,
+                                                    states, stats, write_failed))
+                while len(pending_writes) > max_pending_writes:
+                    pending_writes.popleft().result()
             
-            embeddings = self.embedder.embed_chunks(all_chunks)
-            self.vector_store.add_chunks(all_chunks, embeddings)
+            while pending_writes:
+                pending_writes.popleft().result()
+        finally:
+            stop.set()
+            producer.join()
+            writer.shutdown(wait=True)
+            if cache is not None:
+                cache.flush()
+        
+        if state['error'] is not None:
+            raise state['error']
+        
+        if self.console and chunks_unchanged:
+            self.console.print(f"Skipped {chunks_unchanged} unchanged chunks")
         
-        self.save_metadata()
+        if self.console and cache is not None:
+            self.console.print(f"Embedding cache: {cache.hits - cache_hits} hits, "
+                             f"{cache.misses - cache_misses} misses")
+        
+        if self.console and self.verbose:
+            summary = self.embedder.scheduler.summary()
+            self.console.print(f"Embedded {summary['texts']} chunks in {summary['batches']} batches: "
+                             f"{summary['texts_per_second']:.1f} chunks/sec, "
+                             f"padding efficiency {summary['padding_efficiency']:.1%}")
         
         return {
-            'chunks_added': len(all_chunks),
-            'files_processed': processed_files
-        }
\ No newline at end of file
+            'chunks_added': chunks_added,
+            'files_processed': state['files_processed']
+        }
+    
+    def _store_batch(self, chunks: List[CodeChunk], embeddings, completed_files: List,
+                     states: Dict[str, FileState], stats: Dict[str, os.stat_result],
+                     write_failed: threading.Event):
+        """On the writer thread: store one batch, then commit the files it completes.
+        
+        After a failed write later batches are dropped, so no file is committed
+        with some of its chunks missing.
+        """
+        if write_failed.is_set():
+            return
+        try:
+            if chunks:
+                with self.metrics.time("store"):
+                    self.vector_store.add_chunks(chunks, embeddings)
+                self.metrics.add("chunks_stored", len(chunks))
+            
+            entries = []
+            for file_path, chunk_ids in completed_files:
+                file_str = str(file_path)
+                file_state = states.get(file_str) or self.get_file_state(file_path, stats.get(file_str))
+                if file_state is None:
+                    continue
+                self.delete_stale_chunks(file_str, chunk_ids)
+                entries.append((file_str, file_state, chunk_ids))
+                self.file_states[file_str] = file_state
+            with self.metrics.time("commit"):
+                self.metadata.commit_files(entries)
+        except Exception:
+            write_failed.set()
+            raise
+    
+    def _produce_batches(self, files: List[Path], batch_queue: queue.Queue,
+                         stop: threading.Event, state: Dict):
+        batch_size = max(1, self.config.get("embed_batch_size", 256))
+        batch = []
+        completed_files = []
+        
+        def put(item) -> bool:
+            while not stop.is_set():
+                try:
+                    batch_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+        
+        try:
+            for file_path, chunks, error in self.parser.parse_files(files):
+                if error:
+                    if self.console:
+                        self.console.print(f"Error parsing {file_path}: {error}")
+                    continue
+                
+                state['files_processed'] += 1
+                if self.console:
+                    self.console.print(f"Parsed {file_path}: {len(chunks)} chunks")
+                
+                for chunk in chunks:
+                    batch.append(chunk)
+                    if len(batch) >= batch_size:
+                        if not put((batch, completed_files)):
+                            return
+                        batch, completed_files = [], []
+                
+                completed_files.append((file_path, [chunk.id for chunk in chunks]))
+            
+            if batch or completed_files:
+                put((batch, completed_files))
+        except Exception as e:
+            state['error'] = e
+        finally:
+            put(None)
@@ -0,0 +1,185 @@
+import re
+from typing import List, Tuple
+
+# Characters the segmenter has to look at; everything else is skipped in bulk
+_SPECIAL = re.compile(r"[\"'`/{}()\[\];\n]")
+_STRINGS = {
+    '"': re.compile(r'"(?:[^"\\\n]|\\.)*"?', re.S),
+    "'": re.compile(r"'(?:[^'\\\n]|\\.)*'?", re.S),
+}
+_TEMPLATE_BODY = re.compile(r"(?:[^`\\$]|\\.|\$(?!\{))*", re.S)
+_REGEX_LITERAL = re.compile(r"/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*")
+_TRAILING_WORD = re.compile(r"[\w$]+$")
+_NEXT_TOKEN = re.compile(r"\s*([\w$]+|\S\S?)")
+_DECORATOR_NAMES = re.compile(r"\s*(?:@[\w$.]+\s*)*")
+
+# After these, a '/' starts a regular expression rather than a division
+_REGEX_AFTER_CHARS = set("(,=:[!&|?{};+-*%<>~^")
+_REGEX_AFTER_WORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete",
+                      "void", "throw", "yield", "await", "instanceof"}
+
+# A newline does not end a statement after these characters or words, or before these
+_CONTINUE_AFTER_CHARS = set("=,([{+-*/%&|^!~?:<>.")
+_CONTINUE_AFTER_WORDS = {"export", "default", "async", "function", "class", "extends", "implements",
+                         "new", "typeof", "instanceof", "in", "of", "const", "let", "var", "interface",
+                         "enum", "abstract", "declare", "return", "throw", "await", "yield"}
+# A ';' alone on the next line terminates the statement rather than starting one
+_CONTINUE_BEFORE_CHARS = set(".,?:=+-*%&|^)]}>{;")
+_CONTINUE_BEFORE_WORDS = {"else", "catch", "finally", "extends", "implements"}
+
+def segment_javascript(source: str) -> List[Tuple[int, int]]:
+    """(start, end) offsets of every top-level JS/TS statement, found in one pass.
+
+    Strings, template literals (including nested ${} expressions), regex
+    literals and comments are skipped as units, so braces inside them never
+    affect nesting. A statement ends at a top-level ';' or at a top-level
+    newline that cannot continue it. Comment lines directly above a statement
+    are included in it. Work per newline is constant, so the pass stays linear
+    however long a statement runs.
+    """
+    segments = []
+    length = len(source)
+    depth = 0
+    template_depths = []  # depth at which each open ${ expression returns to its template
+    start = None          # start of the open top-level statement, if any
+    decorators = False    # whether it holds only decorators so far (@name or @name(...))
+    comment_start = None  # comment run waiting for the statement below it
+    line_start = 0
+    prev = ''             # last significant character
+    prev_word = ''        # last identifier or keyword, when prev ends one
+    pos = 0
+
+    while pos < length:
+        match = _SPECIAL.search(source, pos)
+        stop = match.start() if match else length
+        if stop > pos:
+            gap = source[pos:stop].rstrip()
+            if gap:
+                if start is None and depth == 0:
+                    code_start = pos + len(gap) - len(gap.lstrip())
+                    start = code_start if comment_start is None else comment_start
+                    comment_start = None
+                    decorators = source[code_start] == '@'
+                if decorators and depth == 0:
+                    decorators = _DECORATOR_NAMES.fullmatch(gap) is not None
+                prev = gap[-1]
+                word = _TRAILING_WORD.search(gap)
+                prev_word = word.group() if word else ''
+        if not match:
+            break
+
+        pos = stop
+        char = source[pos]
+
+        if char == '\n':
+            if depth == 0:
+                if start is not None:
+                    if not _continues(source, pos, prev, prev_word, decorators):
+                        segments.append((start, pos))
+                        start = None
+                elif not source[line_start:pos].strip():
+                    comment_start = None
+            pos += 1
+            line_start = pos
+            continue
+
+        if char == '/' and source[pos + 1:pos + 2] in ('/', '*'):
+            if source[pos + 1] == '/':
+                end = source.find('\n', pos)
+                end = length if end < 0 else end
+            else:
+                end = source.find('*/', pos + 2)
+                end = length if end < 0 else end + 2
+            if depth == 0 and start is None and comment_start is None and not source[line_start:pos].strip():
+                comment_start = pos
+            pos = end
+            continue
+
+        if start is None and depth == 0:
+            start = pos if comment_start is None else comment_start
+            comment_start = None
+            decorators = False
+        elif decorators and depth == 0 and not (char == '(' and prev_word):
+            # Only a decorator's argument list may follow at the top level
+            decorators = False
+
+        if char in _STRINGS:
+            pos = _STRINGS[char].match(source, pos).end()
+            prev, prev_word = '"', ''
+        elif char == '`':
+            pos, entered = _scan_template(source, pos + 1)
+            if entered:
+                template_depths.append(depth)
+                depth += 1
+            else:
+                prev, prev_word = '"', ''
+        elif char == '/':
+            literal = _REGEX_LITERAL.match(source, pos) if _regex_allowed(prev, prev_word) else None
+            if literal:
+                pos = literal.end()
+                prev, prev_word = '"', ''
+            else:
+                pos += 1
+                prev, prev_word = '/', ''
+        elif char in '{([':
+            depth += 1
+            pos += 1
+            prev, prev_word = char, ''
+        elif char in '})]':
+            depth = max(depth - 1, 0)
+            pos += 1
+            prev, prev_word = char, ''
+            if char == '}' and template_depths and depth == template_depths[-1]:
+                template_depths.pop()
+                pos, entered = _scan_template(source, pos)
+                if entered:
+                    template_depths.append(depth)
+                    depth += 1
+                else:
+                    prev = '"'
+        elif char == ';':
+            pos += 1
+            prev, prev_word = ';', ''
+            if depth == 0 and start is not None:
+                segments.append((start, pos))
+                start = None
+
+    if start is not None:
+        segments.append((start, len(source.rstrip())))
+    return segments
+
+def _scan_template(source: str, pos: int) -> Tuple[int, bool]:
+    """Skip template text from pos; returns the new position and whether a ${ expression was entered"""
+    pos = _TEMPLATE_BODY.match(source, pos).end()
+    if source.startswith('${', pos):
+        return pos + 2, True
+    return min(pos + 1, len(source)), False
+
+def _regex_allowed(prev: str, prev_word: str) -> bool:
+    if prev_word:
+        return prev_word in _REGEX_AFTER_WORDS
+    return prev == '' or prev in _REGEX_AFTER_CHARS or prev == '}'
+
+def _continues(source: str, pos: int, prev: str, prev_word: str, decorators: bool) -> bool:
+    """Whether the top-level statement open at the newline at pos carries on to the next line"""
+    if prev_word:
+        if prev_word in _CONTINUE_AFTER_WORDS:
+            return True
+    elif prev in _CONTINUE_AFTER_CHARS:
+        return True
+
+    token = _NEXT_TOKEN.match(source, pos)
+    if not token:
+        return False
+    token = token.group(1)
+    if token.startswith('//') or token.startswith('/*'):
+        return False
+    if token[0] in _CONTINUE_BEFORE_CHARS or token in _CONTINUE_BEFORE_WORDS:
+        return True
+    # Decorators belong to the class or member declared below them
+    return decorators
+
+def looks_minified(source: str, max_line_length: int = 1000) -> bool:
+    """True when most of the file sits on lines longer than max_line_length"""
+    long_bytes = sum(len(line) for line in source.split('\n') if len(line) > max_line_length)
+    return long_bytes * 2 > len(source)
@@ -0,0 +1,126 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from .models import CodeChunk
+from .text_utils import lexical_terms
+
+# Per-chunk metadata stored beside the postings so filtered queries stay exact
+FILTER_FIELDS = ("file_path", "directory", "language", "extension", "chunk_kind", "symbol_name")
+
+class LexicalIndex:
+    # Map this much of the database file into memory so queries read postings without syscalls
+    mmap_bytes = 1 << 30
+
+    def __init__(self, index_directory: Path):
+        """BM25 inverted index over chunk identifiers, kept in an SQLite FTS5 table next to the vectors"""
+        self.index_directory = Path(index_directory)
+        self.index_directory.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.index_directory / "lexical_index.db"
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(f"PRAGMA mmap_size={self.mmap_bytes}")
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(documents)")]
+        if columns and "directory" not in columns:
+            # Written before all filter fields were stored; VectorStore.sync_lexical_index refills it
+            with self.conn:
+                self.conn.execute("DROP TABLE documents")
+                self.conn.execute("DROP TABLE IF EXISTS postings")
+        with self.conn:
+            # Terms are pre-split by lexical_terms; keeping '_' as a token character
+            # stops FTS5 from splitting snake_case identifiers a second time
+            self.conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS postings USING fts5("
+                "terms, path_terms, tokenize=\"unicode61 tokenchars '_'\")"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents (rowid INTEGER PRIMARY KEY, chunk_id TEXT UNIQUE NOT NULL, "
+                "file_path TEXT, directory TEXT, language TEXT, extension TEXT, chunk_kind TEXT, symbol_name TEXT)"
+            )
+            self.conn.execute("CREATE INDEX IF NOT EXISTS documents_file_path ON documents (file_path)")
+
+    def add_chunks(self, chunk_ids: List[str], chunks: List[CodeChunk]):
+        """Index chunks under the given ids, replacing any already stored under them"""
+        with self.lock, self.conn:
+            self._delete(chunk_ids)
+            for chunk_id, chunk in zip(chunk_ids, chunks):
+                rowid = self.conn.execute(
+                    "INSERT INTO documents VALUES (NULL, ?, ?, ?, ?, ?, ?, ?)",
+                    (chunk_id, chunk.file_path, chunk.directory, chunk.language, chunk.extension,
+                     chunk.kind, chunk.symbol_name)
+                ).lastrowid
+                self.conn.execute(
+                    "INSERT INTO postings (rowid, terms, path_terms) VALUES (?, ?, ?)",
+                    (rowid, ' '.join(lexical_terms(chunk.content)), ' '.join(lexical_terms(chunk.file_path)))
+                )
+
+    def delete_ids(self, chunk_ids: List[str]):
+        with self.lock, self.conn:
+            self._delete(chunk_ids)
+
+    def _delete(self, chunk_ids: List[str]):
+        for chunk_id in chunk_ids:
+            row = self.conn.execute("SELECT rowid FROM documents WHERE chunk_id = ?", (chunk_id,)).fetchone()
+            if row is not None:
+                self.conn.execute("DELETE FROM postings WHERE rowid = ?", row)
+                self.conn.execute("DELETE FROM documents WHERE rowid = ?", row)
+
+    def search(self, query: str, n_results: int = 10,
+               where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """(chunk id, BM25 score) pairs for chunks sharing terms with query, best first.
+        
+        where takes the same metadata filter as the vector query.
+        """
+        terms = sorted(set(lexical_terms(query)))
+        if not terms:
+            return []
+        match = ' OR '.join(f'"{term}"' for term in terms)
+        filter_sql, filter_params = self._where_sql(where) if where else ("1", [])
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT documents.chunk_id, bm25(postings, 1.0, 0.5) AS score FROM postings "
+                "JOIN documents ON documents.rowid = postings.rowid "
+                f"WHERE postings MATCH ? AND {filter_sql} ORDER BY score LIMIT ?",
+                (match, *filter_params, n_results)
+            ).fetchall()
+        # FTS5 reports BM25 negated so that ascending order is best-first
+        return [(chunk_id, -score) for chunk_id, score in rows]
+
+    def _where_sql(self, where: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        """Translate a metadata filter ({field: value}, $eq, $in, $and and $or) into SQL"""
+        clauses, params = [], []
+        for field, condition in where.items():
+            if field in ("$and", "$or"):
+                parts = [self._where_sql(part) for part in condition]
+                joiner = ' AND ' if field == "$and" else ' OR '
+                clauses.append('(' + joiner.join(sql for sql, _ in parts) + ')')
+                params.extend(param for _, part_params in parts for param in part_params)
+                continue
+            if field not in FILTER_FIELDS:
+                raise ValueError(f"Cannot filter on '{field}'")
+            if isinstance(condition, dict) and "$in" in condition:
+                clauses.append(f"documents.{field} IN ({', '.join('?' * len(condition['$in']))})")
+                params.extend(condition["$in"])
+            else:
+                clauses.append(f"documents.{field} = ?")
+                params.append(condition["$eq"] if isinstance(condition, dict) else condition)
+        return ' AND '.join(clauses) or "1", params
+
+    def file_paths(self) -> List[str]:
+        with self.lock:
+            return [row[0] for row in self.conn.execute("SELECT DISTINCT file_path FROM documents")]
+
+    def count(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM postings")
+            self.conn.execute("DELETE FROM documents")
+
+    def close(self):
+        self.conn.close()
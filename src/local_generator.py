@@ -1,45 +1,194 @@
-from transformers import pipeline
-from typing import List
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .answer_cache import AnswerCache
+from .context_packer import ContextPacker
 from .models import SearchResult
 
-class LocalCodeQAGenerator:
-    def __init__(self):
-        """Initialize local text generation model"""
-        self.generator = pipeline(
-            "text-generation",
-            model="microsoft/DialoGPT-medium",
-            device=-1
-        )
-    
-    def answer_question(self, question: str, search_results: List[SearchResult]) -> str:
-        """Generate an answer using local model"""
-        
-        context_parts = []
-        for result in search_results[:2]:
-            context_parts.append(f"Code from {result.chunk.file_path}:\n{result.chunk.content}")
-        
-        context = "\n\n".join(context_parts)
-        
-        prompt = f"""Question: {question}
+FALLBACK_ANSWER = "I can find the relevant code but need more context to provide a detailed explanation."
+
+PROMPT_TEMPLATE = """Question: {question}
 
 Relevant code:
 {context}
 
 Answer: Based on the code, """
-        
+
+class LocalCodeQAGenerator:
+    def __init__(self, model_name: str = "microsoft/DialoGPT-medium", max_new_tokens: int = 128,
+                 max_time: float = 30.0, temperature: float = 0.7, context_chunks: int = 5,
+                 context_tokens: int = 768, window_lines: int = 3, cache: Optional[AnswerCache] = None):
+        """Local text generation model, loaded on first use and kept for every later question"""
+        self.model_name = model_name
+        self.max_new_tokens = max_new_tokens
+        self.max_time = max_time
+        self.temperature = temperature
+        self.context_chunks = context_chunks
+        self.context_tokens = context_tokens
+        self.window_lines = window_lines
+        self.cache = cache
+        self.model = None
+        self.tokenizer = None
+        self.load_lock = threading.Lock()
+        # Timing of the last answer: time_to_first_token, tokens, tokens_per_second, seconds, cached
+        self.last_stats: Dict[str, Any] = {}
+
+    @classmethod
+    def from_config(cls, config, cache: Optional[AnswerCache] = None) -> "LocalCodeQAGenerator":
+        return cls(
+            model_name=config.get("generator_model", "microsoft/DialoGPT-medium"),
+            max_new_tokens=config.get("answer_max_tokens", 128),
+            max_time=config.get("answer_max_seconds", 30.0),
+            temperature=config.get("answer_temperature", 0.7),
+            context_chunks=config.get("answer_context_chunks", 5),
+            context_tokens=config.get("answer_context_tokens", 768),
+            window_lines=config.get("answer_window_lines", 3),
+            cache=cache
+        )
+
+    def load(self):
+        """Load the tokenizer and model once; later calls return immediately"""
+        self.load_tokenizer()
+        with self.load_lock:
+            if self.model is None:
+                from transformers import AutoModelForCausalLM
+                self.model = AutoModelForCausalLM.from_pretrained(self.model_name)
+                self.model.eval()
+
+    def load_tokenizer(self):
+        with self.load_lock:
+            if self.tokenizer is None:
+                from transformers import AutoTokenizer
+                self.tokenizer = AutoTokenizer.from_pretrained(self.model_name)
+
+    def count_tokens(self, text: str) -> int:
+        self.load_tokenizer()
+        return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+
+    def build_prompt(self, question: str, search_results: List[SearchResult]) -> str:
+        """Prompt holding as much of the top results as fits in context_tokens model tokens.
+
+        The budget also shrinks so that prompt plus max_new_tokens fit the
+        model's context window once the model is loaded.
+        """
+        budget = self.context_tokens
+        context_window = getattr(self.model.config, "max_position_embeddings", None) if self.model else None
+        if context_window:
+            frame = self.count_tokens(PROMPT_TEMPLATE.format(question=question, context=""))
+            budget = min(budget, context_window - self.max_new_tokens - frame)
+        packer = ContextPacker(self.count_tokens, budget_tokens=max(0, budget), window_lines=self.window_lines)
+        sections = packer.pack(question, search_results[:self.context_chunks])
+        return PROMPT_TEMPLATE.format(question=question, context=packer.render(sections))
+
+    def cached_answer(self, question: str,
+                      search_results: List[SearchResult]) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """The cached answer and its stats, or None; touches neither the model nor last_stats"""
+        if self.cache is None:
+            return None
+        start = time.perf_counter()
+        chunk_ids = [result.chunk.id for result in search_results[:self.context_chunks]]
+        cached = self.cache.get(question, chunk_ids, self.model_name)
+        if cached is None:
+            return None
+        elapsed = time.perf_counter() - start
+        return cached, {"time_to_first_token": elapsed, "tokens": 0, "tokens_per_second": 0.0,
+                        "seconds": elapsed, "cached": True}
+
+    def stream_answer(self, question: str, search_results: List[SearchResult]) -> Iterator[str]:
+        """Yield the answer piece by piece as the model produces it.
+
+        Generation stops after max_new_tokens tokens or max_time seconds, or at the
+        next token once the caller closes this generator. Answers are cached by
+        (question, ids of the chunks in the prompt, model), and a cached answer is
+        yielded whole without loading the model.
+        """
+        start = time.perf_counter()
+        chunk_ids = [result.chunk.id for result in search_results[:self.context_chunks]]
+        cached = self.cached_answer(question, search_results)
+        if cached is not None:
+            answer, self.last_stats = cached
+            yield answer
+            return
+
+        self.load()
+        from transformers import StoppingCriteria, StoppingCriteriaList, TextIteratorStreamer
+
+        stop = threading.Event()
+
+        class StopWhenClosed(StoppingCriteria):
+            def __call__(self, input_ids, scores, **kwargs) -> bool:
+                return stop.is_set()
+
+        inputs = self.tokenizer(self.build_prompt(question, search_results), return_tensors="pt")
+        context_window = getattr(self.model.config, "max_position_embeddings", None)
+        if context_window:
+            # Keep the end of an over-long prompt, where the question's answer starts
+            limit = max(1, context_window - self.max_new_tokens)
+            inputs = {name: tensor[:, -limit:] for name, tensor in inputs.items()}
+        prompt_length = inputs["input_ids"].shape[1]
+
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        outcome: Dict[str, Any] = {}
+        generation = threading.Thread(target=self._generate, daemon=True,
+                                      args=(inputs, streamer, StoppingCriteriaList([StopWhenClosed()]), outcome))
+        generation.start()
+
+        first_token_at = None
+        pieces = []
+        try:
+            for text in streamer:
+                if not text:
+                    continue
+                if first_token_at is None:
+                    first_token_at = time.perf_counter()
+                pieces.append(text)
+                yield text
+        finally:
+            # Also reached when the caller stops reading: let the model go before returning
+            stop.set()
+            generation.join()
+        if "error" in outcome:
+            raise outcome["error"]
+
+        finished = time.perf_counter()
+        tokens = outcome["output"].shape[1] - prompt_length
+        generating = finished - (first_token_at or finished)
+        self.last_stats = {
+            "time_to_first_token": (first_token_at or finished) - start,
+            "tokens": int(tokens),
+            # Rate after the first token, so prompt processing is not counted twice
+            "tokens_per_second": (tokens - 1) / generating if tokens > 1 and generating > 0 else 0.0,
+            "seconds": finished - start,
+            "prompt_tokens": int(prompt_length),
+            "cached": False
+        }
+
+        answer = "".join(pieces).strip()
+        if not answer:
+            yield FALLBACK_ANSWER
+        elif self.cache is not None:
+            self.cache.put(question, chunk_ids, self.model_name, answer)
+
+    def _generate(self, inputs: Dict, streamer, stopping_criteria, outcome: Dict[str, Any]):
         try:
-            response = self.generator(
-                prompt,
-                max_length=len(prompt.split()) + 100,
-                temperature=0.7,
+            outcome["output"] = self.model.generate(
+                **inputs,
+                streamer=streamer,
+                stopping_criteria=stopping_criteria,
+                max_new_tokens=self.max_new_tokens,
+                max_time=self.max_time,
+                temperature=self.temperature,
                 do_sample=True,
-                pad_token_id=50256
+                pad_token_id=self.tokenizer.eos_token_id
             )
-            
-            full_response = response[0]['generated_text']
-            answer = full_response[len(prompt):].strip()
-            
-            return answer if answer else "I can find the relevant code but need more context to provide a detailed explanation."
-            
         except Exception as e:
-            return f"Error generating answer: {e}"
\ No newline at end of file
+            outcome["error"] = e
+            # Unblock the consumer waiting on the streamer
+            streamer.end()
+
+    def answer_question(self, question: str, search_results: List[SearchResult]) -> str:
+        """Generate an answer using local model"""
+        try:
+            return "".join(self.stream_answer(question, search_results)).strip()
+        except Exception as e:
+            return f"Error generating answer: {e}"
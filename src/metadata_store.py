@@ -0,0 +1,114 @@
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+class FileState(NamedTuple):
+    """What the index knows about a file when its chunks were last stored"""
+    mtime_ns: int
+    size: int
+    inode: int
+    hash: str
+
+class IndexMetadataStore:
+    def __init__(self, index_directory: Path):
+        """SQLite store for per-file state and the file -> chunk id manifest"""
+        self.index_directory = Path(index_directory)
+        self.index_directory.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.index_directory / "index_state.db"
+        is_new = not self.db_path.exists()
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, inode INTEGER, hash TEXT, "
+                "has_manifest INTEGER NOT NULL DEFAULT 1)"
+            )
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks ("
+                "path TEXT NOT NULL, chunk_id TEXT NOT NULL, PRIMARY KEY (path, chunk_id)) WITHOUT ROWID"
+            )
+
+        if is_new:
+            self._migrate_json()
+
+    def _migrate_json(self):
+        """Import metadata.json / chunk_manifest.json written by older versions"""
+        metadata_file = self.index_directory / "metadata.json"
+        manifest_file = self.index_directory / "chunk_manifest.json"
+        try:
+            hashes = json.loads(metadata_file.read_text()) if metadata_file.exists() else {}
+            manifest = json.loads(manifest_file.read_text()) if manifest_file.exists() else {}
+        except (OSError, ValueError):
+            return
+
+        # Legacy hashes are bare MD5 digests and carry no stat info, so every file is
+        # re-hashed once; matching MD5s are then recognised as unchanged.
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO files VALUES (?, 0, -1, 0, ?, ?)",
+                [(path, file_hash, int(path in manifest)) for path, file_hash in hashes.items()]
+            )
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO chunks VALUES (?, ?)",
+                [(path, chunk_id) for path, ids in manifest.items() for chunk_id in ids]
+            )
+        for legacy_file in (metadata_file, manifest_file):
+            if legacy_file.exists():
+                legacy_file.unlink()
+
+    def get_all_files(self) -> Dict[str, FileState]:
+        with self.lock:
+            rows = self.conn.execute("SELECT path, mtime_ns, size, inode, hash FROM files").fetchall()
+        return {row[0]: FileState(*row[1:]) for row in rows}
+
+    def get_chunk_ids(self, paths: Iterable[str]) -> Dict[str, List[str]]:
+        """Stored chunk ids for each path the manifest covers; other paths are omitted"""
+        ids_by_file = {}
+        with self.lock:
+            for path in paths:
+                row = self.conn.execute("SELECT has_manifest FROM files WHERE path = ?", (path,)).fetchone()
+                if row is None or not row[0]:
+                    continue
+                rows = self.conn.execute("SELECT chunk_id FROM chunks WHERE path = ?", (path,)).fetchall()
+                ids_by_file[path] = [row[0] for row in rows]
+        return ids_by_file
+
+    def commit_files(self, entries: List[Tuple[str, FileState, List[str]]]):
+        """Record new state and chunk ids for several files in one transaction"""
+        if not entries:
+            return
+        with self.lock, self.conn:
+            for path, state, chunk_ids in entries:
+                self.conn.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, 1)", (path, *state))
+                self.conn.execute("DELETE FROM chunks WHERE path = ?", (path,))
+                self.conn.executemany("INSERT OR IGNORE INTO chunks VALUES (?, ?)",
+                                      [(path, chunk_id) for chunk_id in chunk_ids])
+
+    def update_states(self, states: Dict[str, FileState]):
+        """Refresh stat info for files whose content turned out to be unchanged"""
+        if not states:
+            return
+        with self.lock, self.conn:
+            self.conn.executemany(
+                "UPDATE files SET mtime_ns = ?, size = ?, inode = ?, hash = ? WHERE path = ?",
+                [(*state, path) for path, state in states.items()]
+            )
+
+    def remove_files(self, paths: List[str]):
+        with self.lock, self.conn:
+            self.conn.executemany("DELETE FROM files WHERE path = ?", [(p,) for p in paths])
+            self.conn.executemany("DELETE FROM chunks WHERE path = ?", [(p,) for p in paths])
+
+    def clear(self):
+        with self.lock, self.conn:
+            self.conn.execute("DELETE FROM files")
+            self.conn.execute("DELETE FROM chunks")
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,116 @@
+import heapq
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+def peak_rss_bytes(children: bool = False) -> Optional[int]:
+    """Peak resident memory of this process, or of its largest finished child process"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+
+class Metrics:
+    def __init__(self, slowest_parses: int = 10):
+        """Stage timers and counters, safe to update from several threads.
+
+        A stage's seconds are summed over every call, so a stage that runs in
+        parallel (parsing in a process pool) can add up to more than wall-clock time.
+        """
+        self.slowest_count = slowest_parses
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = time.perf_counter()
+            self.stages: Dict[str, List[float]] = {}  # name -> [seconds, calls]
+            self.counters: Dict[str, float] = {}
+            self.slowest: List[Tuple[float, str]] = []  # min-heap of (seconds, file path)
+
+    @contextmanager
+    def time(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_time(self, stage: str, seconds: float, calls: int = 1):
+        with self.lock:
+            totals = self.stages.setdefault(stage, [0.0, 0])
+            totals[0] += seconds
+            totals[1] += calls
+
+    def add(self, counter: str, value: float = 1):
+        with self.lock:
+            self.counters[counter] = self.counters.get(counter, 0) + value
+
+    def record_parse(self, file_path: str, seconds: float, size: int):
+        """Count one parsed file and keep it if it is among the slowest"""
+        self.add_time("parse", seconds)
+        with self.lock:
+            self.counters["files_parsed"] = self.counters.get("files_parsed", 0) + 1
+            self.counters["bytes_parsed"] = self.counters.get("bytes_parsed", 0) + size
+            if len(self.slowest) < self.slowest_count:
+                heapq.heappush(self.slowest, (seconds, file_path))
+            elif seconds > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, (seconds, file_path))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Everything recorded since the last reset, plus throughput and peak memory"""
+        with self.lock:
+            elapsed = time.perf_counter() - self.started
+            counters = dict(self.counters)
+            stages = {name: {"seconds": seconds, "calls": calls} for name, (seconds, calls) in self.stages.items()}
+            slowest = sorted(self.slowest, reverse=True)
+        return {
+            "elapsed_seconds": elapsed,
+            "stages": stages,
+            "counters": counters,
+            "files_per_second": counters.get("files_parsed", 0) / elapsed if elapsed else 0.0,
+            "chunks_per_second": counters.get("chunks_embedded", 0) / elapsed if elapsed else 0.0,
+            "bytes_read": counters.get("bytes_hashed", 0) + counters.get("bytes_parsed", 0),
+            "peak_rss_bytes": peak_rss_bytes(),
+            "peak_child_rss_bytes": peak_rss_bytes(children=True),
+            "slowest_parses": [{"file_path": path, "seconds": seconds} for seconds, path in slowest]
+        }
+
+    def to_prometheus(self, prefix: str = "code_rag") -> str:
+        """The snapshot in the Prometheus text exposition format"""
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_stage_seconds_total Time spent in each stage",
+            f"# TYPE {prefix}_stage_seconds_total counter"
+        ]
+        lines += [f'{prefix}_stage_seconds_total{{stage="{name}"}} {stage["seconds"]:.6f}'
+                  for name, stage in sorted(snapshot["stages"].items())]
+        lines += [
+            f"# HELP {prefix}_stage_calls_total Calls of each stage",
+            f"# TYPE {prefix}_stage_calls_total counter"
+        ]
+        lines += [f'{prefix}_stage_calls_total{{stage="{name}"}} {stage["calls"]}'
+                  for name, stage in sorted(snapshot["stages"].items())]
+        for name, value in sorted(snapshot["counters"].items()):
+            lines += [f"# TYPE {prefix}_{name}_total counter", f"{prefix}_{name}_total {value}"]
+        for name in ("peak_rss_bytes", "peak_child_rss_bytes"):
+            if snapshot[name] is not None:
+                lines += [f"# TYPE {prefix}_{name} gauge", f"{prefix}_{name} {snapshot[name]}"]
+        lines += [f"# TYPE {prefix}_uptime_seconds gauge", f"{prefix}_uptime_seconds {snapshot['elapsed_seconds']:.3f}"]
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: Path, prefix: str = "code_rag"):
+        """Replace path with the current metrics, for a node exporter textfile collector"""
+        temporary = Path(f"{path}.tmp")
+        temporary.write_text(self.to_prometheus(prefix))
+        os.replace(temporary, path)
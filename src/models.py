@@ -1,5 +1,15 @@
-from dataclasses import dataclass
-from typing import List, Optional
+import hashlib
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+LANGUAGES = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.jsx': 'javascript',
+    '.ts': 'typescript',
+    '.tsx': 'typescript',
+}
 
 @dataclass
 class CodeChunk:
@@ -9,15 +19,67 @@ class CodeChunk:
     start_line: int
     end_line: int
     chunk_type: str
+    # Set by number_duplicate_chunks when a file repeats a chunk verbatim
+    occurrence: int = 0
     
     @property
     def id(self) -> str:
-        """Unique ID for this chunk"""
-        return f"{self.file_path}:{self.start_line}-{self.end_line}"
+        """Content-addressed ID: file, symbol (or kind) and a hash of the content.
+        
+        Unlike line numbers it survives edits elsewhere in the file, so an
+        unchanged function keeps its id and is not embedded again.
+        """
+        chunk_id = f"{self.file_path}:{self.symbol_name or self.kind}:{self.content_hash}"
+        return f"{chunk_id}#{self.occurrence}" if self.occurrence else chunk_id
+    
+    @property
+    def content_hash(self) -> str:
+        return hashlib.blake2b(self.content.encode('utf-8'), digest_size=8).hexdigest()
+    
+    @property
+    def kind(self) -> str:
+        """Chunk type without the symbol: 'method' for 'method:Class.name'"""
+        return self.chunk_type.split(':', 1)[0]
+    
+    @property
+    def symbol_name(self) -> str:
+        """Symbol the chunk defines, or '' for imports and module code"""
+        return self.chunk_type.split(':', 1)[1] if ':' in self.chunk_type else ''
+    
+    @property
+    def directory(self) -> str:
+        return os.path.dirname(self.file_path)
+    
+    @property
+    def extension(self) -> str:
+        return os.path.splitext(self.file_path)[1].lower()
+    
+    @property
+    def language(self) -> str:
+        return LANGUAGES.get(self.extension, '')
+
+def number_duplicate_chunks(chunks: List[CodeChunk]) -> List[CodeChunk]:
+    """Number repeated chunks of one file so that every id stays unique"""
+    seen: Dict[str, int] = {}
+    for chunk in chunks:
+        chunk_id = chunk.id
+        chunk.occurrence = seen.get(chunk_id, 0)
+        seen[chunk_id] = chunk.occurrence + 1
+    return chunks
 
 @dataclass
 class SearchResult:
     """Result from vector search"""
     chunk: CodeChunk
     score: float
-    context: Optional[str] = None
\ No newline at end of file
+    context: Optional[str] = None
+
+def result_to_dict(result: SearchResult) -> Dict[str, Any]:
+    return asdict(result)
+
+def result_from_dict(data: Dict[str, Any]) -> SearchResult:
+    return SearchResult(
+        chunk=CodeChunk(**data['chunk']),
+        score=data['score'],
+        context=data.get('context')
+    )
@@ -0,0 +1,100 @@
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from .metrics import Metrics
+from .models import CodeChunk, number_duplicate_chunks
+from .tree_parser import AdvancedCodeParser
+
+# (content, start_line, end_line, chunk_type) - cheaper to pickle than CodeChunk objects
+CompactChunk = Tuple[str, int, int, str]
+
+_worker_parser = None
+
+def _init_worker(parser_options: Dict[str, Any]):
+    global _worker_parser
+    _worker_parser = AdvancedCodeParser(**parser_options)
+
+# (file path, chunks, error, parse seconds, file size)
+WorkerResult = Tuple[str, List[CompactChunk], Optional[str], float, int]
+
+def _file_size(file_str: str) -> int:
+    try:
+        return os.path.getsize(file_str)
+    except OSError:
+        return 0
+
+def _parse_in_worker(file_str: str) -> WorkerResult:
+    """Parse one file inside a pool worker and return compact chunks"""
+    start = time.perf_counter()
+    try:
+        chunks = _worker_parser.parse_file(Path(file_str), raise_errors=True)
+        compact, error = [(c.content, c.start_line, c.end_line, c.chunk_type) for c in chunks], None
+    except Exception as e:
+        compact, error = [], str(e)
+    return file_str, compact, error, time.perf_counter() - start, _file_size(file_str)
+
+def _parse_group_in_worker(file_strs: List[str]) -> List[WorkerResult]:
+    return [_parse_in_worker(file_str) for file_str in file_strs]
+
+class ParallelParser:
+    def __init__(self, workers: int = 0, min_files_for_pool: int = 64,
+                 parser_options: Optional[Dict[str, Any]] = None):
+        """Fan file parsing out to a process pool for large change sets"""
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+        self.min_files_for_pool = min_files_for_pool
+        self.parser_options = parser_options or {}
+        self.parser = AdvancedCodeParser(**self.parser_options)
+        # Parse time, size and slowest files are recorded here when set
+        self.metrics: Optional[Metrics] = None
+
+    def use_pool(self, file_count: int) -> bool:
+        return self.workers > 1 and file_count >= self.min_files_for_pool
+
+    def parse_files(self, files: List[Path]) -> Iterator[Tuple[Path, List[CodeChunk], Optional[str]]]:
+        """Yield (file_path, chunks, error) for every file, in input order"""
+        if not self.use_pool(len(files)):
+            for file_path in files:
+                start = time.perf_counter()
+                try:
+                    chunks, error = self.parser.parse_file(file_path, raise_errors=True), None
+                except Exception as e:
+                    chunks, error = [], str(e)
+                if self.metrics is not None:
+                    self.metrics.record_parse(str(file_path), time.perf_counter() - start, _file_size(str(file_path)))
+                yield file_path, number_duplicate_chunks(chunks), error
+            return
+
+        # Submit files in small groups and keep only a bounded window of groups in
+        # flight, so parsed-but-unconsumed chunks never pile up in memory
+        group_size = max(1, min(32, len(files) // (self.workers * 4)))
+        groups = [files[i:i + group_size] for i in range(0, len(files), group_size)]
+        max_pending = self.workers * 2
+        
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.parser_options,)) as executor:
+            pending = deque()
+            next_group = 0
+            while pending or next_group < len(groups):
+                while next_group < len(groups) and len(pending) < max_pending:
+                    group = groups[next_group]
+                    pending.append((group, executor.submit(_parse_group_in_worker, [str(f) for f in group])))
+                    next_group += 1
+                
+                group, future = pending.popleft()
+                for file_path, (file_str, compact, error, seconds, size) in zip(group, future.result()):
+                    if self.metrics is not None:
+                        self.metrics.record_parse(file_str, seconds, size)
+                    chunks = [
+                        CodeChunk(
+                            file_path=file_str,
+                            content=content,
+                            start_line=start_line,
+                            end_line=end_line,
+                            chunk_type=chunk_type
+                        )
+                        for content, start_line, end_line, chunk_type in compact
+                    ]
+                    yield file_path, number_duplicate_chunks(chunks), error
@@ -0,0 +1,163 @@
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Dict, Type
+import numpy as np
+
+class Quantizer(ABC):
+    """Compresses normalized float32 vectors into small codes that still give approximate dot products"""
+    name = "base"
+    # Fewer training vectors than this give a poor fit; more only slow training down
+    min_training_rows = 256
+    max_training_rows = 65536
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+
+    @property
+    @abstractmethod
+    def code_size(self) -> int:
+        """Bytes per encoded vector"""
+
+    @property
+    def code_dtype(self) -> np.dtype:
+        return np.dtype(np.uint8)
+
+    @abstractmethod
+    def train(self, vectors: np.ndarray):
+        """Fit the codebook to a sample of vectors"""
+
+    @abstractmethod
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Codes for vectors, one row of code_size values per vector"""
+
+    @abstractmethod
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Approximate queries @ vectors.T computed from codes"""
+
+    def save(self, path: Path):
+        np.savez(path, **self.state())
+
+    def load(self, path: Path):
+        with np.load(path) as data:
+            self.set_state({key: data[key] for key in data.files})
+
+    @abstractmethod
+    def state(self) -> Dict[str, np.ndarray]:
+        """Trained parameters, as saved by save"""
+
+    @abstractmethod
+    def set_state(self, state: Dict[str, np.ndarray]):
+        """Restore parameters returned by state"""
+
+class ScalarQuantizer(Quantizer):
+    """One signed byte per dimension, scaled by the largest magnitude seen in that dimension"""
+    name = "int8"
+
+    @property
+    def code_size(self) -> int:
+        return self.dimension
+
+    @property
+    def code_dtype(self) -> np.dtype:
+        return np.dtype(np.int8)
+
+    def train(self, vectors: np.ndarray):
+        scale = np.abs(vectors).max(axis=0)
+        self.scale = np.where(scale > 0, scale, 1.0).astype(np.float32)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        return np.clip(np.rint(vectors / self.scale * 127), -127, 127).astype(np.int8)
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray, block_rows: int = 4096) -> np.ndarray:
+        # Widen the codes a few thousand rows at a time so the float copy stays in cache
+        scaled = queries * (self.scale / 127)
+        codes = np.asarray(codes)
+        scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), block_rows):
+            scores[:, start:start + block_rows] = scaled @ codes[start:start + block_rows].astype(np.float32).T
+        return scores
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"scale": self.scale}
+
+    def set_state(self, state: Dict[str, np.ndarray]):
+        self.scale = state["scale"]
+
+class ProductQuantizer(Quantizer):
+    """Splits vectors into subvectors and stores each as the index of its nearest of 256 k-means centroids"""
+    name = "pq"
+    centroids_per_subvector = 256
+    min_training_rows = 256 * 8
+    max_training_rows = 256 * 40
+
+    def __init__(self, dimension: int, subvectors: int = 48):
+        super().__init__(dimension)
+        if dimension % subvectors:
+            raise ValueError(f"pq_subvectors ({subvectors}) must divide the embedding dimension ({dimension})")
+        self.subvectors = subvectors
+        self.subdimension = dimension // subvectors
+
+    @property
+    def code_size(self) -> int:
+        return self.subvectors
+
+    def _split(self, vectors: np.ndarray) -> np.ndarray:
+        return vectors.reshape(len(vectors), self.subvectors, self.subdimension)
+
+    def train(self, vectors: np.ndarray, iterations: int = 12):
+        rng = np.random.default_rng(0)
+        parts = self._split(np.asarray(vectors, dtype=np.float32))
+        self.codebooks = np.zeros((self.subvectors, self.centroids_per_subvector, self.subdimension), dtype=np.float32)
+        for m in range(self.subvectors):
+            points = parts[:, m, :]
+            centroids = points[rng.choice(len(points), self.centroids_per_subvector, replace=False)]
+            for _ in range(iterations):
+                assignment = self._nearest(points, centroids)
+                order = np.argsort(assignment, kind="stable")
+                counts = np.bincount(assignment, minlength=self.centroids_per_subvector)
+                present = counts > 0
+                sums = np.zeros_like(centroids)
+                sums[present] = np.add.reduceat(points[order], np.concatenate(([0], np.cumsum(counts)[:-1]))[present])
+                centroids[present] = sums[present] / counts[present, None]
+                # Restart empty clusters on random points so every code stays useful
+                centroids[~present] = points[rng.choice(len(points), int((~present).sum()))]
+            self.codebooks[m] = centroids
+
+    def _nearest(self, points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        distances = (centroids ** 2).sum(axis=1) - 2 * points @ centroids.T
+        return np.argmin(distances, axis=1)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        parts = self._split(np.asarray(vectors, dtype=np.float32))
+        codes = np.empty((len(vectors), self.subvectors), dtype=np.uint8)
+        for m in range(self.subvectors):
+            codes[:, m] = self._nearest(parts[:, m, :], self.codebooks[m])
+        return codes
+
+    def scores(self, queries: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        # Asymmetric distance computation: a (subvector, centroid) -> partial dot product table per query
+        tables = np.einsum("qmd,mkd->qmk", self._split(queries), self.codebooks)
+        # Column-major codes make each subvector's lookups a contiguous gather
+        codes = np.ascontiguousarray(np.asarray(codes).T)
+        scores = np.zeros((len(queries), codes.shape[1]), dtype=np.float32)
+        for q, table in enumerate(tables):
+            for m in range(self.subvectors):
+                scores[q] += np.take(table[m], codes[m])
+        return scores
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"codebooks": self.codebooks}
+
+    def set_state(self, state: Dict[str, np.ndarray]):
+        self.codebooks = state["codebooks"]
+
+QUANTIZERS: Dict[str, Type[Quantizer]] = {
+    quantizer.name: quantizer for quantizer in (ScalarQuantizer, ProductQuantizer)
+}
+
+def create_quantizer(name: str, dimension: int, pq_subvectors: int = 48) -> Quantizer:
+    if name not in QUANTIZERS:
+        raise ValueError(f"Unknown vector quantization '{name}', expected one of: none, {', '.join(QUANTIZERS)}")
+    if name == "pq":
+        return ProductQuantizer(dimension, pq_subvectors)
+    return QUANTIZERS[name](dimension)
@@ -0,0 +1,134 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from .models import SearchResult, result_from_dict, result_to_dict
+
+class QueryResultCache:
+    # Hit/miss counts and last-used times are kept in memory and written at most this often
+    flush_seconds = 30.0
+
+    def __init__(self, index_directory: Path, max_entries: int = 1000):
+        """Search results keyed by (query, filters, limit, index generation), in SQLite next to the index.
+
+        The generation is a counter bumped by every write to the index, so results
+        cached before a write are never served after it, even by another process.
+        A max_entries of 0 disables caching but still tracks the generation. A cache
+        hit only reads; its statistics reach the database on the next put, flush
+        or close.
+        """
+        self.index_directory = Path(index_directory)
+        self.index_directory.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.index_directory / "query_cache.db"
+        self.max_entries = max_entries
+
+        self.lock = threading.Lock()
+        self.pending_counts: Dict[str, List[int]] = {}  # name -> [hits, misses] not yet written
+        self.pending_used: Dict[str, float] = {}  # key -> last use not yet written
+        self.flushed_at = time.monotonic()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        with self.conn:
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, generation INTEGER NOT NULL, results TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.conn.execute("CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            self.conn.execute("INSERT OR IGNORE INTO state VALUES ('generation', 0)")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                "name TEXT PRIMARY KEY, hits INTEGER NOT NULL, misses INTEGER NOT NULL)"
+            )
+
+    @staticmethod
+    def key(query: str, where: Optional[Dict], n_results: int, lexical_weight: float) -> str:
+        payload = json.dumps([' '.join(query.split()), where, n_results, lexical_weight], sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def generation(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT value FROM state WHERE name = 'generation'").fetchone()[0]
+
+    def bump_generation(self):
+        """Invalidate every cached result; called after each write to the index"""
+        with self.lock, self.conn:
+            self.conn.execute("UPDATE state SET value = value + 1 WHERE name = 'generation'")
+            self.conn.execute("DELETE FROM results")
+
+    def get(self, query: str, where: Optional[Dict], n_results: int,
+            lexical_weight: float) -> Optional[List[SearchResult]]:
+        if self.max_entries <= 0:
+            return None
+        key = self.key(query, where, n_results, lexical_weight)
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT results FROM results WHERE key = ? "
+                "AND generation = (SELECT value FROM state WHERE name = 'generation')", (key,)
+            ).fetchone()
+            if row is not None:
+                self.pending_used[key] = time.time()
+            self._count("results", int(row is not None), int(row is None))
+        return None if row is None else [result_from_dict(data) for data in json.loads(row[0])]
+
+    def put(self, query: str, where: Optional[Dict], n_results: int, lexical_weight: float,
+            results: List[SearchResult], generation: int):
+        """Store results computed while the index was at generation; dropped if it has moved on"""
+        if self.max_entries <= 0:
+            return
+        key = self.key(query, where, n_results, lexical_weight)
+        payload = json.dumps([result_to_dict(result) for result in results])
+        with self.lock, self.conn:
+            self._flush()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO results SELECT ?, value, ?, ? FROM state "
+                "WHERE name = 'generation' AND value = ?", (key, payload, time.time(), generation)
+            )
+            # Evict least recently used results beyond max_entries
+            self.conn.execute(
+                "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+    def record(self, name: str, hits: int, misses: int):
+        """Add to the hit and miss counts shown by `code-rag stats`"""
+        if hits or misses:
+            with self.lock:
+                self._count(name, hits, misses)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self.lock, self.conn:
+            self._flush()
+            rows = self.conn.execute("SELECT name, hits, misses FROM counters ORDER BY name").fetchall()
+        return {name: {"hits": hits, "misses": misses} for name, hits, misses in rows}
+
+    def flush(self):
+        """Write pending hit/miss counts and last-used times"""
+        with self.lock, self.conn:
+            self._flush()
+
+    def _count(self, name: str, hits: int, misses: int):
+        counts = self.pending_counts.setdefault(name, [0, 0])
+        counts[0] += hits
+        counts[1] += misses
+        if time.monotonic() - self.flushed_at >= self.flush_seconds:
+            with self.conn:
+                self._flush()
+
+    def _flush(self):
+        self.conn.executemany(
+            "INSERT INTO counters VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET hits = hits + excluded.hits, misses = misses + excluded.misses",
+            [(name, hits, misses) for name, (hits, misses) in self.pending_counts.items()]
+        )
+        self.conn.executemany("UPDATE results SET last_used = ? WHERE key = ?",
+                              [(used, key) for key, used in self.pending_used.items()])
+        self.pending_counts, self.pending_used = {}, {}
+        self.flushed_at = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
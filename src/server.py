@@ -0,0 +1,308 @@
+import itertools
+import json
+import queue
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+from .metrics import Metrics
+from .models import SearchResult, result_from_dict, result_to_dict
+
+class QueryBatcher:
+    def __init__(self, embedder, max_batch_size: int = 64, batch_window_ms: float = 5.0):
+        """Collect concurrent queries and embed them in a single model call"""
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size
+        self.batch_window = batch_window_ms / 1000.0
+        self.pending = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def embed(self, query: str):
+        future = Future()
+        self.pending.put((query, future))
+        return future.result()
+
+    def _run(self):
+        while True:
+            batch = [self.pending.get()]
+            try:
+                while len(batch) < self.max_batch_size:
+                    batch.append(self.pending.get(timeout=self.batch_window))
+            except queue.Empty:
+                pass
+
+            try:
+                embeddings = self.embedder.embed_queries([query for query, _ in batch])
+                for (_, future), embedding in zip(batch, embeddings):
+                    future.set_result(embedding)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+
+class QueryServer:
+    def __init__(self, config, host: str = "127.0.0.1", port: int = 8765, console=None):
+        """Keep the embedder and vector store loaded and answer search requests over HTTP"""
+        from .answer_cache import AnswerCache
+        from .embedder import CodeEmbedder
+        from .local_generator import LocalCodeQAGenerator
+        from .vector_store import VectorStore
+
+        self.config = config
+        self.console = console
+        self.index_directory = str(Path(config.get("index_directory")).resolve())
+        self.embedder = CodeEmbedder.from_config(config)
+        self.vector_store = VectorStore.from_config(config)
+        self.vector_store.check_embedding_model(self.embedder.model_id)
+        self.batcher = QueryBatcher(
+            self.embedder,
+            max_batch_size=config.get("server_max_batch_size", 64),
+            batch_window_ms=config.get("server_batch_window_ms", 5.0)
+        )
+        self.metrics = Metrics()
+        self.stats_lock = threading.Lock()
+        self.recorded_hits = self.recorded_misses = 0
+        cache = AnswerCache(self.index_directory, config.get("answer_cache_size", 1000)) \
+            if config.get("answer_cache", True) else None
+        # Loads its model on the first answer that is not cached
+        self.generator = LocalCodeQAGenerator.from_config(config, cache=cache)
+        self.generator_lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    def search(self, query: str, n_results: int, file_filter: Optional[str] = None,
+               type_filter: Optional[str] = None, language: Optional[str] = None) -> List[SearchResult]:
+        where = self.vector_store.build_where(file_filter, type_filter, language)
+        with self.metrics.time("search"):
+            results = self.vector_store.search(lambda: self._embed(query), n_results=n_results, query_text=query,
+                                               lexical_weight=self.config.get("lexical_weight", 0.5), where=where)
+        self.metrics.add("queries")
+        self._record_embedding_cache()
+        return results
+
+    def _embed(self, query: str):
+        with self.metrics.time("embed"):
+            return self.batcher.embed(query)
+
+    def _record_embedding_cache(self):
+        """Persist query-embedding cache hits and misses since the last call, for `code-rag stats`"""
+        with self.stats_lock:
+            hits, misses = self.embedder.query_cache_hits, self.embedder.query_cache_misses
+            self.vector_store.result_cache.record("query_embeddings", hits - self.recorded_hits,
+                                                  misses - self.recorded_misses)
+            self.recorded_hits, self.recorded_misses = hits, misses
+
+    def ask(self, question: str, file_filter: Optional[str] = None, type_filter: Optional[str] = None,
+            language: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream an answer as {"sources"}, then {"text"} pieces, then {"stats"} messages.
+        
+        Cached answers are sent straight away. Others are generated one at a
+        time, because they share the model, on a thread that holds the model
+        only while it generates: pieces are queued for this iterator, so a slow
+        reader never holds up the next question. Closing the returned iterator
+        stops generation at the next piece.
+        """
+        if not isinstance(question, str) or not question.strip():
+            raise ValueError("The request needs a non-empty 'question'")
+        results = self.search(question, self.config.get("answer_context_chunks", 5),
+                              file_filter, type_filter, language)
+        yield {"sources": [result_to_dict(r) for r in results]}
+        
+        cached = self.generator.cached_answer(question, results)
+        if cached is not None:
+            answer, stats = cached
+            yield {"text": answer}
+            self.metrics.add("answers")
+            yield {"stats": stats}
+            return
+        
+        pieces = queue.Queue()
+        stop = threading.Event()
+        threading.Thread(target=self._generate_answer, args=(question, results, pieces, stop), daemon=True).start()
+        try:
+            with self.metrics.time("answer"):
+                while True:
+                    kind, value = pieces.get()
+                    if kind == "error":
+                        raise value
+                    if kind == "stats":
+                        break
+                    yield {"text": value}
+        finally:
+            stop.set()
+        self.metrics.add("answers")
+        yield {"stats": value}
+    
+    def _generate_answer(self, question: str, results: List[SearchResult], pieces: queue.Queue,
+                         stop: threading.Event):
+        """On its own thread: generate one answer under generator_lock, queueing (kind, value) pairs for ask()"""
+        try:
+            with self.generator_lock:
+                answer = self.generator.stream_answer(question, results)
+                try:
+                    for text in answer:
+                        if stop.is_set():
+                            break
+                        pieces.put(("text", text))
+                finally:
+                    answer.close()
+                pieces.put(("stats", dict(self.generator.last_stats)))
+        except Exception as e:
+            pieces.put(("error", e))
+
+    def serve_forever(self):
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+            self.vector_store.result_cache.flush()
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == "/health":
+                    self._send_json(200, {"status": "ok", "index_directory": server.index_directory})
+                elif self.path == "/metrics":
+                    body = server.metrics.to_prometheus().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                else:
+                    self._send_json(404, {"error": f"Unknown path: {self.path}"})
+
+            def do_POST(self):
+                if self.path == "/ask":
+                    self._stream_answer()
+                    return
+                if self.path != "/search":
+                    self._send_json(404, {"error": f"Unknown path: {self.path}"})
+                    return
+
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    if not isinstance(request.get("query"), str) or not request["query"].strip():
+                        raise ValueError("The request needs a non-empty 'query'")
+                    results = server.search(request["query"], int(request.get("n_results", 5)),
+                                            file_filter=request.get("file_filter"),
+                                            type_filter=request.get("type_filter"),
+                                            language=request.get("language"))
+                    self._send_json(200, {"results": [result_to_dict(r) for r in results]})
+                except ValueError as e:
+                    self._send_json(400, {"error": str(e)})
+                except Exception as e:
+                    self._send_json(500, {"error": str(e)})
+
+            def _stream_answer(self):
+                """Send ask() messages as JSON lines, each flushed as soon as it exists"""
+                try:
+                    length = int(self.headers.get("Content-Length", 0))
+                    request = json.loads(self.rfile.read(length) or b"{}")
+                    messages = server.ask(request.get("question"), file_filter=request.get("file_filter"),
+                                          type_filter=request.get("type_filter"), language=request.get("language"))
+                    first = next(messages)
+                except ValueError as e:
+                    self._send_json(400, {"error": str(e)})
+                    return
+                except Exception as e:
+                    self._send_json(500, {"error": str(e)})
+                    return
+                
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                try:
+                    for message in itertools.chain([first], messages):
+                        self.wfile.write(json.dumps(message).encode("utf-8") + b"\n")
+                        self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # The client went away; closing messages below stops its answer
+                except Exception as e:
+                    self.wfile.write(json.dumps({"error": str(e)}).encode("utf-8") + b"\n")
+                finally:
+                    messages.close()
+            
+            def _send_json(self, status: int, payload: Dict[str, Any]):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                if server.console:
+                    server.console.print(f"[dim]{self.address_string()} {format % args}[/dim]")
+
+        return Handler
+
+class QueryClient:
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, timeout: float = 30.0):
+        """Thin client for a running QueryServer"""
+        self.base_url = f"http://{host}:{port}"
+        self.timeout = timeout
+
+    def is_available(self, index_directory: Optional[str] = None) -> bool:
+        """Check that a server is running and serving the expected index"""
+        try:
+            with urllib.request.urlopen(f"{self.base_url}/health", timeout=0.2) as response:
+                health = json.loads(response.read())
+        except (OSError, ValueError):
+            return False
+
+        if index_directory is None:
+            return health.get("status") == "ok"
+        return health.get("index_directory") == str(Path(index_directory).resolve())
+
+    def search(self, query: str, n_results: int = 5, file_filter: Optional[str] = None,
+               type_filter: Optional[str] = None, language: Optional[str] = None) -> List[SearchResult]:
+        payload = {"query": query, "n_results": n_results, "file_filter": file_filter,
+                   "type_filter": type_filter, "language": language}
+        request = urllib.request.Request(
+            f"{self.base_url}/search",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            self._raise_for(e)
+
+        return [result_from_dict(data) for data in payload["results"]]
+
+    def ask(self, question: str, file_filter: Optional[str] = None, type_filter: Optional[str] = None,
+            language: Optional[str] = None, timeout: float = 300.0) -> Iterator[Dict[str, Any]]:
+        """Yield the server's answer messages ({"sources"}, {"text"}..., {"stats"}) as they arrive"""
+        payload = {"question": question, "file_filter": file_filter, "type_filter": type_filter, "language": language}
+        request = urllib.request.Request(
+            f"{self.base_url}/ask",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={"Content-Type": "application/json"}
+        )
+        try:
+            response = urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            self._raise_for(e)
+        with response:
+            for line in response:
+                message = json.loads(line)
+                if "error" in message:
+                    raise RuntimeError(f"Query server error: {message['error']}")
+                yield message
+
+    def _raise_for(self, error: urllib.error.HTTPError):
+        try:
+            message = json.loads(error.read()).get("error", str(error))
+        except ValueError:
+            message = str(error)
+        if error.code == 400:
+            raise ValueError(message)
+        raise RuntimeError(f"Query server error: {message}")
@@ -0,0 +1,29 @@
+import re
+from typing import List
+
+_CODE_TOKEN = re.compile(r'\w+|[^\w\s]')
+
+def estimate_tokens(text: str) -> int:
+    """Cheap stand-in for a subword tokenizer: counts words and punctuation marks"""
+    return len(_CODE_TOKEN.findall(text))
+
+def estimate_tokens_many(texts: List[str]) -> List[int]:
+    return [estimate_tokens(text) for text in texts]
+
+_IDENTIFIER = re.compile(r'[A-Za-z_][A-Za-z0-9_]*')
+_IDENTIFIER_PART = re.compile(r'[A-Z]+(?=[A-Z][a-z]|[0-9]|$)|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+
+def split_identifier(identifier: str) -> List[str]:
+    """Lowercased camelCase / snake_case parts: 'parseHTTPResponse_v2' -> ['parse', 'http', 'response', 'v', '2']"""
+    return [part.lower() for word in identifier.split('_') for part in _IDENTIFIER_PART.findall(word)]
+
+def lexical_terms(text: str) -> List[str]:
+    """Search terms for text: each identifier whole, plus its parts when it has several"""
+    terms = []
+    for identifier in _IDENTIFIER.findall(text):
+        whole = identifier.lower()
+        terms.append(whole)
+        parts = split_identifier(identifier)
+        if len(parts) > 1:
+            terms.extend(parts)
+    return terms
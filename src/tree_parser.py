@@ -1,22 +1,38 @@
+from bisect import bisect_right
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
+import ast
 import re
-from .models import CodeChunk
+from .js_lexer import looks_minified, segment_javascript
+from .models import LANGUAGES, CodeChunk
+from .text_utils import estimate_tokens
+
+JS_LEADING_COMMENTS = re.compile(r'(?:\s*(?://[^\n]*|/\*.*?\*/))*\s*', re.S)
+JS_IMPORT = re.compile(r'import\b(?!\s*[(.])|export\s+(?:type\s+)?(?:\*|\{[^}]*\})\s*from\b'
+                       r'|(?:const|let|var)\s+[\w${},:\s]+=\s*require\s*\(')
+JS_DECLARATION = re.compile(
+    r'(?:@[\w$.]+(?:\([^)]*\))?\s*)*(?:export\s+(?:default\s+)?)?(?:declare\s+)?(?:abstract\s+)?(?:async\s+)?'
+    r'(?:(?P<function>function\b)\s*\*?|class\b)\s*(?P<name>[\w$]+)?'
+)
+JS_FUNCTION_VARIABLE = re.compile(
+    r'(?:export\s+)?(?:const|let|var)\s+(?P<name>[\w$]+)\s*(?::[^=]+)?=\s*(?:async\s+)?'
+    r'(?:function\b|\([^)]*\)\s*(?::[^=]+)?=>|[\w$]+\s*=>)'
+)
 
 class AdvancedCodeParser:
-   def __init__(self):
-       self.file_extensions = {
-           '.py': 'python',
-           '.js': 'javascript',
-           '.jsx': 'javascript',
-           '.ts': 'typescript',
-           '.tsx': 'typescript',
-       }
+   def __init__(self, max_chunk_tokens: int = 256, overlap_lines: int = 3,
+                minified_files: str = 'skip', minified_line_length: int = 1000):
+       self.max_chunk_tokens = max_chunk_tokens
+       self.overlap_lines = overlap_lines
+       # 'skip' drops minified JS/TS files, 'chunk' cuts them into fixed-size pieces
+       self.minified_files = minified_files
+       self.minified_line_length = minified_line_length
+       self.file_extensions = dict(LANGUAGES)
    
    def get_language_from_file(self, file_path: Path) -> Optional[str]:
        return self.file_extensions.get(file_path.suffix.lower())
    
-   def parse_file(self, file_path: Path) -> List[CodeChunk]:
+   def parse_file(self, file_path: Path, raise_errors: bool = False) -> List[CodeChunk]:
        language = self.get_language_from_file(file_path)
        if not language:
            return []
@@ -25,17 +41,140 @@ class AdvancedCodeParser:
            content = file_path.read_text(encoding='utf-8')
            
            if language == 'python':
-               return self._parse_python(file_path, content)
+               return self._split_oversized(self._parse_python(file_path, content))
            elif language in ['javascript', 'typescript']:
-               return self._parse_javascript(file_path, content)
+               return self._split_oversized(self._parse_javascript(file_path, content))
            
        except Exception as e:
+           if raise_errors:
+               raise
            print(f"Error parsing {file_path}: {e}")
            return []
        
        return []
    
    def _parse_python(self, file_path: Path, content: str) -> List[CodeChunk]:
+       """Chunk a module along its AST: imports, functions, classes, methods and module-level code"""
+       try:
+           tree = ast.parse(content)
+       except (SyntaxError, ValueError):
+           return self._parse_python_lines(file_path, content)
+       
+       lines = content.split('\n')
+       chunks = []
+       module_block = []
+       
+       def flush_module_block():
+           if module_block:
+               start, end = self._node_span(module_block[0])[0], self._node_span(module_block[-1])[1]
+               chunks.append(self._make_chunk(file_path, lines, start, end, 'module'))
+               module_block.clear()
+       
+       for node in tree.body:
+           if isinstance(node, (ast.Import, ast.ImportFrom)):
+               flush_module_block()
+               start, end = self._node_span(node)
+               chunks.append(self._make_chunk(file_path, lines, start, end, 'import'))
+           elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+               flush_module_block()
+               start, end = self._node_span(node)
+               chunks.append(self._make_chunk(file_path, lines, start, end, f'function:{node.name}'))
+           elif isinstance(node, ast.ClassDef):
+               flush_module_block()
+               chunks.extend(self._python_class_chunks(file_path, lines, node, ''))
+           else:
+               module_block.append(node)
+       flush_module_block()
+       
+       return chunks
+   
+   def _python_class_chunks(self, file_path: Path, lines: List[str], node: ast.ClassDef, prefix: str) -> List[CodeChunk]:
+       """An outline chunk for the class (methods collapsed to their signatures) plus one chunk per method"""
+       qualified_name = f"{prefix}{node.name}"
+       start, end = self._node_span(node)
+       outline = lines[start - 1:end]
+       members = []
+       
+       # Collapse members bottom-up so earlier line offsets stay valid
+       for child in reversed(node.body):
+           if not isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+               continue
+           child_end = self._node_span(child)[1]
+           body_start = child.body[0].lineno
+           if lines[body_start - 1][:child.body[0].col_offset].strip():
+               # A body on the header line (def f(self): return 1) is kept whole
+               body_start = child_end + 1
+           elif isinstance(child.body[0], ast.Expr) and isinstance(getattr(child.body[0], 'value', None), ast.Constant) \
+                   and isinstance(child.body[0].value.value, str):
+               body_start = child.body[0].end_lineno + 1
+           if body_start <= child_end:
+               indent = ' ' * (child.body[0].col_offset)
+               outline[body_start - start:child_end - start + 1] = [f"{indent}..."]
+           
+           if isinstance(child, ast.ClassDef):
+               members = self._python_class_chunks(file_path, lines, child, f"{qualified_name}.") + members
+           else:
+               child_start = self._node_span(child)[0]
+               members.insert(0, self._make_chunk(file_path, lines, child_start, child_end,
+                                                  f'method:{qualified_name}.{child.name}'))
+       
+       class_chunk = CodeChunk(
+           file_path=str(file_path),
+           content='\n'.join(outline),
+           start_line=start,
+           end_line=end,
+           chunk_type=f'class:{qualified_name}'
+       )
+       return [class_chunk] + members
+   
+   def _node_span(self, node: ast.AST) -> Tuple[int, int]:
+       """1-based inclusive line span of a node, including its decorators"""
+       start = node.lineno
+       for decorator in getattr(node, 'decorator_list', []):
+           start = min(start, decorator.lineno)
+       return start, node.end_lineno
+   
+   def _make_chunk(self, file_path: Path, lines: List[str], start: int, end: int, chunk_type: str) -> CodeChunk:
+       return CodeChunk(
+           file_path=str(file_path),
+           content='\n'.join(lines[start - 1:end]),
+           start_line=start,
+           end_line=end,
+           chunk_type=chunk_type
+       )
+   
+   def _split_oversized(self, chunks: List[CodeChunk]) -> List[CodeChunk]:
+       """Split chunks above max_chunk_tokens into line windows that overlap by overlap_lines"""
+       result = []
+       for chunk in chunks:
+           if estimate_tokens(chunk.content) <= self.max_chunk_tokens:
+               result.append(chunk)
+               continue
+           
+           lines = chunk.content.split('\n')
+           line_tokens = [estimate_tokens(line) for line in lines]
+           begin = 0
+           while begin < len(lines):
+               end = begin
+               tokens = 0
+               while end < len(lines) and (end == begin or tokens + line_tokens[end] <= self.max_chunk_tokens):
+                   tokens += line_tokens[end]
+                   end += 1
+               
+               result.append(CodeChunk(
+                   file_path=chunk.file_path,
+                   content='\n'.join(lines[begin:end]),
+                   start_line=chunk.start_line + begin,
+                   end_line=chunk.start_line + end - 1,
+                   chunk_type=chunk.chunk_type
+               ))
+               if end >= len(lines):
+                   break
+               begin = max(end - self.overlap_lines, begin + 1)
+       return result
+   
+   def _parse_python_lines(self, file_path: Path, content: str) -> List[CodeChunk]:
+       """Line-based fallback for files the running interpreter cannot parse"""
        chunks = []
        lines = content.split('\n')
        
@@ -99,75 +238,66 @@ class AdvancedCodeParser:
        return chunks
    
    def _parse_javascript(self, file_path: Path, content: str) -> List[CodeChunk]:
-       chunks = []
+       """Chunk a JS/TS module along the top-level statements found by the lexer"""
+       if looks_minified(content, self.minified_line_length):
+           return [] if self.minified_files == 'skip' else self._chunk_by_size(file_path, content)
+       
        lines = content.split('\n')
+       line_starts = [0] + [match.end() for match in re.finditer('\n', content)]
+       chunks = []
+       module_block = []
        
-       i = 0
-       while i < len(lines):
-           line = lines[i].strip()
-           
-           if not line or line.startswith('//'):
-               i += 1
-               continue
-           
-           func_match = re.match(r'function\s+(\w+)\s*\((.*?)\)\s*{', lines[i])
-           if func_match:
-               func_name, params = func_match.groups()
-               start_line = i + 1
-               end_line = self._find_js_block_end(lines, i)
-               
-               func_content = '\n'.join(lines[i:end_line])
-               
-               chunks.append(CodeChunk(
-                   file_path=str(file_path),
-                   content=func_content,
-                   start_line=start_line,
-                   end_line=end_line,
-                   chunk_type=f'function:{func_name}'
-               ))
-               i = end_line
-               continue
-           
-           arrow_match = re.match(r'(?:const|let|var)\s+(\w+)\s*=\s*\((.*?)\)\s*=>\s*{', lines[i])
-           if arrow_match:
-               func_name, params = arrow_match.groups()
-               start_line = i + 1
-               end_line = self._find_js_block_end(lines, i)
-               
-               func_content = '\n'.join(lines[i:end_line])
-               
-               chunks.append(CodeChunk(
-                   file_path=str(file_path),
-                   content=func_content,
-                   start_line=start_line,
-                   end_line=end_line,
-                   chunk_type=f'function:{func_name}'
-               ))
-               i = end_line
-               continue
-           
-           class_match = re.match(r'class\s+(\w+)(?:\s+extends\s+\w+)?\s*{', lines[i])
-           if class_match:
-               class_name = class_match.group(1)
-               start_line = i + 1
-               end_line = self._find_js_block_end(lines, i)
-               
-               class_content = '\n'.join(lines[i:end_line])
-               
-               chunks.append(CodeChunk(
-                   file_path=str(file_path),
-                   content=class_content,
-                   start_line=start_line,
-                   end_line=end_line,
-                   chunk_type=f'class:{class_name}'
-               ))
-               i = end_line
+       def flush_module_block():
+           if module_block:
+               chunks.append(self._make_chunk(file_path, lines, module_block[0][0], module_block[-1][1], 'module'))
+               module_block.clear()
+       
+       for start, end in segment_javascript(content):
+           span = (bisect_right(line_starts, start), bisect_right(line_starts, max(end - 1, start)))
+           head = JS_LEADING_COMMENTS.sub('', content[start:min(end, start + 2000)], count=1)
+           chunk_type = self._javascript_chunk_type(head)
+           if chunk_type is None:
+               module_block.append(span)
                continue
-           
-           i += 1
+           flush_module_block()
+           chunks.append(self._make_chunk(file_path, lines, span[0], span[1], chunk_type))
+       flush_module_block()
        
        return chunks
    
+   def _javascript_chunk_type(self, head: str) -> Optional[str]:
+       if JS_IMPORT.match(head):
+           return 'import'
+       match = JS_DECLARATION.match(head)
+       if match:
+           kind = 'function' if match.group('function') else 'class'
+           return f"{kind}:{match.group('name') or 'default'}"
+       match = JS_FUNCTION_VARIABLE.match(head)
+       if match:
+           return f"function:{match.group('name')}"
+       return None
+   
+   def _chunk_by_size(self, file_path: Path, content: str) -> List[CodeChunk]:
+       """Cut minified code into pieces of roughly max_chunk_tokens, preferring statement boundaries"""
+       chunks = []
+       budget = max(self.max_chunk_tokens * 3, 64)
+       line_starts = [0] + [match.end() for match in re.finditer('\n', content)]
+       start = 0
+       while start < len(content):
+           end = min(start + budget, len(content))
+           if end < len(content):
+               cut = max(content.rfind(';', start + budget // 2, end), content.rfind('}', start + budget // 2, end))
+               end = cut + 1 if cut >= 0 else end
+           chunks.append(CodeChunk(
+               file_path=str(file_path),
+               content=content[start:end],
+               start_line=bisect_right(line_starts, start),
+               end_line=bisect_right(line_starts, end - 1),
+               chunk_type='minified'
+           ))
+           start = end
+       return chunks
+   
    def _find_python_block_end(self, lines: List[str], start_idx: int) -> int:
        if start_idx >= len(lines):
            return len(lines)
@@ -188,26 +318,6 @@ class AdvancedCodeParser:
        
        return len(lines)
    
-   def _find_js_block_end(self, lines: List[str], start_idx: int) -> int:
-       if start_idx >= len(lines):
-           return len(lines)
-       
-       brace_count = 0
-       found_opening = False
-       
-       for i in range(start_idx, len(lines)):
-           line = lines[i]
-           for char in line:
-               if char == '{':
-                   brace_count += 1
-                   found_opening = True
-               elif char == '}':
-                   brace_count -= 1
-                   if found_opening and brace_count == 0:
-                       return i + 1
-       
-       return len(lines)
-   
    def _extract_python_docstring_from_lines(self, lines: List[str], start_idx: int) -> Optional[str]:
        for i in range(start_idx + 1, min(start_idx + 5, len(lines))):
            line = lines[i].strip()
@@ -0,0 +1,821 @@
+import functools
+import json
+import os
+import shutil
+import threading
+from abc import ABC, abstractmethod
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Type
+import numpy as np
+from .file_lock import file_lock
+from .quantizers import QUANTIZERS, Quantizer, create_quantizer
+
+class VectorBackend(ABC):
+    """Stores (id, embedding, document, metadata) rows and answers nearest-neighbour queries.
+
+    get and query return Chroma-shaped dicts, so VectorStore treats every backend alike.
+    Distances are squared L2 between normalized vectors: lower is closer.
+    """
+    name = "base"
+
+    @abstractmethod
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        """Add rows, replacing any with the same id"""
+
+    @abstractmethod
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]):
+        """Replace the metadata of existing rows"""
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Remove rows; unknown ids are ignored"""
+
+    @abstractmethod
+    def query(self, query_embeddings: np.ndarray, n_results: int, where: Optional[Dict] = None) -> Dict[str, List]:
+        """Nearest rows to each query embedding among those matching where"""
+
+    @abstractmethod
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None, limit: Optional[int] = None,
+            offset: int = 0, include: Sequence[str] = ("documents", "metadatas")) -> Dict[str, List]:
+        """Rows by id or metadata filter, without ranking"""
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored rows"""
+
+    @property
+    @abstractmethod
+    def metadata(self) -> Dict[str, Any]:
+        """Store-level settings such as the embedding model"""
+
+    @abstractmethod
+    def set_metadata(self, key: str, value: Any):
+        """Set one store-level setting"""
+
+    @abstractmethod
+    def clear(self):
+        """Remove every row"""
+
+    def refresh(self):
+        """Pick up writes made through another instance; backends that always read through need nothing"""
+
+class ChromaBackend(VectorBackend):
+    name = "chroma"
+    collection_name = "code_chunks"
+    # HNSW can miss matches when few rows pass a filter; up to this many matching
+    # rows are ranked exactly instead
+    exact_filter_rows = 1000
+
+    def __init__(self, persist_directory: str):
+        import chromadb
+        self.client = chromadb.PersistentClient(path=str(persist_directory))
+        self.collection = self._open_collection()
+        self.max_batch_size = self.client.get_max_batch_size()
+
+    def _open_collection(self):
+        return self.client.get_or_create_collection(
+            name=self.collection_name,
+            metadata={"description": "Code chunks with embeddings"}
+        )
+
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        # Chroma takes the float32 array as is; no nested Python lists of floats
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        for start in range(0, len(ids), self.max_batch_size):
+            end = start + self.max_batch_size
+            self.collection.upsert(ids=ids[start:end], embeddings=embeddings[start:end],
+                                   documents=documents[start:end], metadatas=metadatas[start:end])
+
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]):
+        self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, ids: List[str]):
+        self.collection.delete(ids=ids)
+
+    def query(self, query_embeddings: np.ndarray, n_results: int, where: Optional[Dict] = None) -> Dict[str, List]:
+        if where:
+            # Ids alone first: a broad filter never pulls its matches' vectors or documents
+            ids = self.collection.get(where=where, limit=self.exact_filter_rows + 1, include=[])['ids']
+            if len(ids) <= self.exact_filter_rows:
+                return self._exact_query(query_embeddings, n_results, ids)
+        return self.collection.query(query_embeddings=np.asarray(query_embeddings, dtype=np.float32),
+                                     n_results=n_results, where=where)
+
+    def _exact_query(self, query_embeddings: np.ndarray, n_results: int, ids: List[str]) -> Dict[str, List]:
+        """Rank the given rows by exact distance, fetching documents and metadata for the top rows only"""
+        result = {"ids": [], "distances": [], "documents": [], "metadatas": []}
+        query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+        data = self.collection.get(ids=ids, include=["embeddings"]) if ids else {"ids": [], "embeddings": []}
+        vectors = np.asarray(data['embeddings'], dtype=np.float32).reshape(len(data['ids']), query_embeddings.shape[1])
+        for query in query_embeddings:
+            distances = ((vectors - query) ** 2).sum(axis=1)
+            top = np.argsort(distances, kind="stable")[:n_results]
+            result["ids"].append([data['ids'][i] for i in top])
+            result["distances"].append([float(distances[i]) for i in top])
+
+        top_ids = list(dict.fromkeys(chunk_id for ranked in result["ids"] for chunk_id in ranked))
+        rows = self.collection.get(ids=top_ids, include=["documents", "metadatas"]) if top_ids else {"ids": []}
+        position = {chunk_id: i for i, chunk_id in enumerate(rows['ids'])}
+        for ranked in result["ids"]:
+            result["documents"].append([rows['documents'][position[chunk_id]] for chunk_id in ranked])
+            result["metadatas"].append([rows['metadatas'][position[chunk_id]] for chunk_id in ranked])
+        return result
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None, limit: Optional[int] = None,
+            offset: int = 0, include: Sequence[str] = ("documents", "metadatas")) -> Dict[str, List]:
+        return self.collection.get(ids=ids, where=where, limit=limit, offset=offset or None, include=list(include))
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        return dict(self.collection.metadata or {})
+
+    def set_metadata(self, key: str, value: Any):
+        metadata = self.metadata
+        metadata[key] = value
+        self.collection.modify(metadata=metadata)
+
+    def clear(self):
+        self.client.delete_collection(self.collection_name)
+        self.collection = self._open_collection()
+
+def _fsync_file(path: Path):
+    with open(path, "rb") as f:
+        os.fsync(f.fileno())
+
+def _fsync_directory(path: Path):
+    """Make renames inside path durable; not possible (or needed) on Windows"""
+    if os.name == "nt":
+        return
+    descriptor = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+def _fresh(method):
+    """Run a NumpyBackend method under its lock, after picking up writes made by other instances"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            self.refresh()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+def _writes(method):
+    """Like _fresh, but also hold the index's lock file, so only one process writes at a time"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock, self._write_lock():
+            self.refresh()
+            return method(self, *args, **kwargs)
+    return wrapper
+
+class NumpyBackend(VectorBackend):
+    """Normalized embeddings in a memory-mapped .npy, searched by blocked matrix multiply.
+
+    Files under <persist_directory>/numpy_index:
+      vectors.npy      capacity x dimension, float32 or float16; with quantization
+                       set this is the rerank copy and defaults to float16
+      col_<name>.npy   one memory-mapped column per field; strings are stored as
+                       int32 codes into the values listed in dict_<name>.jsonl
+      documents.bin    chunk text, append-only; rows hold an offset and length
+      centroids.npy    IVF coarse quantizer, when ivf_lists > 0
+      codes.npy        int8 or product-quantized vector codes, when quantization is set
+      quantizer.npz    the trained scales or codebooks behind codes.npy
+      index.json       row count, dimension, column types and store metadata
+
+    Rows are appended and deleted rows only marked dead, so each write touches
+    just its own rows; the files are compacted once dead rows outnumber live ones.
+    Writes, compaction and crash recovery hold numpy_index.lock, next to the
+    directory, so processes write one at a time. Every commit bumps a version in
+    index.json, and an instance that finds a newer version there (another
+    process wrote) reopens the files before use.
+    With ivf_lists > 0 and enough rows, vectors are clustered by k-means and a
+    query scores only the rows of its ivf_probe closest clusters.
+    With quantization set to "int8" or "pq", queries scan the compact codes
+    instead of vectors.npy and only the best rerank_factor * n_results
+    candidates are re-scored exactly against the stored vectors.
+    """
+    name = "numpy"
+    block_rows = 65536
+    # k-means wants a few dozen points per cluster to place centroids sensibly
+    min_points_per_list = 39
+    system_columns = {"id": "str", "live": "int8", "doc_offset": "int64", "doc_length": "int64", "ivf_list": "int32"}
+
+    def __init__(self, persist_directory: str, dtype: str = "auto", ivf_lists: int = 0, ivf_probe: int = 8,
+                 quantization: str = "none", pq_subvectors: int = 48, rerank_factor: int = 10):
+        directory = Path(persist_directory) / "numpy_index"
+        self._configure(directory, directory.with_name("numpy_index.lock"), ivf_lists, ivf_probe, quantization,
+                        pq_subvectors, rerank_factor)
+        self._load(dtype)
+
+    def _configure(self, directory: Path, lock_path: Optional[Path], ivf_lists: int, ivf_probe: int,
+                   quantization: str, pq_subvectors: int, rerank_factor: int):
+        self.directory = directory
+        self.lock_path = lock_path
+        directory.parent.mkdir(parents=True, exist_ok=True)
+        with self._write_lock():
+            self._recover()
+            self.directory.mkdir(exist_ok=True)
+        self.ivf_lists = ivf_lists
+        self.ivf_probe = max(1, ivf_probe)
+        self.quantization = quantization
+        self.pq_subvectors = pq_subvectors
+        self.rerank_factor = max(1, rerank_factor)
+        if quantization != "none" and quantization not in QUANTIZERS:
+            raise ValueError(f"Unknown vector quantization '{quantization}', expected one of: none, {', '.join(QUANTIZERS)}")
+        self.lock = threading.RLock()
+
+    def _write_lock(self):
+        return file_lock(self.lock_path) if self.lock_path is not None else nullcontext()
+
+    @property
+    def _staging_directory(self) -> Path:
+        return self.directory.with_name(self.directory.name + ".compact")
+
+    @property
+    def _retired_directory(self) -> Path:
+        return self.directory.with_name(self.directory.name + ".old")
+
+    def _recover(self):
+        """Finish a compaction that crashed between moving the old files aside and moving the new ones in"""
+        if self.directory.exists():
+            # Leftovers of a compaction that failed before its swap or after it
+            shutil.rmtree(self._staging_directory, ignore_errors=True)
+            shutil.rmtree(self._retired_directory, ignore_errors=True)
+            return
+        if not self._retired_directory.exists():
+            return
+        # The old files are only moved aside once the staging directory is complete and synced
+        source = self._staging_directory if self._staging_directory.exists() else self._retired_directory
+        os.replace(source, self.directory)
+        _fsync_directory(self.directory.parent)
+
+    def _load(self, dtype: str):
+        header_path = self.directory / "index.json"
+        self.header_stat = self._header_stat()
+        header = json.loads(header_path.read_text()) if header_path.exists() else {}
+        self.version = header.get("version", 0)
+        if dtype == "auto":
+            # Quantized queries only re-score a few candidates, so half precision is plenty there
+            dtype = "float16" if self.quantization != "none" else "float32"
+        self.dtype = np.dtype(header.get("dtype", dtype))
+        self.dimension = header.get("dimension")
+        self.rows = header.get("rows", 0)
+        self.live_rows = header.get("live_rows", 0)
+        self.ivf_trained_rows = header.get("ivf_trained_rows", 0)
+        self.quantizer_trained_rows = header.get("quantizer_trained_rows", 0)
+        self.store_metadata = header.get("metadata", {})
+        self.column_types = dict(self.system_columns, **header.get("columns", {}))
+
+        self.vectors = None
+        self.columns: Dict[str, np.ndarray] = {}
+        self.values: Dict[str, List[Any]] = {}
+        self.codes: Dict[str, Dict[Any, int]] = {}
+        if self.dimension is not None:
+            self.vectors = np.lib.format.open_memmap(self.directory / "vectors.npy", mode="r+")
+            for name, kind in self.column_types.items():
+                self._open_column(name, kind)
+
+        centroids_path = self.directory / "centroids.npy"
+        self.centroids = np.load(centroids_path) if self.ivf_trained_rows and centroids_path.exists() else None
+        self.quantizer: Optional[Quantizer] = None
+        self.vector_codes = None
+        if self.quantizer_trained_rows:
+            self.quantization = header["quantization"]
+            self.quantizer = create_quantizer(self.quantization, self.dimension, header["pq_subvectors"])
+            self.pq_subvectors = header["pq_subvectors"]
+            self.quantizer.load(self.directory / "quantizer.npz")
+            self.vector_codes = np.lib.format.open_memmap(self.directory / "codes.npy", mode="r+")
+        self.row_of = {self.values["id"][code]: row
+                       for row, code in enumerate(self.columns["id"][:self.rows])
+                       if self.columns["live"][row]} if self.dimension is not None else {}
+        self.documents_path = self.directory / "documents.bin"
+        self.documents_map = None
+        self.ivf_order = None
+        # Dictionary values added since the last commit, appended to dict_<name>.jsonl on commit
+        self.pending_values: Dict[str, List[Any]] = {}
+
+    def _header_stat(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.directory / "index.json")
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def refresh(self):
+        """Reopen the files if another instance has committed since they were loaded"""
+        with self.lock:
+            stat = self._header_stat()
+            if stat == self.header_stat:
+                return
+            try:
+                version = json.loads((self.directory / "index.json").read_text()).get("version", 0)
+            except (OSError, ValueError):
+                version = None
+            if version != self.version:
+                self._close_maps()
+                self._load(self.dtype.name)
+            else:
+                self.header_stat = stat
+
+    @property
+    def capacity(self) -> int:
+        return 0 if self.vectors is None else len(self.vectors)
+
+    def _open_column(self, name: str, kind: str):
+        path = self.directory / f"col_{name}.npy"
+        if path.exists():
+            self.columns[name] = np.lib.format.open_memmap(path, mode="r+")
+        else:
+            column = np.lib.format.open_memmap(path, mode="w+", dtype=self._column_dtype(kind), shape=(self.capacity,))
+            column[:] = -1 if kind == "str" else 0
+            self.columns[name] = column
+        if kind == "str":
+            dict_path = self.directory / f"dict_{name}.jsonl"
+            values = [json.loads(line) for line in dict_path.read_text(encoding="utf-8").splitlines()] \
+                if dict_path.exists() else []
+            self.values[name] = values
+            self.codes[name] = {value: code for code, value in enumerate(values)}
+
+    def _column_dtype(self, kind: str) -> np.dtype:
+        return np.dtype("int32" if kind == "str" else kind if kind != "int" else "int64")
+
+    def _reserve(self, rows: int, dimension: int):
+        """Grow every memory-mapped file so that it holds at least rows rows"""
+        if self.dimension is None:
+            self.dimension = dimension
+            self.vectors = np.lib.format.open_memmap(self.directory / "vectors.npy", mode="w+",
+                                                     dtype=self.dtype, shape=(max(rows, 1024), dimension))
+            for name, kind in self.column_types.items():
+                self._open_column(name, kind)
+            if self.quantizer is not None:
+                self._create_codes()
+        elif dimension != self.dimension:
+            raise ValueError(f"Embedding dimension {dimension} does not match the index ({self.dimension})")
+        if rows <= self.capacity:
+            return
+
+        capacity = max(rows, self.capacity * 2, 1024)
+        self.vectors = self._grow(self.directory / "vectors.npy", self.vectors, capacity, 0)
+        if self.vector_codes is not None:
+            self.vector_codes = self._grow(self.directory / "codes.npy", self.vector_codes, capacity, 0)
+        for name, column in list(self.columns.items()):
+            fill = -1 if self.column_types[name] == "str" else 0
+            self.columns[name] = self._grow(self.directory / f"col_{name}.npy", column, capacity, fill)
+
+    def _create_codes(self):
+        self.vector_codes = np.lib.format.open_memmap(self.directory / "codes.npy", mode="w+",
+                                                      dtype=self.quantizer.code_dtype,
+                                                      shape=(self.capacity, self.quantizer.code_size))
+
+    def _grow(self, path: Path, array: np.ndarray, capacity: int, fill) -> np.ndarray:
+        tmp_path = path.with_suffix(".tmp.npy")
+        grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=array.dtype,
+                                          shape=(capacity,) + array.shape[1:])
+        grown[:self.rows] = array[:self.rows]
+        grown[self.rows:] = fill
+        grown.flush()
+        del grown, array
+        os.replace(tmp_path, path)
+        return np.lib.format.open_memmap(path, mode="r+")
+
+    def _encode(self, name: str, value: Any) -> int:
+        codes = self.codes[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(self.values[name])
+            self.values[name].append(value)
+            self.pending_values.setdefault(name, []).append(value)
+        return code
+
+    def _ensure_columns(self, metadatas: List[Dict]):
+        for metadata in metadatas:
+            for name, value in metadata.items():
+                if name not in self.column_types:
+                    self.column_types[name] = "int" if isinstance(value, (int, np.integer)) and not isinstance(value, bool) else "str"
+                    self._open_column(name, self.column_types[name])
+
+    def _normalize(self, embeddings: np.ndarray) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms > 0, norms, 1.0)
+
+    @_writes
+    def upsert(self, ids: List[str], embeddings: np.ndarray, documents: List[str], metadatas: List[Dict]):
+        if not ids:
+            return
+        embeddings = self._normalize(embeddings)
+        self._mark_dead([self.row_of[chunk_id] for chunk_id in ids if chunk_id in self.row_of])
+        self._reserve(self.rows + len(ids), embeddings.shape[1])
+        self._ensure_columns(metadatas)
+
+        start, end = self.rows, self.rows + len(ids)
+        self.vectors[start:end] = embeddings.astype(self.dtype)
+        if self.quantizer is not None:
+            self.vector_codes[start:end] = self.quantizer.encode(embeddings)
+
+        offset = self.documents_path.stat().st_size if self.documents_path.exists() else 0
+        encoded = [document.encode("utf-8") for document in documents]
+        with open(self.documents_path, "ab") as f:
+            f.write(b"".join(encoded))
+        lengths = np.array([len(data) for data in encoded], dtype=np.int64)
+        self.columns["doc_length"][start:end] = lengths
+        self.columns["doc_offset"][start:end] = offset + np.concatenate(([0], np.cumsum(lengths)[:-1]))
+
+        for name, kind in self.column_types.items():
+            if name in self.system_columns:
+                continue
+            values = [metadata.get(name) for metadata in metadatas]
+            if kind == "str":
+                self.columns[name][start:end] = [-1 if v is None else self._encode(name, v) for v in values]
+            else:
+                self.columns[name][start:end] = [0 if v is None else v for v in values]
+        self.columns["id"][start:end] = [self._encode("id", chunk_id) for chunk_id in ids]
+        self.columns["live"][start:end] = 1
+        if self.centroids is not None:
+            self.columns["ivf_list"][start:end] = self._assign_lists(embeddings)
+
+        for row, chunk_id in enumerate(ids, start):
+            self.row_of[chunk_id] = row
+        self.rows = end
+        self.live_rows += len(ids)
+        self._commit()
+
+    @_writes
+    def update_metadatas(self, ids: List[str], metadatas: List[Dict]):
+        self._ensure_columns(metadatas)
+        for chunk_id, metadata in zip(ids, metadatas):
+            row = self.row_of.get(chunk_id)
+            if row is None:
+                continue
+            for name, value in metadata.items():
+                self.columns[name][row] = self._encode(name, value) if self.column_types[name] == "str" else value
+        self._commit()
+
+    @_writes
+    def delete(self, ids: List[str]):
+        self._mark_dead([self.row_of[chunk_id] for chunk_id in ids if chunk_id in self.row_of])
+        self._commit()
+
+    def _mark_dead(self, rows: List[int]):
+        if rows:
+            for row in rows:
+                del self.row_of[self.values["id"][self.columns["id"][row]]]
+            self.columns["live"][rows] = 0
+            self.live_rows -= len(rows)
+
+    def _commit(self):
+        """Flush mapped files and the header; compact or (re)train the IVF quantizer when due"""
+        self.ivf_order = None
+        if self.rows - self.live_rows > max(self.live_rows, 1024):
+            self._compact()
+        if self.ivf_lists and self.live_rows >= self.ivf_lists * self.min_points_per_list \
+                and self.live_rows >= 2 * self.ivf_trained_rows:
+            self._train_ivf()
+        if self.quantization != "none" and self.dimension is not None and self._quantizer_due():
+            self._train_quantizer()
+
+        for name, values in self.pending_values.items():
+            with open(self.directory / f"dict_{name}.jsonl", "a", encoding="utf-8") as f:
+                f.write("".join(json.dumps(value) + "\n" for value in values))
+        self.pending_values = {}
+        if self.vectors is not None:
+            self.vectors.flush()
+            for column in self.columns.values():
+                column.flush()
+        if self.vector_codes is not None:
+            self.vector_codes.flush()
+        self.version += 1
+        header = {
+            "version": self.version,
+            "dtype": self.dtype.name,
+            "dimension": self.dimension,
+            "rows": self.rows,
+            "live_rows": self.live_rows,
+            "ivf_trained_rows": self.ivf_trained_rows,
+            "quantization": self.quantization,
+            "pq_subvectors": self.pq_subvectors,
+            "quantizer_trained_rows": self.quantizer_trained_rows,
+            "columns": {name: kind for name, kind in self.column_types.items() if name not in self.system_columns},
+            "metadata": self.store_metadata
+        }
+        tmp_path = self.directory / "index.json.tmp"
+        tmp_path.write_text(json.dumps(header))
+        os.replace(tmp_path, self.directory / "index.json")
+        self.header_stat = self._header_stat()
+
+    def _compact(self):
+        """Rewrite the files with live rows only, without ever putting the current files at risk.
+
+        Live rows are copied block_rows at a time into a sibling staging directory,
+        which is synced and then swapped in with two renames; _recover completes
+        the swap if the process dies between them.
+        """
+        live = np.flatnonzero(self.columns["live"][:self.rows])
+        staging, retired = self._staging_directory, self._retired_directory
+        shutil.rmtree(staging, ignore_errors=True)
+        shutil.rmtree(retired, ignore_errors=True)
+
+        try:
+            compacted = NumpyBackend.__new__(NumpyBackend)
+            # No lock of its own: this process already holds the index's lock while it builds staging
+            compacted._configure(staging, None, self.ivf_lists, self.ivf_probe, self.quantization,
+                                 self.pq_subvectors, self.rerank_factor)
+            compacted._load(self.dtype.name)
+            compacted.version = self.version
+            compacted.store_metadata = dict(self.store_metadata)
+            if self.centroids is not None:
+                compacted.centroids = self.centroids
+                np.save(staging / "centroids.npy", self.centroids)
+                compacted.ivf_trained_rows = len(live)
+            if self.quantizer is not None:
+                compacted.quantizer = self.quantizer
+                self.quantizer.save(staging / "quantizer.npz")
+                compacted.quantizer_trained_rows = len(live)
+            for start in range(0, len(live), self.block_rows):
+                rows = live[start:start + self.block_rows]
+                data = self.get_rows(rows, include=("documents", "metadatas"), with_ids=True)
+                compacted.upsert(data["ids"], np.asarray(self.vectors[rows], dtype=np.float32),
+                                 data["documents"], data["metadatas"])
+            compacted._commit()
+            compacted._close_maps()
+            for path in staging.iterdir():
+                _fsync_file(path)
+            _fsync_directory(staging)
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        self._close_maps()
+        os.replace(self.directory, retired)
+        os.replace(staging, self.directory)
+        _fsync_directory(self.directory.parent)
+        shutil.rmtree(retired)
+        self._load(self.dtype.name)
+
+    def _assign_lists(self, embeddings: np.ndarray) -> np.ndarray:
+        return np.argmax(embeddings @ self.centroids.T, axis=1).astype(np.int32)
+
+    def _train_ivf(self, iterations: int = 10):
+        """Spherical k-means on a sample of live vectors, then assign every row to its nearest centroid"""
+        rng = np.random.default_rng(0)
+        live = np.flatnonzero(self.columns["live"][:self.rows])
+        sample = np.sort(rng.choice(live, min(len(live), self.ivf_lists * 256), replace=False))
+        points = np.asarray(self.vectors[sample], dtype=np.float32)
+        centroids = points[rng.choice(len(points), self.ivf_lists, replace=False)]
+        for _ in range(iterations):
+            assignment = np.argmax(points @ centroids.T, axis=1)
+            order = np.argsort(assignment, kind="stable")
+            counts = np.bincount(assignment, minlength=self.ivf_lists)
+            sums = np.zeros_like(centroids)
+            present = counts > 0
+            sums[present] = np.add.reduceat(points[order], np.concatenate(([0], np.cumsum(counts)[:-1]))[present])
+            empty = ~present
+            sums[empty] = points[rng.choice(len(points), int(empty.sum()))]
+            centroids = self._normalize(sums)
+
+        self.centroids = centroids
+        np.save(self.directory / "centroids.npy", centroids)
+        for start in range(0, self.rows, self.block_rows):
+            end = min(start + self.block_rows, self.rows)
+            self.columns["ivf_list"][start:end] = self._assign_lists(np.asarray(self.vectors[start:end], dtype=np.float32))
+        self.ivf_trained_rows = len(live)
+        self.ivf_order = None
+
+    def _quantizer_due(self) -> bool:
+        if self.quantizer is None:
+            return self.live_rows >= QUANTIZERS[self.quantization].min_training_rows
+        return self.live_rows >= 2 * self.quantizer_trained_rows
+
+    def _train_quantizer(self):
+        """Fit the quantizer on a sample of live vectors, then re-encode every row"""
+        rng = np.random.default_rng(0)
+        live = np.flatnonzero(self.columns["live"][:self.rows])
+        quantizer = create_quantizer(self.quantization, self.dimension, self.pq_subvectors)
+        sample = np.sort(rng.choice(live, min(len(live), quantizer.max_training_rows), replace=False))
+        quantizer.train(np.asarray(self.vectors[sample], dtype=np.float32))
+        quantizer.save(self.directory / "quantizer.npz")
+
+        self.quantizer = quantizer
+        self.vector_codes = None
+        self._create_codes()
+        for start in range(0, self.rows, self.block_rows):
+            end = min(start + self.block_rows, self.rows)
+            self.vector_codes[start:end] = quantizer.encode(np.asarray(self.vectors[start:end], dtype=np.float32))
+        self.quantizer_trained_rows = len(live)
+
+    def _ivf_lists(self):
+        """Row numbers grouped by IVF list, and each list's bounds in that order"""
+        if self.ivf_order is None:
+            lists = self.columns["ivf_list"][:self.rows]
+            order = np.argsort(lists, kind="stable")
+            bounds = np.searchsorted(lists[order], np.arange(len(self.centroids) + 1))
+            self.ivf_order = (order, bounds)
+        return self.ivf_order
+
+    def _filter_mask(self, where: Optional[Dict]) -> np.ndarray:
+        mask = self.columns["live"][:self.rows].astype(bool)
+        return mask & self._where_mask(where) if where else mask
+
+    def _where_mask(self, where: Dict) -> np.ndarray:
+        """Evaluate a metadata filter ({field: value}, $eq, $in, $and and $or) over all rows"""
+        mask = np.ones(self.rows, dtype=bool)
+        for name, condition in where.items():
+            if name == "$and":
+                for part in condition:
+                    mask &= self._where_mask(part)
+                continue
+            if name == "$or":
+                mask &= np.logical_or.reduce([self._where_mask(part) for part in condition])
+                continue
+            if name not in self.columns:
+                return np.zeros(self.rows, dtype=bool)
+            values = condition["$in"] if isinstance(condition, dict) and "$in" in condition else \
+                [condition["$eq"] if isinstance(condition, dict) else condition]
+            if self.column_types[name] == "str":
+                values = [self.codes[name][v] for v in values if v in self.codes[name]]
+            mask &= np.isin(self.columns[name][:self.rows], values)
+        return mask
+
+    @_fresh
+    def query(self, query_embeddings: np.ndarray, n_results: int, where: Optional[Dict] = None) -> Dict[str, List]:
+        queries = self._normalize(np.atleast_2d(query_embeddings))
+        empty = {"ids": [[] for _ in queries], "distances": [[] for _ in queries],
+                 "documents": [[] for _ in queries], "metadatas": [[] for _ in queries]}
+        if self.rows == 0 or n_results <= 0:
+            return empty
+
+        mask = self._filter_mask(where)
+        k = n_results * self.rerank_factor if self.quantizer is not None else n_results
+        if self.centroids is not None:
+            order, bounds = self._ivf_lists()
+            probes = np.argsort(-(queries @ self.centroids.T), axis=1)[:, :self.ivf_probe]
+            hits = []
+            for query, lists in zip(queries, probes):
+                rows = np.concatenate([order[bounds[l]:bounds[l + 1]] for l in lists])
+                hits.append(self._score_rows(query[None, :], np.sort(rows[mask[rows]]), k)[0])
+        elif mask.sum() * 4 < self.rows:
+            # Selective filter: gathering the few matching rows beats scanning every block
+            hits = self._score_rows(queries, np.flatnonzero(mask), k)
+        else:
+            hits = self._scan(queries, mask, k)
+        if self.quantizer is not None:
+            hits = [self._rerank(query, rows, n_results) for query, (rows, _) in zip(queries, hits)]
+
+        result = empty
+        for q, (rows, scores) in enumerate(hits):
+            data = self.get_rows(rows, include=("documents", "metadatas"), with_ids=True)
+            result["ids"][q] = data["ids"]
+            result["documents"][q] = data["documents"]
+            result["metadatas"][q] = data["metadatas"]
+            result["distances"][q] = [float(2.0 - 2.0 * score) for score in scores]
+        return result
+
+    def _scan(self, queries: np.ndarray, mask: np.ndarray, k: int):
+        """Top-k over every row, one block of rows at a time"""
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, self.rows, self.block_rows):
+            end = min(start + self.block_rows, self.rows)
+            block_mask = mask[start:end]
+            if not block_mask.any():
+                continue
+            scores = self._block_scores(queries, slice(start, end))
+            scores[:, ~block_mask] = -np.inf
+            rows = np.broadcast_to(np.arange(start, end), scores.shape)
+            best_scores, best_rows = self._keep_top(np.hstack([best_scores, scores]), np.hstack([best_rows, rows]), k)
+        return self._ranked(best_scores, best_rows)
+
+    def _score_rows(self, queries: np.ndarray, rows: np.ndarray, k: int):
+        """Top-k over the given rows only"""
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+        for start in range(0, len(rows), self.block_rows):
+            block = rows[start:start + self.block_rows]
+            scores = self._block_scores(queries, block)
+            block_rows = np.broadcast_to(block, scores.shape)
+            best_scores, best_rows = self._keep_top(np.hstack([best_scores, scores]), np.hstack([best_rows, block_rows]), k)
+        return self._ranked(best_scores, best_rows)
+
+    def _block_scores(self, queries: np.ndarray, index) -> np.ndarray:
+        """Similarity of each query to the indexed rows: exact, or estimated from the quantized codes"""
+        if self.quantizer is not None:
+            return self.quantizer.scores(queries, self.vector_codes[index])
+        vectors = self.vectors[index]
+        if vectors.dtype == np.float32:
+            return queries @ vectors.T
+        # Widen float16 rows a few thousand at a time so the float32 copy stays in cache
+        scores = np.empty((len(queries), len(vectors)), dtype=np.float32)
+        for start in range(0, len(vectors), 4096):
+            scores[:, start:start + 4096] = queries @ vectors[start:start + 4096].astype(np.float32).T
+        return scores
+
+    def _rerank(self, query: np.ndarray, rows: np.ndarray, k: int):
+        """Exact scores for the candidates picked on quantized codes, best k first"""
+        rows = np.sort(rows)
+        scores = np.asarray(self.vectors[rows], dtype=np.float32) @ query
+        top = np.argsort(-scores, kind="stable")[:k]
+        return rows[top], scores[top]
+
+    def _keep_top(self, scores: np.ndarray, rows: np.ndarray, k: int):
+        if scores.shape[1] <= k:
+            return scores, rows
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        return np.take_along_axis(scores, top, axis=1), np.take_along_axis(rows, top, axis=1)
+
+    def _ranked(self, scores: np.ndarray, rows: np.ndarray):
+        hits = []
+        for query_scores, query_rows in zip(scores, rows):
+            order = np.argsort(-query_scores, kind="stable")
+            order = order[np.isfinite(query_scores[order])]
+            hits.append((query_rows[order], query_scores[order]))
+        return hits
+
+    def get_rows(self, rows: Sequence[int], include: Sequence[str] = ("documents", "metadatas"),
+                 with_ids: bool = True) -> Dict[str, List]:
+        result = {"ids": [self.values["id"][self.columns["id"][row]] for row in rows] if with_ids else []}
+        if "documents" in include:
+            result["documents"] = [self._document(row) for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self._metadata(row) for row in rows]
+        return result
+
+    def _document(self, row: int) -> str:
+        offset, length = int(self.columns["doc_offset"][row]), int(self.columns["doc_length"][row])
+        if self.documents_map is None or offset + length > len(self.documents_map):
+            self.documents_map = np.memmap(self.documents_path, dtype=np.uint8, mode="r") \
+                if self.documents_path.stat().st_size else np.zeros(0, dtype=np.uint8)
+        return self.documents_map[offset:offset + length].tobytes().decode("utf-8")
+
+    def _metadata(self, row: int) -> Dict[str, Any]:
+        metadata = {}
+        for name, kind in self.column_types.items():
+            if name in self.system_columns:
+                continue
+            value = self.columns[name][row]
+            if kind == "str":
+                if value >= 0:
+                    metadata[name] = self.values[name][value]
+            else:
+                metadata[name] = int(value)
+        return metadata
+
+    @_fresh
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict] = None, limit: Optional[int] = None,
+            offset: int = 0, include: Sequence[str] = ("documents", "metadatas")) -> Dict[str, List]:
+        if self.rows == 0:
+            return {"ids": [], "documents": [], "metadatas": []}
+        if ids is not None:
+            rows = [self.row_of[chunk_id] for chunk_id in ids if chunk_id in self.row_of]
+            if where:
+                mask = self._where_mask(where)
+                rows = [row for row in rows if mask[row]]
+        else:
+            rows = np.flatnonzero(self._filter_mask(where)).tolist()
+        rows = rows[offset:offset + limit if limit is not None else None]
+        return self.get_rows(rows, include=include)
+
+    @_fresh
+    def count(self) -> int:
+        return self.live_rows
+
+    @property
+    @_fresh
+    def metadata(self) -> Dict[str, Any]:
+        return dict(self.store_metadata)
+
+    @_writes
+    def set_metadata(self, key: str, value: Any):
+        self.store_metadata[key] = value
+        self._commit()
+
+    def _close_maps(self):
+        self.vectors = None
+        self.vector_codes = None
+        self.columns = {}
+        self.documents_map = None
+
+    @_writes
+    def clear(self):
+        version = self.version
+        self._close_maps()
+        shutil.rmtree(self.directory)
+        self.directory.mkdir(parents=True)
+        self._load(self.dtype.name)
+        # Keep counting up, so other instances see the cleared index as a newer version
+        self.version = version
+        self._commit()
+
+VECTOR_BACKENDS: Dict[str, Type[VectorBackend]] = {
+    backend.name: backend for backend in (ChromaBackend, NumpyBackend)
+}
+
+def create_vector_backend(name: str, persist_directory: str, **options) -> VectorBackend:
+    if name not in VECTOR_BACKENDS:
+        raise ValueError(f"Unknown vector backend '{name}', expected one of: {', '.join(VECTOR_BACKENDS)}")
+    return VECTOR_BACKENDS[name](persist_directory, **options)
@@ -1,21 +1,99 @@
-import chromadb
-from chromadb.config import Settings
 import numpy as np
-from typing import List, Tuple
+import os
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+from .lexical_index import LexicalIndex
 from .models import CodeChunk, SearchResult
+from .query_cache import QueryResultCache
+from .vector_backends import create_vector_backend
+
+# Indexes built before the embedding model was recorded all used this one
+LEGACY_EMBEDDING_MODEL = "sentence-transformers:all-MiniLM-L6-v2"
 
 class VectorStore:
-    def __init__(self, persist_directory: str = "./chroma_db"):
-        """Initialize ChromaDB for storing code embeddings"""
-        self.client = chromadb.PersistentClient(path=persist_directory)
-        self.collection = self.client.get_or_create_collection(
-            name="code_chunks",
-            metadata={"description": "Code chunks with embeddings"}
-        )
+    # Reciprocal rank fusion constant; larger values flatten the gap between top ranks
+    rrf_k = 60
+    # Chunks per backend write; a failed write is retried on its own, with backoff
+    write_batch_size = 1000
+    write_retries = 3
+    retry_delay = 0.5
+    # A file filter matching more files than this is expressed per directory where it can be
+    max_filter_paths = 500
+
+    def __init__(self, persist_directory: str = "./chroma_db", backend: str = "chroma",
+                 result_cache_size: int = 1000, **backend_options):
+        """Open the vector backend, lexical index and result cache stored in persist_directory"""
+        self.backend = create_vector_backend(backend, persist_directory, **backend_options)
+        self.lexical = LexicalIndex(persist_directory)
+        self.result_cache = QueryResultCache(persist_directory, result_cache_size)
+        # Index generation the backend was last refreshed at
+        self.backend_generation = self.result_cache.generation()
+        # Model the caller embeds queries with, re-checked whenever another process writes
+        self.embedding_model: Optional[str] = None
+        # Indexed paths and resolved file filters, valid for one index generation
+        self.path_cache: Tuple[int, List[str], Dict[str, List[str]]] = (-1, [], {})
+        self.executor: Optional[ThreadPoolExecutor] = None
+        # Optional Metrics timing the vector query, lexical query and fusion of each search
+        self.metrics = None
+        # Serializes writes and stored-chunk lookups when a writer thread runs beside the indexer
+        self.lock = threading.RLock()
+    
+    @classmethod
+    def from_config(cls, config) -> "VectorStore":
+        backend = config.get("vector_backend", "chroma")
+        options = {}
+        if backend == "numpy":
+            options = {
+                "dtype": config.get("vector_dtype", "auto"),
+                "ivf_lists": config.get("ivf_lists", 0),
+                "ivf_probe": config.get("ivf_probe", 8),
+                "quantization": config.get("vector_quantization", "none"),
+                "pq_subvectors": config.get("pq_subvectors", 48),
+                "rerank_factor": config.get("rerank_factor", 10)
+            }
+        else:
+            numpy_only = {
+                "vector_quantization": config.get("vector_quantization", "none") != "none",
+                "vector_dtype": config.get("vector_dtype", "auto") not in ("auto", "float32"),
+                "ivf_lists": config.get("ivf_lists", 0) > 0,
+            }
+            unsupported = [key for key, requested in numpy_only.items() if requested]
+            if unsupported:
+                raise ValueError(f"{', '.join(unsupported)} only apply to the numpy vector backend, "
+                                 f"not '{backend}'; set vector_backend to numpy or reset them")
+        result_cache_size = config.get("query_result_cache_size", 1000) if config.get("query_result_cache", True) else 0
+        store = cls(config.get("index_directory"), backend=backend, result_cache_size=result_cache_size, **options)
+        store.write_batch_size = max(1, config.get("write_batch_size", cls.write_batch_size))
+        store.write_retries = max(0, config.get("write_retries", cls.write_retries))
+        return store
     
     def add_chunks(self, chunks: List[CodeChunk], embeddings: np.ndarray):
-        """Add code chunks and their embeddings to the vector store"""
+        """Add code chunks and their embeddings, replacing any with the same id.
         
+        Chunks are written write_batch_size at a time and each batch is retried
+        up to write_retries times before the error is raised; upserts make a
+        retried batch safe to write twice.
+        """
+        for start in range(0, len(chunks), self.write_batch_size):
+            batch = chunks[start:start + self.write_batch_size]
+            self._with_retries(self._write_batch, batch, embeddings[start:start + len(batch)])
+    
+    def _with_retries(self, write, *args):
+        for attempt in range(self.write_retries + 1):
+            try:
+                return write(*args)
+            except Exception:
+                if attempt == self.write_retries:
+                    raise
+                time.sleep(self.retry_delay * 2 ** attempt)
+    
+    def _write_batch(self, chunks: List[CodeChunk], embeddings: np.ndarray):
         ids = [chunk.id for chunk in chunks]
         documents = [chunk.content for chunk in chunks]
         metadatas = [
@@ -23,48 +101,319 @@ class VectorStore:
                 "file_path": chunk.file_path,
                 "chunk_type": chunk.chunk_type,
                 "start_line": chunk.start_line,
-                "end_line": chunk.end_line
+                "end_line": chunk.end_line,
+                **self._filter_fields(chunk)
             }
             for chunk in chunks
         ]
         
-        self.collection.add(
-            embeddings=embeddings.tolist(),
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
+        with self.lock:
+            self.backend.upsert(ids, embeddings, documents, metadatas)
+            self.lexical.add_chunks(ids, chunks)
+            self.result_cache.bump_generation()
     
-    def search(self, query_embedding: np.ndarray, n_results: int = 5) -> List[SearchResult]:
-        """Search for similar code chunks"""
-        results = self.collection.query(
-            query_embeddings=[query_embedding.tolist()],
-            n_results=n_results
-        )
+    def _filter_fields(self, chunk: CodeChunk) -> Dict[str, str]:
+        return {
+            "directory": chunk.directory,
+            "language": chunk.language,
+            "extension": chunk.extension,
+            "chunk_kind": chunk.kind,
+            "symbol_name": chunk.symbol_name
+        }
+    
+    def build_where(self, file_filter: Optional[str] = None, type_filter: Optional[str] = None,
+                    language: Optional[str] = None) -> Optional[Dict]:
+        """Metadata filter for search; raises ValueError if file_filter matches no indexed file.
+        
+        '*.ext' becomes an extension match; any other glob is resolved against the
+        indexed file paths with Path.match (see path_condition). A type_filter of
+        'kind' or 'kind:symbol' matches the stored chunk kind and symbol name.
+        """
+        conditions = []
+        if file_filter:
+            if re.fullmatch(r'\*\.[^*?\[/]+', file_filter):
+                conditions.append({"extension": file_filter[1:].lower()})
+            else:
+                conditions.append(self.path_condition(file_filter))
+        if type_filter:
+            kind, _, symbol = type_filter.partition(':')
+            conditions.append({"chunk_kind": kind})
+            if symbol:
+                conditions.append({"symbol_name": symbol})
+        if language:
+            conditions.append({"language": language.lower()})
+        
+        if not conditions:
+            return None
+        return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+    
+    def path_condition(self, file_filter: str) -> Dict:
+        """Filter for the indexed files matching a glob, with at most max_filter_paths values.
+        
+        Matches are listed by file path; past max_filter_paths, directories whose
+        indexed files all match are listed by directory instead. Paths and matches
+        are cached until the index is next written.
+        """
+        generation = self.result_cache.generation()
+        if self.path_cache[0] != generation:
+            self.path_cache = (generation, self.lexical.file_paths(), {})
+        _, indexed, matches = self.path_cache
+        if file_filter not in matches:
+            matches[file_filter] = sorted(path for path in indexed if Path(path).match(file_filter))
+        paths = matches[file_filter]
+        if not paths:
+            raise ValueError(f"No indexed files match '{file_filter}'")
+        if len(paths) <= self.max_filter_paths:
+            return {"file_path": {"$in": paths}}
+        
+        by_directory = defaultdict(list)
+        for path in paths:
+            by_directory[os.path.dirname(path)].append(path)
+        sizes = Counter(os.path.dirname(path) for path in indexed)
+        directories = [directory for directory, matched in by_directory.items() if len(matched) == sizes[directory]]
+        files = [path for directory, matched in by_directory.items() if len(matched) < sizes[directory]
+                 for path in matched]
+        if len(directories) + len(files) > self.max_filter_paths:
+            raise ValueError(f"'{file_filter}' matches {len(paths)} files in {len(by_directory)} directories; "
+                             f"use a narrower filter")
+        parts = ([{"directory": {"$in": directories}}] if directories else []) + \
+                ([{"file_path": {"$in": files}}] if files else [])
+        return parts[0] if len(parts) == 1 else {"$or": parts}
+    
+    def search(self, query_embedding: Union[np.ndarray, Callable[[], np.ndarray]], n_results: int = 5,
+               query_text: Optional[str] = None, lexical_weight: float = 0.0,
+               where: Optional[Dict] = None) -> List[SearchResult]:
+        """Search for similar code chunks, restricted to those matching where (see build_where).
+        
+        Given query_text and a lexical_weight above zero, a BM25 query over identifiers
+        runs alongside the vector query and both rankings are merged by weighted
+        reciprocal rank fusion; scores are then fusion scores (higher is better)
+        rather than distances.
+        
+        Results for a query_text are cached until the index is next written. The
+        query_embedding may be a function returning it, so a cached query is
+        answered without embedding it.
+        """
+        if not query_text:
+            return self._search(query_embedding, n_results, query_text, lexical_weight, where)
+        cached = self.result_cache.get(query_text, where, n_results, lexical_weight)
+        if cached is not None:
+            if self.metrics is not None:
+                self.metrics.add("result_cache_hits")
+            return cached
+        generation = self.result_cache.generation()
+        if generation != self.backend_generation:
+            # Another process wrote to the index: make sure these results come from what it wrote
+            self.backend.refresh()
+            self.backend_generation = generation
+            if self.embedding_model is not None:
+                # It may have been rebuilt with another model
+                self.check_embedding_model(self.embedding_model)
+        results = self._search(query_embedding, n_results, query_text, lexical_weight, where)
+        self.result_cache.put(query_text, where, n_results, lexical_weight, results, generation)
+        return results
+    
+    def _search(self, query_embedding: Union[np.ndarray, Callable[[], np.ndarray]], n_results: int,
+                query_text: Optional[str], lexical_weight: float, where: Optional[Dict]) -> List[SearchResult]:
+        if callable(query_embedding):
+            query_embedding = query_embedding()
+        if not query_text or lexical_weight <= 0:
+            with self._timed("vector_query"):
+                return [result for _, result in self._vector_search(query_embedding, n_results, where)]
+        
+        candidates = n_results * 2
+        
+        def lexical_search():
+            with self._timed("lexical_query"):
+                return self.lexical.search(query_text, candidates, where)
+        
+        lexical_future = self._get_executor().submit(lexical_search)
+        with self._timed("vector_query"):
+            vector_results = self._vector_search(query_embedding, candidates, where)
+        lexical_hits = lexical_future.result()
+        with self._timed("fusion"):
+            return self._fuse(vector_results, lexical_hits, n_results, lexical_weight)
+    
+    def _timed(self, stage: str):
+        return self.metrics.time(stage) if self.metrics is not None else nullcontext()
+    
+    def search_many(self, query_embeddings: np.ndarray, n_results: int = 5,
+                    query_texts: Optional[List[str]] = None, lexical_weight: float = 0.0,
+                    where: Optional[Dict] = None, batch_size: int = 64, workers: int = 4) -> List[List[SearchResult]]:
+        """Results for many queries, in query order, with the same options as search.
+        
+        Vector queries go to the store batch_size at a time and the batches run on
+        a pool of worker threads, each also running the lexical queries for its batch.
+        """
+        use_lexical = query_texts is not None and lexical_weight > 0
+        candidates = n_results * 2 if use_lexical else n_results
         
+        def run_batch(start: int) -> List[List[SearchResult]]:
+            vector_batch = self._vector_search_many(query_embeddings[start:start + batch_size], candidates, where)
+            if not use_lexical:
+                return [[result for _, result in vector_results] for vector_results in vector_batch]
+            return [
+                self._fuse(vector_results, self.lexical.search(text, candidates, where), n_results, lexical_weight)
+                for vector_results, text in zip(vector_batch, query_texts[start:start + batch_size])
+            ]
+        
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch-search") as pool:
+            batches = pool.map(run_batch, range(0, len(query_embeddings), batch_size))
+            return [results for batch in batches for results in batch]
+    
+    def _fuse(self, vector_results: List[Tuple[str, SearchResult]], lexical_hits: List[Tuple[str, float]],
+              n_results: int, lexical_weight: float) -> List[SearchResult]:
+        """Merge vector and lexical rankings by weighted reciprocal rank fusion"""
+        fused: Dict[str, float] = {}
+        results_by_id = {}
+        for rank, (chunk_id, result) in enumerate(vector_results, 1):
+            fused[chunk_id] = (1 - lexical_weight) / (self.rrf_k + rank)
+            results_by_id[chunk_id] = result
+        for rank, (chunk_id, _) in enumerate(lexical_hits, 1):
+            fused[chunk_id] = fused.get(chunk_id, 0.0) + lexical_weight / (self.rrf_k + rank)
+        
+        missing = [chunk_id for chunk_id, _ in lexical_hits if chunk_id not in results_by_id]
+        if missing:
+            data = self.backend.get(ids=missing)
+            for chunk_id, document, metadata in zip(data['ids'], data['documents'], data['metadatas']):
+                results_by_id[chunk_id] = SearchResult(chunk=self._chunk_from(document, metadata), score=0.0)
+        
+        ranked = sorted((chunk_id for chunk_id in fused if chunk_id in results_by_id),
+                        key=fused.__getitem__, reverse=True)
         search_results = []
-        for i in range(len(results['ids'][0])):
-            metadata = results['metadatas'][0][i]
-            chunk = CodeChunk(
-                file_path=metadata['file_path'],
-                content=results['documents'][0][i],
-                start_line=metadata['start_line'],
-                end_line=metadata['end_line'],
-                chunk_type=metadata['chunk_type']
-            )
-            
-            search_result = SearchResult(
-                chunk=chunk,
-                score=results['distances'][0][i]
-            )
-            search_results.append(search_result)
+        for chunk_id in ranked[:n_results]:
+            result = results_by_id[chunk_id]
+            result.score = fused[chunk_id]
+            search_results.append(result)
+        return search_results
+    
+    def _vector_search(self, query_embedding: np.ndarray, n_results: int,
+                       where: Optional[Dict] = None) -> List[Tuple[str, SearchResult]]:
+        return self._vector_search_many(query_embedding[None, :], n_results, where)[0]
+    
+    def _vector_search_many(self, query_embeddings: np.ndarray, n_results: int,
+                            where: Optional[Dict] = None) -> List[List[Tuple[str, SearchResult]]]:
+        results = self.backend.query(query_embeddings, n_results, where)
+        
+        search_results = []
+        for q in range(len(query_embeddings)):
+            query_results = []
+            for i in range(len(results['ids'][q])):
+                search_result = SearchResult(
+                    chunk=self._chunk_from(results['documents'][q][i], results['metadatas'][q][i]),
+                    score=results['distances'][q][i]
+                )
+                query_results.append((results['ids'][q][i], search_result))
+            search_results.append(query_results)
         
         return search_results
     
+    def _chunk_from(self, document: str, metadata: Dict) -> CodeChunk:
+        return CodeChunk(
+            file_path=metadata['file_path'],
+            content=document,
+            start_line=metadata['start_line'],
+            end_line=metadata['end_line'],
+            chunk_type=metadata['chunk_type']
+        )
+    
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="lexical-search")
+        return self.executor
+    
+    def sync_lexical_index(self, page_size: int = 1000) -> int:
+        """Build the lexical index from stored chunks if it is missing (indexes from older versions)"""
+        total = self.backend.count()
+        if total == 0 or self.lexical.count() > 0:
+            return 0
+        for offset in range(0, total, page_size):
+            data = self.backend.get(limit=page_size, offset=offset)
+            chunks = [self._chunk_from(document, metadata)
+                      for document, metadata in zip(data['documents'], data['metadatas'])]
+            self.lexical.add_chunks(data['ids'], chunks)
+        self.result_cache.bump_generation()
+        return total
+    
+    def upgrade_metadata(self, page_size: int = 1000) -> int:
+        """Add the directory/language/extension/chunk_kind/symbol_name fields to chunks stored without them"""
+        sample = self.backend.get(limit=1, include=["metadatas"])
+        if not sample['ids'] or "directory" in sample['metadatas'][0]:
+            return 0
+        total = self.backend.count()
+        for offset in range(0, total, page_size):
+            data = self.backend.get(limit=page_size, offset=offset)
+            metadatas = [
+                {**metadata, **self._filter_fields(self._chunk_from(document, metadata))}
+                for document, metadata in zip(data['documents'], data['metadatas'])
+            ]
+            self.backend.update_metadatas(data['ids'], metadatas)
+        self.result_cache.bump_generation()
+        return total
+    
+    def update_stored_chunks(self, chunks: List[CodeChunk]) -> List[CodeChunk]:
+        """Refresh line numbers of chunks already stored and return the ones that are not.
+        
+        Ids are content-addressed, so a stored id means the content is unchanged:
+        such chunks need no embedding, and a write only if their lines moved.
+        """
+        with self.lock:
+            stored = self.backend.get(ids=[chunk.id for chunk in chunks], include=["metadatas"])
+            metadata_by_id = dict(zip(stored['ids'], stored['metadatas']))
+            new_chunks, moved_ids, moved_metadatas = [], [], []
+            for chunk in chunks:
+                metadata = metadata_by_id.get(chunk.id)
+                if metadata is None:
+                    new_chunks.append(chunk)
+                elif (metadata['start_line'], metadata['end_line']) != (chunk.start_line, chunk.end_line):
+                    moved_ids.append(chunk.id)
+                    moved_metadatas.append({**metadata, "start_line": chunk.start_line, "end_line": chunk.end_line})
+            if moved_ids:
+                self.backend.update_metadatas(moved_ids, moved_metadatas)
+                self.result_cache.bump_generation()
+        return new_chunks
+    
+    def delete_ids(self, ids: List[str]):
+        if ids:
+            with self.lock:
+                self.backend.delete(ids)
+                self.lexical.delete_ids(ids)
+                self.result_cache.bump_generation()
+    
+    def get_ids_for_files(self, file_paths: List[str]) -> Dict[str, List[str]]:
+        """Look up stored chunk ids by file path through a metadata filter"""
+        with self.lock:
+            data = self.backend.get(where={"file_path": {"$in": file_paths}}, include=["metadatas"])
+        ids_by_file = {}
+        for chunk_id, metadata in zip(data['ids'], data['metadatas']):
+            ids_by_file.setdefault(metadata['file_path'], []).append(chunk_id)
+        return ids_by_file
+    
+    def get_embedding_model(self) -> Optional[str]:
+        """Return the embedding model that built this index, if it has any chunks"""
+        recorded = self.backend.metadata.get("embedding_model")
+        if recorded is None and self.backend.count() > 0:
+            return LEGACY_EMBEDDING_MODEL
+        return recorded
+    
+    def set_embedding_model(self, model_id: str):
+        self.backend.set_metadata("embedding_model", model_id)
+    
+    def check_embedding_model(self, model_id: str):
+        """Raise if this index was built with a different embedding model.
+        
+        Searches repeat the check whenever another process has written to the index.
+        """
+        self.embedding_model = model_id
+        recorded = self.get_embedding_model()
+        if recorded is not None and recorded != model_id:
+            raise ValueError(
+                f"Index was built with embedding model '{recorded}' but '{model_id}' is configured; "
+                f"re-index with --clear or change embedding_backend/embedding_model back"
+            )
+    
     def clear(self):
         """Clear all data from the vector store"""
-        self.client.delete_collection("code_chunks")
-        self.collection = self.client.get_or_create_collection(
-            name="code_chunks",
-            metadata={"description": "Code chunks with embeddings"}
-        )
\ No newline at end of file
+        self.backend.clear()
+        self.lexical.clear()
+        self.result_cache.bump_generation()
\ No newline at end of file
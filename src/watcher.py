@@ -0,0 +1,176 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0o2000000)
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+              | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+EVENT_HEADER = struct.Struct("iIII")
+
+class InotifyWatcher:
+    """Recursive directory watch on Linux inotify, loaded through ctypes"""
+
+    def __init__(self, root: Path, should_watch_dir: Callable[[str], bool]):
+        self.root = str(root)
+        self.should_watch_dir = should_watch_dir
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.paths_by_wd: Dict[int, str] = {}
+        self.add_tree(self.root)
+
+    def add_tree(self, directory: str):
+        """Watch a directory and every non-ignored directory below it"""
+        stack = [directory]
+        while stack:
+            current = stack.pop()
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(current), WATCH_MASK)
+            if wd < 0:
+                errno = ctypes.get_errno()
+                if errno == 28:  # ENOSPC: fs.inotify.max_user_watches reached
+                    raise OSError(errno, "inotify watch limit reached")
+                continue
+            self.paths_by_wd[wd] = current
+            try:
+                for entry in os.scandir(current):
+                    if entry.is_dir(follow_symlinks=False) and self.should_watch_dir(entry.path):
+                        stack.append(entry.path)
+            except OSError:
+                continue
+
+    def read(self, timeout: float) -> Set[str]:
+        """Block up to timeout seconds and return the paths touched since the last call"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        touched = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += EVENT_HEADER.size + length
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped; the only safe answer is to re-check everything
+                    touched.add(self.root)
+                    continue
+                if mask & IN_IGNORED:
+                    self.paths_by_wd.pop(wd, None)
+                    continue
+
+                directory = self.paths_by_wd.get(wd)
+                if directory is None:
+                    continue
+                path = os.path.join(directory, os.fsdecode(name)) if name else directory
+                touched.add(path)
+
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO) and self.should_watch_dir(path):
+                    try:
+                        self.add_tree(path)
+                    except OSError:
+                        # Out of watches: the directory is still indexed through its create event
+                        pass
+        return touched
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """Fallback that re-scans the tree and compares (mtime_ns, size) snapshots"""
+
+    def __init__(self, scan: Callable[[], Dict[str, os.stat_result]], interval: float = 2.0):
+        self.scan = scan
+        self.interval = interval
+        self.snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        return {path: (stat.st_mtime_ns, stat.st_size) for path, stat in self.scan().items()}
+
+    def read(self, timeout: float) -> Set[str]:
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._take_snapshot()
+        touched = {path for path, state in snapshot.items() if self.snapshot.get(path) != state}
+        touched.update(path for path in self.snapshot if path not in snapshot)
+        self.snapshot = snapshot
+        return touched
+
+    def close(self):
+        pass
+
+class FileWatcher:
+    def __init__(self, directory: Path, scanner, debounce_seconds: float = 1.0,
+                 max_delay_seconds: float = 10.0, poll_interval: float = 2.0,
+                 force_polling: bool = False, console=None):
+        """Yield debounced batches of touched paths under directory"""
+        self.directory = directory
+        self.scanner = scanner
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.console = console
+        self.backend = None
+
+        if not force_polling and sys.platform.startswith("linux"):
+            try:
+                self.backend = InotifyWatcher(directory, self._should_watch_dir)
+            except (OSError, AttributeError) as e:
+                if console:
+                    console.print(f"inotify unavailable ({e}), falling back to polling", style="yellow")
+        if self.backend is None:
+            self.backend = PollingWatcher(self._scan_stats, poll_interval)
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if isinstance(self.backend, InotifyWatcher) else "polling"
+
+    def _should_watch_dir(self, path: str) -> bool:
+        return not self.scanner.is_ignored_path(Path(path), self.directory, is_dir=True)
+
+    def _scan_stats(self) -> Dict[str, os.stat_result]:
+        self.scanner.scan_directory(self.directory)
+        return dict(self.scanner.stats)
+
+    def batches(self) -> Iterator[Set[str]]:
+        """Wait for changes; once they go quiet for debounce_seconds (or max_delay_seconds
+        pass since the first one), yield everything touched as one batch"""
+        while True:
+            pending = self.backend.read(timeout=3600)
+            if not pending:
+                continue
+
+            first_event = time.monotonic()
+            while time.monotonic() - first_event < self.max_delay_seconds:
+                more = self.backend.read(timeout=self.debounce_seconds)
+                if not more:
+                    break
+                pending.update(more)
+            yield pending
+
+    def close(self):
+        self.backend.close()
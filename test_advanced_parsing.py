@@ -22,5 +22,130 @@ def test_advanced_parsing():
                 print(chunk.content[:200] + "..." if len(chunk.content) > 200 else chunk.content)
                 print("-" * 40)
 
+
+
+def test_ast_chunking():
+    """Methods, async functions and decorators get their own chunks; big bodies are split"""
+    import tempfile
+    
+    source = '''import os
+
+@cached
+async def fetch(
+    url,
+    retries=3,
+):
+    return url
+
+class Service:
+    """Talks to the API"""
+
+    def start(self):
+        return True
+
+    @staticmethod
+    def helper():
+''' + "\n".join(f"        value_{i} = compute({i}, {i + 1}, {i + 2})" for i in range(60)) + '''
+
+main()
+'''
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+        f.write(source)
+    
+    chunks = AdvancedCodeParser(max_chunk_tokens=120, overlap_lines=2).parse_file(Path(f.name))
+    types = [chunk.chunk_type for chunk in chunks]
+    print(types)
+    
+    assert types[:4] == ['import', 'function:fetch', 'class:Service', 'method:Service.start']
+    assert types[-1] == 'module'
+    assert chunks[1].start_line == 3 and chunks[1].content.startswith('@cached')
+    assert 'return True' not in chunks[2].content
+    
+    helper_parts = [chunk for chunk in chunks if chunk.chunk_type == 'method:Service.helper']
+    assert len(helper_parts) > 1
+    assert helper_parts[1].start_line <= helper_parts[0].end_line
+
+def test_one_line_methods_in_outline():
+    """A method whose body shares its def line keeps its signature in the class outline"""
+    import tempfile
+    
+    source = "class A:\n    def f(self): return 1\n    def g(self):\n        return 2\n"
+    with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as f:
+        f.write(source)
+    
+    chunks = AdvancedCodeParser().parse_file(Path(f.name))
+    assert chunks[0].chunk_type == 'class:A'
+    assert chunks[0].content == "class A:\n    def f(self): return 1\n    def g(self):\n        ..."
+    assert [chunk.chunk_type for chunk in chunks[1:]] == ['method:A.f', 'method:A.g']
+
+def test_javascript_segmentation():
+    """Braces inside strings, templates, regexes and comments do not end or extend chunks"""
+    import tempfile
+    
+    source = '''import { a } from './a';
+
+/** Docs */
+export function first(name) {
+  const s = "}}";
+  const t = `${name.replace(/}/g, '')} ${ `{` }`;
+  // }
+  return s + t;
+}
+
+export const second = (a, b) => {
+  return a / b;
+};
+
+class Third extends Base {
+  render() { return '{'; }
+}
+'''
+    with tempfile.NamedTemporaryFile("w", suffix=".js", delete=False) as f:
+        f.write(source)
+    
+    chunks = AdvancedCodeParser().parse_file(Path(f.name))
+    spans = [(chunk.chunk_type, chunk.start_line, chunk.end_line) for chunk in chunks]
+    print(spans)
+    
+    assert spans == [
+        ('import', 1, 1),
+        ('function:first', 3, 9),
+        ('function:second', 11, 13),
+        ('class:Third', 15, 17),
+    ]
+    
+    with tempfile.NamedTemporaryFile("w", suffix=".js", delete=False) as f:
+        f.write("var a=1;" * 2000)
+    assert AdvancedCodeParser().parse_file(Path(f.name)) == []
+    assert {chunk.chunk_type for chunk in AdvancedCodeParser(minified_files='chunk').parse_file(Path(f.name))} == {'minified'}
+
+def test_javascript_statement_edges():
+    """A terminator on its own line stays with its statement, and long statements scan in linear time"""
+    import time
+    from src.js_lexer import segment_javascript
+    
+    source = "foo\n  .bar()\n;\nbaz();\n"
+    assert [source[s:e] for s, e in segment_javascript(source)] == ["foo\n  .bar()\n;", "baz();"]
+    
+    source = "@Component({a: 1})\n@Other\nexport class A {}\n@Input() name;\n"
+    assert [source[s:e] for s, e in segment_javascript(source)] == [
+        "@Component({a: 1})\n@Other\nexport class A {}", "@Input() name;"]
+    
+    def scan_seconds(lines):
+        source = "total = 0\n" + "  + value\n" * lines + ";\n"
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            assert len(segment_javascript(source)) == 1
+            best = min(best, time.perf_counter() - started)
+        return best
+    
+    # Quadratic scanning would take 16x as long for 4x the lines
+    assert scan_seconds(80000) < 8 * scan_seconds(20000)
+
 if __name__ == "__main__":
-    test_advanced_parsing()
\ No newline at end of file
+    test_advanced_parsing()
+    test_ast_chunking()
+    test_one_line_methods_in_outline()
+    test_javascript_segmentation()
+    test_javascript_statement_edges()
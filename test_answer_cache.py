@@ -0,0 +1,33 @@
+import tempfile
+from src.answer_cache import AnswerCache
+from src.local_generator import LocalCodeQAGenerator
+from src.models import CodeChunk, SearchResult
+
+def test_answer_cache():
+    """Answers are keyed by question, chunk ids and model, and old ones are evicted"""
+    
+    cache = AnswerCache(tempfile.mkdtemp(prefix="code_rag_answers_"), max_entries=2)
+    cache.put("What does parse do?", ["a.py:parse:1"], "model", "It splits text.")
+    assert cache.get("What does  parse do? ", ["a.py:parse:1"], "model") == "It splits text."
+    assert cache.get("What does parse do?", ["a.py:parse:2"], "model") is None
+    assert cache.get("What does parse do?", ["a.py:parse:1"], "other-model") is None
+    
+    cache.put("q2", [], "model", "two")
+    cache.put("q3", [], "model", "three")
+    assert cache.get("What does parse do?", ["a.py:parse:1"], "model") is None
+    assert cache.get("q3", [], "model") == "three"
+
+def test_cached_answer_skips_model():
+    """A cached answer streams back whole without loading the model"""
+    
+    results = [SearchResult(CodeChunk("a.py", "def parse(text):\n    return text.split()", 1, 2, "function:parse"), 0.1)]
+    cache = AnswerCache(tempfile.mkdtemp(prefix="code_rag_answers_"))
+    cache.put("What does parse do?", [results[0].chunk.id], "tiny-model", "It splits text.")
+    
+    generator = LocalCodeQAGenerator(model_name="tiny-model", cache=cache)
+    assert list(generator.stream_answer("What does parse do?", results)) == ["It splits text."]
+    assert generator.model is None and generator.last_stats["cached"]
+
+if __name__ == "__main__":
+    test_answer_cache()
+    test_cached_answer_skips_model()
@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from src.config import CodeRAGConfig
+from src.indexer import HASH_ALGORITHM, IncrementalIndexer, hash_algorithm_of
+from src.metadata_store import IndexMetadataStore
+
+SOURCE = "def parse(text):\n    return text.split()\n"
+
+def make_indexer(root: Path) -> IncrementalIndexer:
+    config_path = root / "config.json"
+    config_path.write_text(json.dumps({
+        "embedding_backend": "hashing",
+        "index_directory": str(root / "index"),
+        "embedding_cache": False,
+        "vector_backend": "numpy"
+    }))
+    return IncrementalIndexer(CodeRAGConfig(config_path))
+
+def count_hashes(indexer: IncrementalIndexer) -> list:
+    hashed = []
+    get_file_hash = indexer.get_file_hash
+
+    def counting_hash(file_path, *args):
+        hashed.append(str(file_path))
+        return get_file_hash(file_path, *args)
+
+    indexer.get_file_hash = counting_hash
+    return hashed
+
+def test_stat_fast_path():
+    """Files with matching stat info are not read; a touched but unchanged file is hashed once"""
+
+    root = Path(tempfile.mkdtemp(prefix="code_rag_stat_"))
+    source = root / "util.py"
+    source.write_text(SOURCE)
+    make_indexer(root).index_files([source])
+
+    indexer = make_indexer(root)
+    hashed = count_hashes(indexer)
+    assert indexer.get_changed_files([source])['unchanged'] == [source]
+    assert hashed == []
+
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert indexer.get_changed_files([source])['unchanged'] == [source]
+    assert hashed == [str(source)]
+
+    # The refreshed stat info was stored, so a new process skips the file again
+    indexer = make_indexer(root)
+    hashed = count_hashes(indexer)
+    assert indexer.get_changed_files([source])['unchanged'] == [source]
+    assert hashed == []
+
+    source.write_text(SOURCE.replace("split()", "split(',')"))
+    changes = indexer.get_changed_files([source])
+    assert changes['changed'] == [source] and str(source) in changes['states']
+
+def test_legacy_md5_hashes_are_upgraded():
+    """A bare MD5 from an old index still matches, and is replaced by the current digest"""
+
+    root = Path(tempfile.mkdtemp(prefix="code_rag_md5_"))
+    same, edited = root / "same.py", root / "edited.py"
+    for path in (same, edited):
+        path.write_text(SOURCE)
+    index = root / "index"
+    index.mkdir()
+    (index / "metadata.json").write_text(json.dumps({
+        str(path): hashlib.md5(SOURCE.encode()).hexdigest() for path in (same, edited)
+    }))
+    edited.write_text(SOURCE + "\nVALUE = 1\n")
+
+    indexer = make_indexer(root)
+    changes = indexer.get_changed_files([same, edited])
+    assert changes['unchanged'] == [same] and changes['changed'] == [edited]
+
+    stored = IndexMetadataStore(index).get_all_files()[str(same)]
+    assert hash_algorithm_of(stored.hash) == HASH_ALGORITHM
+    assert stored.hash == indexer.get_file_hash(same)
+    assert stored.size == same.stat().st_size
+
+def test_metadata_json_migration():
+    """metadata.json and chunk_manifest.json move into SQLite once and are then removed"""
+
+    index = Path(tempfile.mkdtemp(prefix="code_rag_migrate_"))
+    (index / "metadata.json").write_text(json.dumps({"a.py": "0" * 32, "b.py": "1" * 32}))
+    (index / "chunk_manifest.json").write_text(json.dumps({"a.py": ["a.py:run:1", "a.py:stop:2"]}))
+
+    store = IndexMetadataStore(index)
+    states = store.get_all_files()
+    assert {path: state.hash for path, state in states.items()} == {"a.py": "0" * 32, "b.py": "1" * 32}
+    # No stat info was recorded, so the first run re-hashes every file
+    assert all(state.size == -1 for state in states.values())
+    # b.py has no manifest entry, so its chunks are looked up in the vector store instead
+    assert store.get_chunk_ids(["a.py", "b.py"]) == {"a.py": ["a.py:run:1", "a.py:stop:2"]}
+    assert not (index / "metadata.json").exists() and not (index / "chunk_manifest.json").exists()
+    store.close()
+
+    # An unreadable legacy file is left alone rather than half imported
+    index = Path(tempfile.mkdtemp(prefix="code_rag_migrate_"))
+    (index / "metadata.json").write_text("{not json")
+    store = IndexMetadataStore(index)
+    assert store.get_all_files() == {} and (index / "metadata.json").exists()
+
+if __name__ == "__main__":
+    test_stat_fast_path()
+    test_legacy_md5_hashes_are_upgraded()
+    test_metadata_json_migration()
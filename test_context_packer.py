@@ -0,0 +1,32 @@
+from src.context_packer import ContextPacker
+from src.models import CodeChunk, SearchResult
+from src.text_utils import estimate_tokens
+
+def make_result(file_path, start_line, lines, chunk_type="function:f"):
+    return SearchResult(CodeChunk(file_path, "\n".join(lines), start_line, start_line + len(lines) - 1, chunk_type), 0.0)
+
+def test_context_packer():
+    """Packed context keeps relevant windows, skips repeated lines and stays within the token budget"""
+    
+    big_class = ["class Store:"] + [f"    value_{i} = compute({i})" for i in range(200)]
+    big_class[150] = "    def flush_cache(self): return self.cache.flush()"
+    results = [
+        make_result("src/store.py", 1, big_class, "class:Store"),
+        # Lines the first section already shows, then a chunk overlapping it by two lines
+        make_result("src/store.py", 149, big_class[148:153], "method:Store.flush_cache"),
+        make_result("src/store.py", 152, big_class[151:156]),
+        make_result("src/other.py", 1, ["def unrelated():"] + ["    x = 1"] * 300),
+    ]
+    
+    packer = ContextPacker(estimate_tokens, budget_tokens=150, window_lines=2)
+    sections = packer.pack("how does flush cache work", results)
+    assert [(s.file_path, s.start_line, s.end_line) for s in sections[:2]] == [("src/store.py", 1, 153),
+                                                                               ("src/store.py", 154, 156)]
+    assert sections[0].text.split("\n") == ["class Store:", "..."] + big_class[148:153]
+    assert estimate_tokens(packer.render(sections)) <= 150
+    # The last chunk is cut to what is left of the budget
+    assert len(sections) == 3 and sections[2].text.startswith("def unrelated():")
+    assert sections[2].end_line < 301
+
+if __name__ == "__main__":
+    test_context_packer()
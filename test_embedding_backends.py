@@ -0,0 +1,65 @@
+import numpy as np
+from src.config import CodeRAGConfig
+from src.embedder import CodeEmbedder
+from src.embedding_backends import EmbeddingBackend, create_backend
+from src.embedding_scheduler import EmbeddingScheduler
+from src.models import CodeChunk
+
+def test_hashing_backend():
+    """The hashing backend is deterministic and selected through config"""
+    
+    config = CodeRAGConfig()
+    config.set("embedding_backend", "hashing")
+    embedder = CodeEmbedder.from_config(config)
+    
+    chunks = [
+        CodeChunk("auth.py", "def login(username, password):\n    return True", 1, 2, "function:login"),
+        CodeChunk("auth.py", "def logout():\n    pass", 4, 5, "function:logout"),
+    ]
+    
+    first = embedder.embed_chunks(chunks)
+    second = CodeEmbedder.from_config(config).embed_chunks(chunks)
+    query = embedder.embed_query("login with a password")
+    
+    print(f"Model id: {embedder.model_id}, shape: {first.shape}")
+    
+    assert embedder.model_id == "hashing:384"
+    assert first.shape == (2, 384)
+    assert np.array_equal(first, second)
+    assert np.linalg.norm(query - first[0]) < np.linalg.norm(query - first[1])
+
+def test_length_sorted_batches():
+    """Scheduled batches respect the token budget and keep the input order"""
+    
+    backend = create_backend("hashing", "test")
+    scheduler = EmbeddingScheduler(backend, memory_budget_mb=4, max_batch_size=16)
+    texts = [" ".join(["token"] * ((i * 37) % 200 + 1)) for i in range(100)]
+    lengths = backend.count_tokens(texts)
+    
+    batches = scheduler.plan_batches(lengths)
+    embeddings = scheduler.encode(texts)
+    
+    print(f"{len(batches)} batches, stats: {scheduler.summary()}")
+    
+    assert sorted(i for batch in batches for i in batch) == list(range(len(texts)))
+    for batch in batches:
+        assert len(batch) <= 16
+        assert len(batch) == 1 or len(batch) * max(lengths[i] for i in batch) <= scheduler.max_batch_tokens
+    assert np.array_equal(embeddings, backend.encode(texts))
+
+def test_backend_must_implement_encode():
+    """A backend without encode and dimension fails when created, not on first use"""
+    
+    class Unfinished(EmbeddingBackend):
+        name = "unfinished"
+    
+    try:
+        Unfinished("model")
+        raise AssertionError("an incomplete backend should not be instantiable")
+    except TypeError as e:
+        assert "encode" in str(e)
+
+if __name__ == "__main__":
+    test_hashing_backend()
+    test_length_sorted_batches()
+    test_backend_must_implement_encode()
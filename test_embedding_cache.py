@@ -0,0 +1,49 @@
+import tempfile
+import numpy as np
+from src.embedding_cache import EmbeddingCache
+
+def test_embedding_cache():
+    """Cached vectors survive a reload and the oldest entries are evicted first"""
+    
+    cache_root = tempfile.mkdtemp(prefix="code_rag_cache_")
+    dimension = 131072  # 512 KB per vector, so a 1 MB cache holds two entries
+    
+    cache = EmbeddingCache(cache_root, "test-model", max_size_mb=1)
+    vectors = np.arange(3, dtype=np.float32)[:, None] * np.ones((3, dimension), dtype=np.float32)
+    cache.put_many(["first", "second", "third"], vectors)
+    cache.flush()
+    
+    reloaded = EmbeddingCache(cache_root, "test-model", max_size_mb=1)
+    hits = reloaded.get_many(["first", "second", "third"])
+    
+    print(f"Capacity: {reloaded.capacity}, hits: {reloaded.hits}, misses: {reloaded.misses}")
+    
+    assert hits[0] is None
+    assert hits[1][0] == 1.0 and hits[2][0] == 2.0
+    assert EmbeddingCache(cache_root, "other-model").get_many(["second"]) == [None]
+
+def test_shared_cache_never_serves_wrong_vectors():
+    """Two processes writing the same slot cost a miss, never another text's embedding"""
+    
+    cache_root = tempfile.mkdtemp(prefix="code_rag_cache_")
+    seed = EmbeddingCache(cache_root, "test-model")
+    seed.put_many(["seed"], np.zeros((1, 4), dtype=np.float32))
+    seed.flush()
+    
+    # Both load the same free slots and pick the same one
+    first, second = EmbeddingCache(cache_root, "test-model"), EmbeddingCache(cache_root, "test-model")
+    first.put_many(["x"], np.full((1, 4), 1, dtype=np.float32))
+    second.put_many(["y"], np.full((1, 4), 2, dtype=np.float32))
+    assert first.slots[first.make_key("x")] == second.slots[second.make_key("y")]
+    first.flush()
+    second.flush()
+    
+    assert first.get_many(["x"]) == [None]
+    assert first.get_many(["y"])[0][0] == 2.0
+    reloaded = EmbeddingCache(cache_root, "test-model")
+    hits = reloaded.get_many(["seed", "x", "y"])
+    assert hits[0][0] == 0.0 and hits[1] is None and hits[2][0] == 2.0
+
+if __name__ == "__main__":
+    test_embedding_cache()
+    test_shared_cache_never_serves_wrong_vectors()
@@ -0,0 +1,30 @@
+import tempfile
+from pathlib import Path
+from src.config import CodeRAGConfig
+from src.file_scanner import FileScanner
+
+def test_file_scanner():
+    """One walk prunes ignored directories at any depth and honours .gitignore"""
+    
+    root = Path(tempfile.mkdtemp(prefix="code_rag_scan_"))
+    for name in ["app.py", "web/index.js", "web/node_modules/lib/dep.js", "node_modules/top.js",
+                 "build/out.js", "cache.pyc", "notes.txt", "gen/skip.py", "gen/keep/kept.py"]:
+        (root / name).parent.mkdir(parents=True, exist_ok=True)
+        (root / name).write_text("x = 1\n")
+    (root / ".gitignore").write_text("gen/*\n!gen/keep\n")
+    
+    config = CodeRAGConfig(root / ".coderag.json")
+    found = {p.relative_to(root).as_posix() for p in FileScanner(config).scan_directory(root)}
+    print(f"Without .gitignore: {sorted(found)}")
+    assert found == {"app.py", "web/index.js", "gen/skip.py", "gen/keep/kept.py"}
+    
+    config.set("use_gitignore", True)
+    scanner = FileScanner(config)
+    files = scanner.scan_directory(root)
+    found = {p.relative_to(root).as_posix() for p in files}
+    print(f"With .gitignore: {sorted(found)}")
+    assert found == {"app.py", "web/index.js", "gen/keep/kept.py"}
+    assert scanner.get_file_stats(files)["total_size"] == 6 * len(files)
+
+if __name__ == "__main__":
+    test_file_scanner()
@@ -0,0 +1,160 @@
+import json
+import tempfile
+from pathlib import Path
+import numpy as np
+from src.config import CodeRAGConfig
+from src.indexer import IncrementalIndexer
+from src.models import CodeChunk, number_duplicate_chunks
+from src.vector_store import VectorStore
+
+SOURCE = '''def parse(text):
+    return text.split()
+
+def render(items):
+    return ", ".join(items)
+'''
+
+def make_indexer(root: Path, **options) -> IncrementalIndexer:
+    config_path = root / "config.json"
+    config_path.write_text(json.dumps({
+        "embedding_backend": "hashing",
+        "index_directory": str(root / "index"),
+        "embedding_cache": False,
+        "vector_backend": "numpy",
+        **options
+    }))
+    return IncrementalIndexer(CodeRAGConfig(config_path))
+
+def test_chunk_ids_are_content_addressed():
+    """Ids ignore line numbers, change with content, and stay unique for repeated chunks"""
+
+    chunk = CodeChunk("src/app.py", "def run():\n    pass", 1, 2, "function:run")
+    moved = CodeChunk("src/app.py", "def run():\n    pass", 10, 11, "function:run")
+    edited = CodeChunk("src/app.py", "def run():\n    return 1", 1, 2, "function:run")
+    assert chunk.id == moved.id != edited.id
+    assert chunk.id.startswith("src/app.py:run:")
+
+    repeated = number_duplicate_chunks([CodeChunk("a.py", "x = 1", i, i, "module") for i in (1, 5, 9)])
+    assert len({c.id for c in repeated}) == 3
+
+def test_reindex_skips_unchanged_chunks():
+    """Re-indexing embeds only edited functions; shifted ones just get new line numbers"""
+
+    root = Path(tempfile.mkdtemp(prefix="code_rag_incremental_"))
+    source = root / "project" / "util.py"
+    source.parent.mkdir()
+    source.write_text(SOURCE)
+
+    indexer = make_indexer(root)
+    assert indexer.index_files([source])['chunks_added'] == 2
+
+    source.write_text("import os\n\n\n" + SOURCE.replace("text.split()", "text.split(',')"))
+    indexer = make_indexer(root)
+    assert indexer.index_files([source])['chunks_added'] == 2  # the import and the edited parse()
+
+    store = indexer.vector_store
+    assert store.backend.count() == 3
+    stored = store.backend.get(include=["metadatas"])["metadatas"]
+    assert {(m["chunk_type"], m["start_line"]) for m in stored} == {
+        ("import", 1), ("function:parse", 4), ("function:render", 7)
+    }
+
+def test_add_chunks_retries_failed_batches():
+    """Writes go out in write_batch_size batches and a failing batch is retried on its own"""
+
+    store = VectorStore(tempfile.mkdtemp(prefix="code_rag_writes_"), backend="numpy")
+    store.write_batch_size, store.retry_delay = 4, 0
+    chunks = [CodeChunk(f"src/m{i}.py", f"x = {i}", 1, 1, "module") for i in range(10)]
+    upsert, calls = store.backend.upsert, []
+
+    def flaky_upsert(ids, *args):
+        calls.append(len(ids))
+        if len(calls) == 2:
+            raise OSError("disk busy")
+        upsert(ids, *args)
+
+    store.backend.upsert = flaky_upsert
+    store.add_chunks(chunks, np.random.default_rng(0).normal(size=(10, 8)).astype(np.float32))
+    assert calls == [4, 4, 4, 2]
+    assert store.backend.count() == 10 and store.lexical.count() == 10
+
+def test_interrupted_run_is_resumed():
+    """A write failing mid-run leaves unstored files changed and their old chunks in place"""
+
+    root = Path(tempfile.mkdtemp(prefix="code_rag_interrupted_"))
+    files = [root / "project" / f"{name}.py" for name in ("a", "b", "c")]
+    files[0].parent.mkdir()
+    for path in files:
+        path.write_text(SOURCE)
+    # Two chunks per file and per batch: a file is committed with the batch after its chunks
+    indexer = make_indexer(root, embed_batch_size=2)
+    indexer.index_files(files)
+    old_ids = indexer.get_stored_chunk_ids([str(path) for path in files])
+
+    for path in files:
+        path.write_text(SOURCE.replace("text.split()", "text.split(',')").replace("render", "show"))
+    indexer = make_indexer(root, embed_batch_size=2)
+    store, events = indexer.vector_store, []
+    add_chunks, delete_ids = store.add_chunks, store.delete_ids
+
+    def failing_add(chunks, embeddings):
+        if len([e for e in events if e[0] == "add"]) == 2:
+            raise OSError("disk full")
+        add_chunks(chunks, embeddings)
+        events.append(("add", {chunk.file_path for chunk in chunks}))
+
+    def logged_delete(ids):
+        events.append(("delete", {chunk_id.split(":")[0] for chunk_id in ids}))
+        delete_ids(ids)
+
+    store.add_chunks, store.delete_ids = failing_add, logged_delete
+    try:
+        indexer.index_files(files)
+    except OSError:
+        pass
+    else:
+        assert False, "the failed write should surface"
+
+    a, b, c = (str(path) for path in files)
+    # Only a was committed, and its stale chunks went only after its new ones were stored
+    assert events == [("add", {a}), ("add", {b}), ("delete", {a})]
+    remaining = set(store.backend.get(include=[])["ids"])
+    assert not remaining & set(old_ids[a])
+    assert set(old_ids[b]) | set(old_ids[c]) <= remaining
+
+    changes = make_indexer(root, embed_batch_size=2).get_changed_files(files)
+    assert changes['unchanged'] == [files[0]] and changes['changed'] == files[1:]
+
+def test_embedding_pool_outlives_runs():
+    """Embedding worker processes are reused by every run and only shut down by close()"""
+
+    root = Path(tempfile.mkdtemp(prefix="code_rag_pool_"))
+    config_path = root / "config.json"
+    config_path.write_text(json.dumps({
+        "embedding_backend": "hashing",
+        "index_directory": str(root / "index"),
+        "embedding_cache": False,
+        "vector_backend": "numpy",
+        "embedding_workers": 2,
+        "embedding_max_batch_size": 2
+    }))
+    indexer = IncrementalIndexer(CodeRAGConfig(config_path))
+    source = root / "app.py"
+    source.write_text(SOURCE + "\nclass Store:\n    def save(self):\n        pass\n")
+    indexer.index_files([source])
+    pool = indexer.embedder.scheduler.pool
+    assert pool is not None
+
+    source.write_text(SOURCE.replace("split", "splitlines") + "\ndef extra():\n    pass\n")
+    indexer.index_files([source])
+    assert indexer.embedder.scheduler.pool is pool
+
+    indexer.close()
+    assert indexer.embedder.scheduler.pool is None
+
+if __name__ == "__main__":
+    test_chunk_ids_are_content_addressed()
+    test_reindex_skips_unchanged_chunks()
+    test_add_chunks_retries_failed_batches()
+    test_interrupted_run_is_resumed()
+    test_embedding_pool_outlives_runs()
@@ -0,0 +1,31 @@
+import tempfile
+from src.lexical_index import LexicalIndex
+from src.models import CodeChunk
+from src.text_utils import split_identifier
+
+def test_lexical_index():
+    """Exact identifiers rank first, split parts still match, and replaced chunks drop old terms"""
+    
+    assert split_identifier("parseHTTPResponse_v2") == ["parse", "http", "response", "v", "2"]
+    
+    index = LexicalIndex(tempfile.mkdtemp(prefix="code_rag_lexical_"))
+    chunks = [
+        CodeChunk("src/indexer.py", "def get_file_hash(self, path):\n    return hash_file(path)", 1, 2, "function:get_file_hash"),
+        CodeChunk("src/indexer.py", "def get_file_state(self, path):\n    return self.files[path]", 4, 5, "function:get_file_state"),
+        CodeChunk("src/scanner.py", "class FileScanner:\n    pass", 1, 2, "class:FileScanner"),
+    ]
+    index.add_chunks(["a", "b", "c"], chunks)
+    
+    hits = index.search("get_file_hash", 3)
+    print(hits)
+    assert hits[0][0] == "a"
+    assert index.search("scanner", 3)[0][0] == "c"
+    
+    index.add_chunks(["a"], [CodeChunk("src/indexer.py", "def renamed(): pass", 1, 1, "function:renamed")])
+    assert "a" not in [chunk_id for chunk_id, _ in index.search("get_file_hash", 3)]
+    
+    index.delete_ids(["b"])
+    assert index.count() == 2
+
+if __name__ == "__main__":
+    test_lexical_index()
@@ -0,0 +1,71 @@
+import json
+import tempfile
+from pathlib import Path
+from src.config import CodeRAGConfig
+from src.embedding_backends import HashingBackend
+from src.indexer import IncrementalIndexer
+from src.metrics import Metrics
+from src.models import CodeChunk
+from src.vector_store import VectorStore
+
+def test_metrics_snapshot_and_prometheus():
+    """Timers and counters add up, only the slowest parses are kept, and export is Prometheus text"""
+
+    metrics = Metrics(slowest_parses=2)
+    with metrics.time("embed"):
+        pass
+    metrics.add_time("embed", 0.5)
+    metrics.add("chunks_embedded", 40)
+    for i, seconds in enumerate([0.1, 0.4, 0.2, 0.3]):
+        metrics.record_parse(f"src/m{i}.py", seconds, 1000)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["stages"]["embed"]["calls"] == 2 and snapshot["stages"]["embed"]["seconds"] >= 0.5
+    assert snapshot["stages"]["parse"]["calls"] == 4
+    assert snapshot["bytes_read"] == 4000
+    assert [entry["file_path"] for entry in snapshot["slowest_parses"]] == ["src/m1.py", "src/m3.py"]
+
+    text = metrics.to_prometheus()
+    assert 'code_rag_stage_calls_total{stage="parse"} 4' in text
+    assert "code_rag_chunks_embedded_total 40" in text
+    assert all(line.startswith("#") or len(line.split(" ")) == 2 for line in text.strip().split("\n"))
+
+def test_indexer_records_stages():
+    """An index run times hashing, parsing, embedding and storing"""
+
+    root = Path(tempfile.mkdtemp(prefix="code_rag_metrics_"))
+    source = root / "app.py"
+    source.write_text("def run():\n    return 1\n\nclass Job:\n    def start(self):\n        pass\n")
+    config_path = root / "config.json"
+    config_path.write_text(json.dumps({"embedding_backend": "hashing", "index_directory": str(root / "index"),
+                                       "embedding_cache": False, "vector_backend": "numpy"}))
+
+    indexer = IncrementalIndexer(CodeRAGConfig(config_path))
+    indexer.index_files([source])
+    snapshot = indexer.metrics.snapshot()
+    assert {"hash", "parse", "embed", "store"} <= set(snapshot["stages"])
+    assert snapshot["counters"]["files_parsed"] == 1
+    assert snapshot["counters"]["chunks_stored"] == snapshot["counters"]["chunks_embedded"] > 0
+    assert snapshot["slowest_parses"][0]["file_path"] == str(source)
+
+def test_search_records_stages():
+    """A hybrid search times its vector query, lexical query and fusion; a cached one counts a hit"""
+
+    backend = HashingBackend("test")
+    chunks = [CodeChunk(f"src/m{i}.py", f"def load_{i}(path):\n    return path", 1, 2, f"function:load_{i}")
+              for i in range(5)]
+    store = VectorStore(tempfile.mkdtemp(prefix="code_rag_search_metrics_"), backend="numpy")
+    store.add_chunks(chunks, backend.encode([chunk.content for chunk in chunks]))
+    store.metrics = Metrics()
+
+    for _ in range(2):
+        store.search(backend.encode(["load path"])[0], n_results=3, query_text="load path", lexical_weight=0.5)
+    snapshot = store.metrics.snapshot()
+    assert {name: stage["calls"] for name, stage in snapshot["stages"].items()} == \
+        {"vector_query": 1, "lexical_query": 1, "fusion": 1}
+    assert snapshot["counters"] == {"result_cache_hits": 1}
+
+if __name__ == "__main__":
+    test_metrics_snapshot_and_prometheus()
+    test_indexer_records_stages()
+    test_search_records_stages()
@@ -0,0 +1,21 @@
+from pathlib import Path
+from src.parse_pool import ParallelParser
+
+def test_parallel_parsing():
+    """Pool and in-process parsing should return the same chunks"""
+    
+    test_files = sorted(Path("test_project").rglob("*.py")) + [Path("test_project/missing.py")]
+    
+    serial = list(ParallelParser(workers=2, min_files_for_pool=1000).parse_files(test_files))
+    pooled = list(ParallelParser(workers=2, min_files_for_pool=1).parse_files(test_files))
+    
+    assert [f for f, _, _ in serial] == test_files
+    assert [(f, c, bool(e)) for f, c, e in serial] == [(f, c, bool(e)) for f, c, e in pooled]
+    
+    for file_path, chunks, error in pooled:
+        print(f"{file_path}: {len(chunks)} chunks" + (f" (error: {error})" if error else ""))
+    
+    assert pooled[-1][2] is not None
+
+if __name__ == "__main__":
+    test_parallel_parsing()
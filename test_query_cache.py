@@ -0,0 +1,107 @@
+import json
+import tempfile
+from pathlib import Path
+from src.config import CodeRAGConfig
+from src.embedder import CodeEmbedder
+from src.embedding_backends import HashingBackend
+from src.models import CodeChunk
+from src.query_cache import QueryResultCache
+from src.vector_store import VectorStore
+
+def test_query_embedding_lru():
+    """Repeated queries are embedded once and the least recently used entry is evicted"""
+
+    embedder = CodeEmbedder("test", backend="hashing", query_cache_size=2)
+    encode, encoded = embedder.backend.encode, []
+    embedder.backend.encode = lambda texts, **kwargs: encoded.extend(texts) or encode(texts, **kwargs)
+
+    first = embedder.embed_query("parse config")
+    assert (embedder.embed_query("parse config") == first).all()
+    embedder.embed_queries(["open file", "parse config", "close file"])
+    embedder.embed_query("parse config")
+    assert encoded == ["parse config", "open file", "close file", "parse config"]
+    assert (embedder.query_cache_hits, embedder.query_cache_misses) == (2, 4)
+    embedder.close()
+
+def test_result_cache_invalidated_by_writes():
+    """A repeated search skips embedding until the next index write"""
+
+    backend = HashingBackend("test")
+    chunks = [CodeChunk(f"src/m{i}.py", f"def load_{i}(path):\n    return path", 1, 2, f"function:load_{i}")
+              for i in range(5)]
+    store = VectorStore(tempfile.mkdtemp(prefix="code_rag_query_cache_"), backend="numpy")
+    store.add_chunks(chunks, backend.encode([chunk.content for chunk in chunks]))
+    embedded = []
+
+    def search(query):
+        def embed():
+            embedded.append(query)
+            return backend.encode([query])[0]
+        return store.search(embed, n_results=3, query_text=query, lexical_weight=0.5)
+
+    first = search("load path")
+    assert [r.chunk.id for r in search("load  path")] == [r.chunk.id for r in first]
+    assert embedded == ["load path"]
+
+    generation = store.result_cache.generation()
+    store.add_chunks(chunks[:1], backend.encode([chunks[0].content]))
+    assert store.result_cache.generation() > generation
+    search("load path")
+    assert embedded == ["load path", "load path"]
+    assert store.result_cache.stats()["results"] == {"hits": 1, "misses": 2}
+
+def test_result_cache_across_stores():
+    """A long-lived store sees another store's writes and never caches results from before them"""
+
+    backend = HashingBackend("test")
+    directory = tempfile.mkdtemp(prefix="code_rag_shared_cache_")
+    writer, server = VectorStore(directory, backend="numpy"), VectorStore(directory, backend="numpy")
+    first = CodeChunk("src/a.py", "def load_config(path):\n    return path", 1, 2, "function:load_config")
+    writer.add_chunks([first], backend.encode([first.content]))
+
+    def search():
+        return [r.chunk.file_path for r in server.search(backend.encode(["load config"])[0], n_results=5,
+                                                         query_text="load config", lexical_weight=0.5)]
+
+    assert search() == ["src/a.py"]
+    second = CodeChunk("src/b.py", "def load_config_file(path):\n    return path", 1, 2, "function:load_config_file")
+    writer.add_chunks([second], backend.encode([second.content]))
+    assert sorted(search()) == ["src/a.py", "src/b.py"]
+    assert sorted(search()) == ["src/a.py", "src/b.py"]  # now from the cache
+
+    writer.delete_ids([first.id, second.id])
+    assert search() == []
+
+def test_cache_hits_only_read():
+    """Hits write nothing until a put, flush or close, and their counts survive a reopen"""
+
+    directory = tempfile.mkdtemp(prefix="code_rag_cache_writes_")
+    cache = QueryResultCache(directory)
+    cache.put("load config", None, 5, 0.5, [], cache.generation())
+    writes = cache.conn.total_changes
+    for _ in range(3):
+        assert cache.get("load config", None, 5, 0.5) == []
+    cache.record("query_embeddings", 2, 1)
+    assert cache.conn.total_changes == writes
+    assert cache.stats() == {"query_embeddings": {"hits": 2, "misses": 1}, "results": {"hits": 3, "misses": 0}}
+
+    cache.get("load config", None, 5, 0.5)
+    cache.close()
+    assert QueryResultCache(directory).stats()["results"] == {"hits": 4, "misses": 0}
+
+def test_configured_model_id():
+    """The model id recorded in an index is known from the config, before any model is loaded"""
+
+    root = Path(tempfile.mkdtemp(prefix="code_rag_model_id_"))
+    (root / "config.json").write_text(json.dumps({"embedding_backend": "hashing", "embedding_model": "any"}))
+    config = CodeRAGConfig(root / "config.json")
+    assert CodeEmbedder.configured_model_id(config) == CodeEmbedder.from_config(config).model_id == "hashing:384"
+    config.set("embedding_backend", "sentence-transformers")
+    assert CodeEmbedder.configured_model_id(config) == "sentence-transformers:any"
+
+if __name__ == "__main__":
+    test_query_embedding_lru()
+    test_result_cache_invalidated_by_writes()
+    test_result_cache_across_stores()
+    test_cache_hits_only_read()
+    test_configured_model_id()
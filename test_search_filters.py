@@ -0,0 +1,115 @@
+import tempfile
+import numpy as np
+from src.embedding_backends import HashingBackend
+from src.models import CodeChunk
+from src.vector_store import VectorStore
+
+BACKENDS = [("chroma", {}), ("numpy", {}), ("numpy", {"dtype": "float16"})]
+
+def test_search_filters():
+    """Selective filters still return a full page of exact matches"""
+    for backend_name, options in BACKENDS:
+        check_search_filters(backend_name, options)
+
+def check_search_filters(backend_name, options):
+    chunks = [CodeChunk(f"src/module_{i}.py", f"def handler_{i}(event):\n    return event", 1, 2, f"function:handler_{i}")
+              for i in range(40)]
+    chunks.append(CodeChunk("web/app.ts", "export function handler(event) {\n  return event;\n}", 1, 3, "function:handler"))
+    chunks.append(CodeChunk("src/service.py", "class Service:\n    pass", 1, 2, "class:Service"))
+    
+    backend = HashingBackend("test")
+    store = VectorStore(tempfile.mkdtemp(prefix="code_rag_filters_"), backend=backend_name, **options)
+    store.add_chunks(chunks, backend.encode([chunk.content for chunk in chunks]))
+    query = backend.encode(["handler event"])[0]
+    
+    for lexical_weight in (0.0, 0.5):
+        def search(**filters):
+            return store.search(query, n_results=3, query_text="handler event", lexical_weight=lexical_weight,
+                                where=store.build_where(**filters))
+        
+        assert [r.chunk.file_path for r in search(file_filter="*.ts")] == ["web/app.ts"]
+        assert [r.chunk.file_path for r in search(language="typescript")] == ["web/app.ts"]
+        assert [r.chunk.chunk_type for r in search(type_filter="class")] == ["class:Service"]
+        assert [r.chunk.chunk_type for r in search(type_filter="function:handler_7")] == ["function:handler_7"]
+        assert {r.chunk.file_path for r in search(file_filter="module_1*.py")} <= {f"src/module_1{i}.py" for i in range(10)} | {"src/module_1.py"}
+        assert len(search(file_filter="*.py", type_filter="function")) == 3
+
+def test_broad_file_filter():
+    """A glob matching many files is expressed per directory, and one matching too many is refused"""
+    for backend_name, options in BACKENDS:
+        chunks = [CodeChunk(f"src/{package}/m{i}.py", f"def load_{package}_{i}(path):\n    return path", 1, 2,
+                            f"function:load_{package}_{i}") for package in ("api", "db", "ui") for i in range(4)]
+        chunks.append(CodeChunk("src/api/notes.md", "load notes", 1, 1, "module"))
+        backend = HashingBackend("test")
+        store = VectorStore(tempfile.mkdtemp(prefix="code_rag_broad_"), backend=backend_name, **options)
+        store.add_chunks(chunks, backend.encode([chunk.content for chunk in chunks]))
+        store.max_filter_paths = 6
+        
+        where = store.build_where(file_filter="src/*/*.py")
+        assert where == {"$or": [{"directory": {"$in": ["src/db", "src/ui"]}},
+                                 {"file_path": {"$in": [f"src/api/m{i}.py" for i in range(4)]}}]}
+        for lexical_weight in (0.0, 0.5):
+            results = store.search(backend.encode(["load path"])[0], n_results=20, query_text="load path",
+                                   lexical_weight=lexical_weight, where=where)
+            assert sorted(r.chunk.file_path for r in results) == sorted(chunk.file_path for chunk in chunks[:12])
+        
+        store.max_filter_paths = 1
+        try:
+            store.build_where(file_filter="src/*/*.py")
+            raise AssertionError("an unbounded file filter should be refused")
+        except ValueError as e:
+            assert "narrower" in str(e)
+
+def test_search_many():
+    """Batched search returns, in order, what one search per query would"""
+    for backend_name, options in BACKENDS:
+        if backend_name != "chroma":  # approximate on these embeddings; see test_search_many_dense
+            check_search_many(backend_name, options)
+
+def check_search_many(backend_name, options):
+    chunks = [CodeChunk(f"src/module_{i}.py", f"def handler_{i}(event):\n    return event_{i % 7}", 1, 2, f"function:handler_{i}")
+              for i in range(50)]
+    backend = HashingBackend("test")
+    store = VectorStore(tempfile.mkdtemp(prefix="code_rag_batch_"), backend=backend_name, **options)
+    store.add_chunks(chunks, backend.encode([chunk.content for chunk in chunks]))
+    
+    texts = [f"handler_{i} event_{i % 5}" for i in range(20)]
+    embeddings = backend.encode(texts)
+    for lexical_weight in (0.0, 0.5):
+        batched = store.search_many(embeddings, n_results=4, query_texts=texts, lexical_weight=lexical_weight,
+                                    batch_size=6, workers=3)
+        single = [store.search(embedding, n_results=4, query_text=text, lexical_weight=lexical_weight)
+                  for embedding, text in zip(embeddings, texts)]
+        assert [[r.chunk.chunk_type for r in results] for results in batched] == \
+               [[r.chunk.chunk_type for r in results] for results in single]
+
+def test_search_many_dense():
+    """The same holds on every backend, Chroma included, for dense embeddings"""
+    for backend_name, options in BACKENDS:
+        check_search_many_dense(backend_name, options)
+
+def check_search_many_dense(backend_name, options):
+    chunks = [CodeChunk(f"src/module_{i}.py", f"def handler_{i}(event):\n    return value_{i}", 1, 2, f"function:handler_{i}")
+              for i in range(50)]
+    # Sparse hashed vectors have many near ties, which Chroma's approximate HNSW search breaks unstably
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(50, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    store = VectorStore(tempfile.mkdtemp(prefix="code_rag_batch_"), backend=backend_name, **options)
+    store.add_chunks(chunks, vectors)
+    
+    texts = [f"handler_{i} value_{i * 3 % 50}" for i in range(20)]
+    embeddings = vectors[:20] + 0.1 * rng.normal(size=(20, 32)).astype(np.float32)
+    for lexical_weight in (0.0, 0.5):
+        batched = store.search_many(embeddings, n_results=4, query_texts=texts, lexical_weight=lexical_weight,
+                                    batch_size=6, workers=3)
+        single = [store.search(embedding, n_results=4, query_text=text, lexical_weight=lexical_weight)
+                  for embedding, text in zip(embeddings, texts)]
+        assert [[r.chunk.chunk_type for r in results] for results in batched] == \
+               [[r.chunk.chunk_type for r in results] for results in single]
+
+if __name__ == "__main__":
+    test_search_filters()
+    test_broad_file_filter()
+    test_search_many()
+    test_search_many_dense()
@@ -0,0 +1,198 @@
+import json
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+import numpy as np
+from src.config import CodeRAGConfig
+from src.indexer import IncrementalIndexer
+from src.server import QueryBatcher, QueryClient, QueryServer
+
+class RecordingEmbedder:
+    """Stands in for CodeEmbedder, remembering the size of every batch it embeds"""
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def embed_queries(self, queries):
+        self.batches.append(len(queries))
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return [np.full(4, len(query), dtype=np.float32) for query in queries]
+
+def test_batcher_coalesces_queries():
+    """Concurrent queries share model calls, each gets its own embedding, and errors reach every caller"""
+
+    embedder = RecordingEmbedder()
+    batcher = QueryBatcher(embedder, max_batch_size=8, batch_window_ms=50)
+    results = {}
+    threads = [threading.Thread(target=lambda i=i: results.__setitem__(i, batcher.embed("q" * i)))
+               for i in range(1, 21)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(results[i][0] == i for i in range(1, 21))
+    assert sum(embedder.batches) == 20 and len(embedder.batches) < 20
+    assert max(embedder.batches) <= 8
+
+    failing = QueryBatcher(RecordingEmbedder(fail=True), batch_window_ms=1)
+    try:
+        failing.embed("query")
+        raise AssertionError("the embedding error should reach the caller")
+    except RuntimeError as e:
+        assert "model unavailable" in str(e)
+
+def start_server():
+    root = Path(tempfile.mkdtemp(prefix="code_rag_server_"))
+    source = root / "app.py"
+    source.write_text("def load_config(path):\n    return path\n\nclass Service:\n    def start(self):\n        pass\n")
+    config_path = root / "config.json"
+    config_path.write_text(json.dumps({"embedding_backend": "hashing", "index_directory": str(root / "index"),
+                                       "embedding_cache": False, "vector_backend": "numpy"}))
+    config = CodeRAGConfig(config_path)
+    IncrementalIndexer(config).index_files([source])
+
+    server = QueryServer(config, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, QueryClient(port=server.httpd.server_address[1]), root
+
+def post(client, path, payload):
+    request = urllib.request.Request(f"{client.base_url}{path}", data=json.dumps(payload).encode("utf-8"),
+                                     headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=10) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+def test_server_search_and_errors():
+    """Searches are answered over HTTP; bad requests get 400 and server failures 500"""
+
+    server, client, root = start_server()
+    try:
+        results = client.search("load config", n_results=2)
+        assert results[0].chunk.file_path.endswith("app.py")
+        assert [r.chunk.chunk_type for r in client.search("start", type_filter="method")] == ["method:Service.start"]
+
+        assert post(client, "/search", {"n_results": 2})[0] == 400
+        assert post(client, "/search", {"query": "load", "file_filter": "missing/*.go"})[0] == 400
+        try:
+            client.search("load", file_filter="missing/*.go")
+            raise AssertionError("a 400 should raise ValueError in the client")
+        except ValueError as e:
+            assert "No indexed files match" in str(e)
+
+        def broken_search(*args, **kwargs):
+            raise RuntimeError("index unreadable")
+        server.vector_store.search = broken_search
+        assert post(client, "/search", {"query": "load config"}) == (500, {"error": "index unreadable"})
+        try:
+            client.search("load config")
+            raise AssertionError("a 500 should raise RuntimeError in the client")
+        except RuntimeError as e:
+            assert "index unreadable" in str(e)
+    finally:
+        server.httpd.shutdown()
+
+def test_server_reuses_query_embeddings():
+    """A query repeated with another limit misses the result cache but not the embedder's"""
+
+    server, client, root = start_server()
+    try:
+        client.search("load config", n_results=1)
+        client.search("load config", n_results=2)
+        assert (server.embedder.query_cache_hits, server.embedder.query_cache_misses) == (1, 1)
+        assert server.vector_store.result_cache.stats()["query_embeddings"] == {"hits": 1, "misses": 1}
+    finally:
+        server.httpd.shutdown()
+
+def test_server_notices_a_new_model():
+    """An index rebuilt with another model by another process is refused, not searched"""
+
+    server, client, root = start_server()
+    try:
+        assert client.search("load config", n_results=1)
+        from src.models import CodeChunk
+        from src.vector_store import VectorStore
+        rebuilt = VectorStore(str(root / "index"), backend="numpy")
+        rebuilt.clear()
+        rebuilt.set_embedding_model("sentence-transformers:all-mpnet-base-v2")
+        rebuilt.add_chunks([CodeChunk("app.py", "x = 1", 1, 1, "module")], np.ones((1, 384), dtype=np.float32))
+        status, body = post(client, "/search", {"query": "start service"})
+        assert status == 400 and "all-mpnet-base-v2" in body["error"]
+    finally:
+        server.httpd.shutdown()
+
+class EndlessGenerator:
+    """Stands in for LocalCodeQAGenerator, streaming until its stream is closed"""
+    def __init__(self):
+        self.closed = threading.Event()
+        self.last_stats = {}
+
+    def cached_answer(self, question, results):
+        if question == "cached question":
+            return "from the cache", {"cached": True}
+        return None
+
+    def stream_answer(self, question, results):
+        try:
+            while True:
+                yield "word "
+                time.sleep(0.01)
+        finally:
+            self.closed.set()
+
+def test_ask_stops_when_the_client_leaves():
+    """A missing question is a 400; a client that disconnects stops its answer and frees the model"""
+
+    server, client, root = start_server()
+    server.generator = EndlessGenerator()
+    try:
+        assert post(client, "/ask", {"file_filter": "*.py"})[0] == 400
+
+        messages = client.ask("what does load_config do?", timeout=10)
+        assert "sources" in next(messages)
+        assert next(messages) == {"text": "word "}
+        messages.close()
+        assert server.generator.closed.wait(5)
+        assert server.generator_lock.acquire(timeout=5)
+        server.generator_lock.release()
+    finally:
+        server.httpd.shutdown()
+
+def test_cached_answers_skip_the_model_queue():
+    """A cached answer is sent while another question holds the model"""
+
+    server, client, root = start_server()
+    server.generator = EndlessGenerator()
+    try:
+        with server.generator_lock:
+            messages = list(client.ask("cached question", timeout=5))
+        assert messages[1:] == [{"text": "from the cache"}, {"stats": {"cached": True}}]
+    finally:
+        server.httpd.shutdown()
+
+def test_client_fallback():
+    """The client only uses a server that is running and serving the same index"""
+
+    server, client, root = start_server()
+    try:
+        assert client.is_available()
+        assert client.is_available(str(root / "index"))
+        assert not client.is_available(str(root / "other_index"))
+    finally:
+        server.httpd.shutdown()
+    time.sleep(0.1)
+    assert not client.is_available(str(root / "index"))
+
+if __name__ == "__main__":
+    test_batcher_coalesces_queries()
+    test_server_search_and_errors()
+    test_server_reuses_query_embeddings()
+    test_server_notices_a_new_model()
+    test_ask_stops_when_the_client_leaves()
+    test_cached_answers_skip_the_model_queue()
+    test_client_fallback()
@@ -0,0 +1,197 @@
+import os
+import tempfile
+from pathlib import Path
+import numpy as np
+from src import vector_backends
+from src.vector_backends import NumpyBackend
+
+def make_rows(count, dimension=32, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(count, dimension)).astype(np.float32)
+    ids = [f"chunk-{i}" for i in range(count)]
+    metadatas = [{"file_path": f"src/file_{i % 10}.py", "start_line": i} for i in range(count)]
+    return ids, vectors, [f"body {i}" for i in range(count)], metadatas
+
+def test_numpy_backend_persistence():
+    """Rows survive a reopen; upserts replace, deletes hide, and compaction keeps live rows"""
+    
+    directory = tempfile.mkdtemp(prefix="code_rag_numpy_")
+    ids, vectors, documents, metadatas = make_rows(3000)
+    backend = NumpyBackend(directory)
+    backend.upsert(ids, vectors, documents, metadatas)
+    backend.set_metadata("embedding_model", "hashing:32")
+    
+    reopened = NumpyBackend(directory)
+    assert reopened.count() == 3000
+    assert reopened.metadata == {"embedding_model": "hashing:32"}
+    hit = reopened.query(vectors[5:6], 1)
+    assert hit["ids"][0] == ["chunk-5"] and hit["documents"][0] == ["body 5"]
+    assert hit["metadatas"][0] == [{"file_path": "src/file_5.py", "start_line": 5}]
+    
+    reopened.upsert(["chunk-5"], vectors[6:7], ["replaced"], [{"file_path": "src/new.py", "start_line": 1}])
+    assert reopened.get(ids=["chunk-5"])["documents"] == ["replaced"]
+    assert reopened.get(where={"file_path": "src/new.py"})["ids"] == ["chunk-5"]
+    
+    reopened.delete(ids[:2500])
+    assert reopened.rows < 3001  # dead rows outnumbered live ones, so the files were compacted
+    again = NumpyBackend(directory)
+    assert again.count() == 500
+    assert again.query(vectors[2999:3000], 1)["ids"][0] == ["chunk-2999"]
+    assert len(again.get(where={"file_path": {"$in": ["src/file_1.py", "src/file_2.py"]}})["ids"]) == 100
+
+def test_numpy_compaction_is_crash_safe():
+    """A compaction that fails before its swap leaves the old files in place, and a half-done swap is finished"""
+    
+    directory = tempfile.mkdtemp(prefix="code_rag_compact_")
+    ids, vectors, documents, metadatas = make_rows(3000)
+    NumpyBackend(directory).upsert(ids, vectors, documents, metadatas)
+    
+    backend = NumpyBackend(directory)
+    sync = vector_backends._fsync_directory
+    def failing_sync(path):
+        raise OSError("disk full")
+    vector_backends._fsync_directory = failing_sync
+    try:
+        backend.delete(ids[:2500])
+        raise AssertionError("compaction should have failed")
+    except OSError:
+        pass
+    finally:
+        vector_backends._fsync_directory = sync
+    
+    index = Path(directory) / "numpy_index"
+    assert not index.with_name("numpy_index.compact").exists()
+    assert NumpyBackend(directory).get(ids=["chunk-2999"])["documents"] == ["body 2999"]
+    
+    # Crash between moving the old files aside and moving the compacted ones in
+    backend = NumpyBackend(directory)
+    backend.upsert(ids[:1], vectors[:1], documents[:1], metadatas[:1])
+    os.replace(index, index.with_name("numpy_index.old"))
+    recovered = NumpyBackend(directory)
+    assert recovered.get(ids=["chunk-0", "chunk-2999"])["documents"] == ["body 0", "body 2999"]
+    assert not index.with_name("numpy_index.old").exists()
+
+def test_numpy_ivf():
+    """Probing every list matches the exact scan; probing a few keeps most of the true neighbours"""
+    
+    ids, vectors, documents, metadatas = make_rows(4000, seed=1)
+    queries = make_rows(20, seed=2)[1]
+    
+    flat = NumpyBackend(tempfile.mkdtemp(prefix="code_rag_flat_"))
+    flat.upsert(ids, vectors, documents, metadatas)
+    exact = flat.query(queries, 10)["ids"]
+    
+    ivf = NumpyBackend(tempfile.mkdtemp(prefix="code_rag_ivf_"), ivf_lists=16, ivf_probe=16)
+    ivf.upsert(ids, vectors, documents, metadatas)
+    assert ivf.centroids is not None
+    assert ivf.query(queries, 10)["ids"] == exact
+    
+    ivf.ivf_probe = 4
+    approximate = ivf.query(queries, 10)["ids"]
+    recall = np.mean([len(set(a) & set(e)) / 10 for a, e in zip(approximate, exact)])
+    print(f"recall@10 with 4 of 16 lists: {recall:.2f}")
+    assert recall > 0.5
+
+def test_numpy_quantization():
+    """int8 and PQ codes re-ranked exactly find the true neighbours and survive a reopen"""
+    
+    ids, vectors, documents, metadatas = make_rows(4000, seed=3)
+    queries = vectors[:20] + 0.1 * make_rows(20, seed=4)[1]
+    
+    flat = NumpyBackend(tempfile.mkdtemp(prefix="code_rag_flat_"))
+    flat.upsert(ids, vectors, documents, metadatas)
+    exact = flat.query(queries, 10)
+    
+    for quantization in ("int8", "pq"):
+        directory = tempfile.mkdtemp(prefix=f"code_rag_{quantization}_")
+        backend = NumpyBackend(directory, dtype="float32", quantization=quantization, pq_subvectors=8)
+        backend.upsert(ids[:3000], vectors[:3000], documents[:3000], metadatas[:3000])
+        backend.upsert(ids[3000:], vectors[3000:], documents[3000:], metadatas[3000:])
+        assert backend.quantizer is not None and backend.vector_codes.shape[1] == backend.quantizer.code_size
+        
+        reopened = NumpyBackend(directory)
+        assert reopened.quantizer is not None and reopened.vectors.dtype == np.float32
+        result = reopened.query(queries, 10)
+        recall = np.mean([len(set(a) & set(e)) / 10 for a, e in zip(result["ids"], exact["ids"])])
+        print(f"{quantization} recall@10: {recall:.2f}")
+        assert recall > 0.9
+        # Returned distances come from the exact re-rank, not the codes
+        assert result["ids"][0][0] == exact["ids"][0][0]
+        assert np.isclose(result["distances"][0][0], exact["distances"][0][0], atol=1e-4)
+
+def test_quantization_needs_numpy():
+    """Numpy-only vector settings are rejected on ChromaDB instead of being dropped"""
+    from src.config import CodeRAGConfig
+    from src.vector_store import VectorStore
+    
+    config = CodeRAGConfig(Path(tempfile.mkdtemp()) / "missing.json")
+    config.set("index_directory", tempfile.mkdtemp(prefix="code_rag_chroma_"))
+    config.set("vector_quantization", "int8")
+    try:
+        VectorStore.from_config(config)
+    except ValueError as e:
+        assert "vector_quantization" in str(e)
+    else:
+        assert False, "quantization on chroma should be a configuration error"
+    
+    config.set("vector_backend", "numpy")
+    store = VectorStore.from_config(config)
+    # The rerank copy defaults to half precision once codes carry the scan
+    assert store.backend.quantization == "int8" and store.backend.dtype == np.float16
+
+def test_numpy_sees_other_writers():
+    """An open backend picks up rows upserted, deleted or cleared through another instance"""
+    
+    directory = tempfile.mkdtemp(prefix="code_rag_shared_")
+    ids, vectors, documents, metadatas = make_rows(3)
+    writer = NumpyBackend(directory)
+    writer.upsert(ids[:1], vectors[:1], documents[:1], metadatas[:1])
+    reader = NumpyBackend(directory)
+    assert reader.count() == 1
+    
+    writer.upsert(ids[1:2], vectors[1:2], documents[1:2], metadatas[1:2])
+    assert reader.count() == 2
+    assert reader.query(vectors[1:2], 1)["ids"][0] == ["chunk-1"]
+    
+    writer.delete(ids[:1])
+    assert reader.count() == 1
+    assert reader.query(vectors[0:1], 2)["ids"][0] == ["chunk-1"]
+    
+    writer.clear()
+    assert reader.count() == 0 and reader.query(vectors[1:2], 1)["ids"][0] == []
+
+def write_rows(directory, seed):
+    ids, vectors, documents, metadatas = make_rows(400, seed=seed)
+    backend = NumpyBackend(directory)
+    for start in range(0, 400, 20):
+        rows = slice(start, start + 20)
+        backend.upsert([f"{seed}-{i}" for i in ids[rows]], vectors[rows], documents[rows], metadatas[rows])
+        backend.delete([f"{seed}-{ids[start]}"])
+
+def test_numpy_writers_take_turns():
+    """Processes writing one index at once do not overwrite each other's rows"""
+    import multiprocessing
+    
+    directory = tempfile.mkdtemp(prefix="code_rag_writers_")
+    NumpyBackend(directory)
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=write_rows, args=(directory, seed)) for seed in (1, 2, 3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+    
+    backend = NumpyBackend(directory)
+    assert backend.count() == 3 * 380
+    stored = backend.get(ids=["2-chunk-7"], include=["documents"])
+    assert stored["documents"] == ["body 7"]
+
+if __name__ == "__main__":
+    test_numpy_backend_persistence()
+    test_numpy_sees_other_writers()
+    test_numpy_writers_take_turns()
+    test_numpy_compaction_is_crash_safe()
+    test_numpy_ivf()
+    test_numpy_quantization()
+    test_quantization_needs_numpy()
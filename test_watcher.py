@@ -0,0 +1,119 @@
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from src.config import CodeRAGConfig
+from src.file_scanner import FileScanner
+from src.indexer import IncrementalIndexer
+from src.watcher import FileWatcher, PollingWatcher
+
+def make_project():
+    root = Path(tempfile.mkdtemp(prefix="code_rag_watch_"))
+    project = root / "project"
+    (project / "pkg").mkdir(parents=True)
+    (project / "app.py").write_text("def run():\n    return 1\n")
+    (project / "pkg" / "util.py").write_text("def helper():\n    return 2\n")
+    config_path = root / "config.json"
+    config_path.write_text(json.dumps({"embedding_backend": "hashing", "index_directory": str(root / "index"),
+                                       "embedding_cache": False, "vector_backend": "numpy",
+                                       "use_gitignore": True}))
+    return project, CodeRAGConfig(config_path)
+
+def indexed_files(indexer, project):
+    return sorted(Path(path).relative_to(project).as_posix() for path in indexer.file_states)
+
+def test_polling_read_honours_timeout():
+    """A read never sleeps past its timeout, however long the poll interval"""
+
+    watcher = PollingWatcher(lambda: {}, interval=30)
+    start = time.monotonic()
+    assert watcher.read(timeout=0.05) == set()
+    assert time.monotonic() - start < 1
+
+def test_polling_watcher_batches():
+    """The polling backend reports a created, then modified, then deleted file"""
+
+    project, config = make_project()
+    watcher = FileWatcher(project, FileScanner(config), debounce_seconds=0.05, poll_interval=0.05,
+                          force_polling=True)
+    assert watcher.mode == "polling"
+    batches = watcher.batches()
+    new_file = project / "pkg" / "new.py"
+
+    new_file.write_text("x = 1\n")
+    assert str(new_file) in next(batches)
+    new_file.write_text("x = 1\ny = 2\n")
+    assert str(new_file) in next(batches)
+    new_file.unlink()
+    assert str(new_file) in next(batches)
+    watcher.close()
+
+def test_inotify_watcher_batches():
+    """inotify reports created, renamed and deleted files, including in new directories"""
+    if not sys.platform.startswith("linux"):
+        return
+
+    project, config = make_project()
+    watcher = FileWatcher(project, FileScanner(config), debounce_seconds=0.05)
+    if watcher.mode != "inotify":
+        return
+    batches = watcher.batches()
+
+    (project / "new_pkg").mkdir()
+    assert str(project / "new_pkg") in next(batches)
+    (project / "new_pkg" / "mod.py").write_text("x = 1\n")
+    assert str(project / "new_pkg" / "mod.py") in next(batches)
+    os.rename(project / "app.py", project / "main.py")
+    assert {str(project / "app.py"), str(project / "main.py")} <= next(batches)
+    (project / "main.py").unlink()
+    assert str(project / "main.py") in next(batches)
+    watcher.close()
+
+def test_update_paths_delete_rename_gitignore():
+    """Watched changes reach the index: deletes and renames drop old paths, a .gitignore edit re-checks its directory"""
+
+    project, config = make_project()
+    scanner = FileScanner(config)
+    indexer = IncrementalIndexer(config)
+    indexer.index_files(scanner.scan_directory(project), stats=scanner.stats)
+    assert indexed_files(indexer, project) == ["app.py", "pkg/util.py"]
+
+    os.rename(project / "app.py", project / "main.py")
+    indexer.update_paths({str(project / "app.py"), str(project / "main.py")}, scanner, project)
+    assert indexed_files(indexer, project) == ["main.py", "pkg/util.py"]
+
+    os.rename(project / "pkg", project / "lib")
+    (project / "main.py").write_text("def main():\n    return 2\n")
+    get_changed_files, passed_stats = indexer.get_changed_files, []
+    indexer.get_changed_files = lambda files, stats, **kwargs: \
+        passed_stats.append(set(stats)) or get_changed_files(files, stats, **kwargs)
+    # An ordered set, so the file is accepted before the directory is scanned
+    touched = dict.fromkeys([str(project / "main.py"), str(project / "pkg"), str(project / "lib")]).keys()
+    indexer.update_paths(touched, scanner, project)
+    assert indexed_files(indexer, project) == ["lib/util.py", "main.py"]
+    # Stat results from every path in the batch reach the indexer, not just the last scan's
+    assert passed_stats == [{str(project / "main.py"), str(project / "lib" / "util.py")}]
+    del indexer.get_changed_files
+
+    (project / "main.py").unlink()
+    result = indexer.update_paths({str(project / "main.py")}, scanner, project)
+    assert result["files_removed"] == 1 and indexed_files(indexer, project) == ["lib/util.py"]
+
+    (project / ".gitignore").write_text("lib/\n")
+    indexer.update_paths({str(project / ".gitignore")}, scanner, project)
+    assert indexed_files(indexer, project) == []
+
+    (project / ".gitignore").write_text("")
+    indexer.update_paths({str(project / ".gitignore")}, scanner, project)
+    assert indexed_files(indexer, project) == ["lib/util.py"]
+    assert [r.chunk.file_path for r in indexer.vector_store.search(
+        indexer.embedder.embed_query("helper"), n_results=5, query_text="helper", lexical_weight=0.5)] == \
+        [str(project / "lib" / "util.py")]
+
+if __name__ == "__main__":
+    test_polling_read_honours_timeout()
+    test_polling_watcher_batches()
+    test_inotify_watcher_batches()
+    test_update_paths_delete_rename_gitignore()